@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# Compares the NumPy vector engine with float32 vs int8 storage on synthetic
+# clustered embeddings: recall@k against exact search, query latency and
+# resident bytes per vector.
+#   python benchmarks/quantization_benchmark.py --vectors 50000 --dim 1536
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.numpyVectorStore import NumpyVectorStore
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """Unit vectors scattered around random centroids, roughly like chunk embeddings."""
+    centroids = rng.standard_normal((clusters, dim)).astype(np.float32)
+    assignment = rng.integers(0, clusters, size=n)
+    vectors = centroids[assignment] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build_store(directory: str, vectors: np.ndarray, quantization: str, rescore_factor: int) -> NumpyVectorStore:
+    store = NumpyVectorStore(directory, model="benchmark", quantization=quantization, rescore_factor=rescore_factor)
+    ids = [f"doc-{i}" for i in range(len(vectors))]
+    store.upsert(ids, vectors, ids, [{"chunk_id": cid} for cid in ids])
+    return store
+
+
+def run_queries(store: NumpyVectorStore, queries: np.ndarray, k: int):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        hits = store.similarity_search_by_vector_with_relevance_scores(query, k=k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([doc.metadata["chunk_id"] for doc, _ in hits])
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="int8 vs float32 vector search benchmark")
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--clusters", type=int, default=64)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore-factors", default="1,2,4,8")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = synthetic_vectors(args.vectors, args.dim, args.clusters, rng)
+    queries = synthetic_vectors(args.queries, args.dim, args.clusters, rng)
+
+    report = {"config": vars(args), "runs": []}
+    with tempfile.TemporaryDirectory() as workdir:
+        exact = build_store(os.path.join(workdir, "none"), vectors, "none", 1)
+        latencies, truth = run_queries(exact, queries, args.k)
+        configs = [("none", 1, exact, latencies, truth)]
+
+        for factor in (int(f) for f in args.rescore_factors.split(",")):
+            store = build_store(os.path.join(workdir, f"int8-{factor}"), vectors, "int8", factor)
+            latencies, results = run_queries(store, queries, args.k)
+            configs.append(("int8", factor, store, latencies, results))
+
+        for quantization, factor, store, latencies, results in configs:
+            recall = np.mean([len(set(r) & set(t)) / len(t) for r, t in zip(results, truth)])
+            report["runs"].append({
+                "quantization": quantization,
+                "rescore_factor": factor,
+                f"recall@{args.k}": round(float(recall), 4),
+                "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+                "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+                "bytes_per_vector": store.bytes_per_vector(),
+            })
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# pdf_tool retrieval benchmark on a synthetic product-catalogue corpus.
+# Every configuration (corpus size x vector backend) runs in its own process
+# with a fresh temporary VECTOR_DIR: synthetic PDFs go through upload_pdf and
+# the ingestion workers, then labelled queries run through
+# retrieve_pdf_chunks (vector + BM25 fusion, no LLM call).
+#
+# Embeddings default to the deterministic `hashing` provider, so no embedding or
+# LLM call is made; the OpenAI clients the app builds at import time get a
+# placeholder key when none is set. A reachable MySQL database is required
+# (config.database connects on import): uploaded rows are written to it and
+# removed afterwards, so point DB_NAME at a scratch database.
+#   python benchmarks/retrieval_benchmark.py --scales 10,50,200 --backends chroma,numpy --output report.json
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, 'src'))
+
+RESULT_MARKER = "BENCHMARK_RESULT "
+RECALL_AT = (1, 3, 5, 10)
+
+COLORS = ["red", "blue", "green", "black", "white", "silver", "amber", "teal", "violet", "ivory", "copper", "olive"]
+MATERIALS = ["oak", "steel", "leather", "ceramic", "linen", "bamboo", "glass", "wool", "marble", "canvas", "walnut", "brass"]
+PRODUCTS = ["lamp", "chair", "backpack", "kettle", "desk", "blanket", "mug", "bookshelf", "clock", "rug", "stool", "vase"]
+FEATURES = ["a two-year warranty", "free assembly", "a matte finish", "a water-resistant coating",
+            "a detachable strap", "a recycled frame", "an adjustable height", "a soft-close hinge"]
+
+
+# -------------------- Corpus --------------------
+def build_catalogue(docs: int, products_per_doc: int, seed: int):
+    """Unique products spread across `docs` catalogues; each product is a labelled fact."""
+    rng = random.Random(seed)
+    combos = [(c, m, p) for c in COLORS for m in MATERIALS for p in PRODUCTS]
+    rng.shuffle(combos)
+    catalogue = []
+    for d in range(docs):
+        filename = f"catalogue-{d:05d}.pdf"
+        items = []
+        for i in range(products_per_doc):
+            n = d * products_per_doc + i
+            color, material, product = combos[n % len(combos)]
+            # Attribute combos repeat once the corpus outgrows them; the SKU stays unique
+            items.append({
+                "sku": f"{chr(65 + n % 26)}{chr(65 + (n // 26) % 26)}-{10000 + n}",
+                "color": color,
+                "material": material,
+                "product": product,
+                "price": round(rng.uniform(5, 900), 2),
+                "stock": rng.randint(0, 500),
+                "feature": rng.choice(FEATURES),
+                "source": filename,
+                "unique_attributes": n < len(combos),
+            })
+        catalogue.append((filename, items))
+    return catalogue
+
+
+def product_paragraph(item) -> str:
+    return (
+        f"Product {item['sku']}: the {item['color']} {item['material']} {item['product']} "
+        f"is priced at ${item['price']} with {item['stock']} units in stock. "
+        f"It comes with {item['feature']}."
+    )
+
+
+def render_pdf(items, products_per_page: int = 8) -> bytes:
+    import fitz  # PyMuPDF, already required by the PDF loader
+
+    pdf = fitz.open()
+    for start in range(0, len(items), products_per_page):
+        page = pdf.new_page()
+        text = "\n\n".join(product_paragraph(item) for item in items[start:start + products_per_page])
+        page.insert_textbox(fitz.Rect(50, 50, 545, 790), text, fontsize=10)
+    data = pdf.tobytes()
+    pdf.close()
+    return data
+
+
+def build_queries(catalogue, count: int, seed: int):
+    """Half exact-SKU lookups, half paraphrased attribute questions (lexically ambiguous)."""
+    rng = random.Random(seed + 1)
+    items = [item for _, doc_items in catalogue for item in doc_items]
+    queries = []
+    for i, item in enumerate(rng.sample(items, min(count, len(items)))):
+        if i % 2 == 0 or not item["unique_attributes"]:
+            text, kind = f"How many units of {item['sku']} are in stock?", "sku"
+        else:
+            text, kind = f"What does the {item['color']} {item['material']} {item['product']} cost?", "attributes"
+        queries.append({"query": text, "kind": kind, "sku": item["sku"], "source": item["source"]})
+    return queries
+
+
+# -------------------- Worker (one configuration) --------------------
+async def ingest(catalogue, batch_size: int):
+    from io import BytesIO
+    from starlette.datastructures import UploadFile
+    from controllers.documentController import upload_pdf
+    from utils.ingestionQueue import get_ingestion_job
+
+    doc_ids, chunks = [], 0
+    for start in range(0, len(catalogue), batch_size):
+        files = [UploadFile(file=BytesIO(render_pdf(items)), filename=name) for name, items in catalogue[start:start + batch_size]]
+        response = await upload_pdf(files, db=None)
+        job_ids = [r["job_id"] for r in json.loads(response.body)["results"] if "job_id" in r]
+        while True:
+            jobs = [get_ingestion_job(job_id) for job_id in job_ids]
+            if all(job.status in ("completed", "failed") for job in jobs):
+                break
+            await asyncio.sleep(0.05)
+        for job in jobs:
+            if job.status == "failed":
+                raise RuntimeError(f"Ingestion of {job.filename} failed: {job.error}")
+            doc_ids.append(job.result["doc_id"])
+            chunks += job.result["chunks_added"]
+    return doc_ids, chunks
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def directory_mb(path: str) -> float:
+    total = 0
+    for dirpath, _dirs, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(dirpath, f)) for f in files)
+    return round(total / (1024 * 1024), 2)
+
+
+def remove_uploaded_rows(vector_dir: str):
+    from config.database import SessionLocal
+    from services.documentService import fetch_all_uploaded_pdfs, delete_document_from_db
+
+    db = SessionLocal()
+    try:
+        prefix = os.path.abspath(vector_dir)
+        for row in fetch_all_uploaded_pdfs(db):
+            if os.path.abspath(row["vector_path"]).startswith(prefix):
+                delete_document_from_db(db, row["id"])
+    finally:
+        db.close()
+
+
+def run_worker(args):
+    from config.settings import VECTOR_DIR, VECTOR_BACKEND, VECTOR_QUANTIZATION
+    from utils.embeddingProvider import embedding_model_name
+    from tools.toolmanager import embed_query_cached, retrieve_pdf_chunks
+
+    catalogue = build_catalogue(args.docs, args.products_per_doc, args.seed)
+    queries = build_queries(catalogue, args.queries, args.seed)
+
+    try:
+        start = time.perf_counter()
+        doc_ids, chunks = asyncio.run(ingest(catalogue, args.batch_size))
+        ingest_seconds = time.perf_counter() - start
+        vector_paths = [os.path.join(VECTOR_DIR, doc_id) for doc_id in doc_ids]
+
+        retrieve_pdf_chunks(queries[0]["query"], embed_query_cached(queries[0]["query"]), vector_paths)  # warm-up
+        latencies, hits, by_kind = [], {k: 0 for k in RECALL_AT}, {}
+        for q in queries:
+            start = time.perf_counter()
+            ranked = retrieve_pdf_chunks(q["query"], embed_query_cached(q["query"]), vector_paths)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            first_hit = next((rank for rank, (doc, _s) in enumerate(ranked, 1) if q["sku"] in doc.page_content), None)
+            kind = by_kind.setdefault(q["kind"], {"queries": 0, "hits@5": 0})
+            kind["queries"] += 1
+            for k in RECALL_AT:
+                if first_hit is not None and first_hit <= k:
+                    hits[k] += 1
+            if first_hit is not None and first_hit <= 5:
+                kind["hits@5"] += 1
+    finally:
+        remove_uploaded_rows(VECTOR_DIR)
+
+    result = {
+        "docs": args.docs,
+        "chunks": chunks,
+        "vector_backend": VECTOR_BACKEND,
+        "quantization": VECTOR_QUANTIZATION,
+        "embedding_model": embedding_model_name(),
+        "queries": len(queries),
+        "ingest_seconds": round(ingest_seconds, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "max": round(max(latencies), 2),
+        },
+        **{f"recall@{k}": round(hits[k] / len(queries), 4) for k in RECALL_AT},
+        "recall@5_by_kind": {name: round(v["hits@5"] / v["queries"], 4) for name, v in by_kind.items()},
+        "peak_rss_mb": peak_rss_mb(),
+        "index_disk_mb": directory_mb(VECTOR_DIR),
+    }
+    print(RESULT_MARKER + json.dumps(result))
+
+
+# -------------------- Driver --------------------
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def run_configuration(args, docs: int, backend: str) -> dict:
+    with tempfile.TemporaryDirectory(prefix="retrieval-bench-") as workdir:
+        vector_dir = os.path.join(workdir, "vectors")
+        env = dict(
+            os.environ,
+            VECTOR_DIR=vector_dir,
+            VECTOR_BACKEND=backend,
+            EMBEDDING_PROVIDER=args.embedding_provider,
+            EMBEDDING_CACHE_PATH=os.path.join(workdir, "embedding_cache.sqlite3"),
+            INGEST_QUEUE_SIZE=str(args.batch_size),
+            INGEST_JOB_HISTORY=str(docs + args.batch_size),
+        )
+        if args.embedding_provider != "openai":
+            # OpenAI() refuses to construct without a key, even though nothing calls it here
+            env.setdefault("OPENAI_API_KEY", "unused-by-benchmark")
+        command = [
+            sys.executable, os.path.abspath(__file__), "--worker",
+            "--docs", str(docs),
+            "--products-per-doc", str(args.products_per_doc),
+            "--queries", str(args.queries),
+            "--batch-size", str(args.batch_size),
+            "--seed", str(args.seed),
+        ]
+        # Uploads write their temp files to the working directory
+        proc = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+        for line in proc.stdout.splitlines():
+            if line.startswith(RESULT_MARKER):
+                return json.loads(line[len(RESULT_MARKER):])
+        raise RuntimeError(f"{backend}/{docs} docs failed:\n{proc.stdout[-2000:]}\n{proc.stderr[-4000:]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pdf_tool retrieval benchmark")
+    parser.add_argument("--scales", default="10,50,200", help="comma-separated document counts")
+    parser.add_argument("--backends", default="chroma,numpy")
+    parser.add_argument("--products-per-doc", type=int, default=24)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--embedding-provider", default="hashing")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--output", help="write the JSON report here as well as stdout")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--docs", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    report = {"revision": git_revision(), "config": {k: v for k, v in vars(args).items() if k not in ("worker", "docs", "output")}, "runs": []}
+    for backend in args.backends.split(","):
+        for docs in (int(s) for s in args.scales.split(",")):
+            print(f"▶️ {backend}: {docs} documents", file=sys.stderr)
+            report["runs"].append(run_configuration(args, docs, backend))
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,45 @@
 import os
 import json
+import time
 import asyncio
 from contextlib import AsyncExitStack
+from datetime import timedelta
+from typing import Dict, List, Optional
 from mcp import ClientSession, StdioServerParameters
+from mcp import types as mcp_types
 from mcp.client.stdio import stdio_client
 
+# Seconds a cached tool catalog is served before a background refresh
+MCP_TOOLS_TTL = float(os.getenv("MCP_TOOLS_TTL", "300"))
+# Seconds one server gets to start and finish the initialize handshake
+MCP_CONNECT_TIMEOUT = float(os.getenv("MCP_CONNECT_TIMEOUT", "30"))
+
 class MCPClient:
     def __init__(self):
         self.sessions = {}
         self.exit_stack = AsyncExitStack()
         self.config = None
         self._initialized = False
+        # Cached tools/list results: server -> tools, plus tool name -> server
+        self._catalog: Dict[str, List[dict]] = {}
+        self._tool_index: Dict[str, str] = {}
+        self.collisions: Dict[str, List[str]] = {}
+        self._catalog_at = 0.0
+        self._miss_refresh_at = 0.0
+        # Bumped whenever the cached tool lists change, so consumers can skip re-hashing them
+        self.catalog_version = 0
+        self._refresh_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def _message_handler(self, server_name: str):
+        """Session callback: a tools/list_changed notification triggers a catalog refresh."""
+        async def handle(message):
+            if isinstance(message, mcp_types.ServerNotification) and isinstance(
+                message.root, mcp_types.ToolListChangedNotification
+            ):
+                print(f"[MCP] {server_name} tool list changed, refreshing catalog")
+                self._schedule_refresh()
+        return handle
 
     async def connect_all(self):
         if self._initialized:
@@ -38,16 +67,16 @@ class MCPClient:
                 # Add timeout to prevent hanging
                 stdio_transport = await asyncio.wait_for(
                     self.exit_stack.enter_async_context(stdio_client(server_params)),
-                    timeout=300.0
+                    timeout=MCP_CONNECT_TIMEOUT
                 )
                 stdio, write = stdio_transport
-                session = await self.exit_stack.enter_async_context(ClientSession(stdio, write))
+                session = await self.exit_stack.enter_async_context(
+                    ClientSession(stdio, write, message_handler=self._message_handler(name))
+                )
 
-                await asyncio.wait_for(session.initialize(), timeout=300.0)
+                await asyncio.wait_for(session.initialize(), timeout=MCP_CONNECT_TIMEOUT)
                 self.sessions[name] = session
-
-                response = await asyncio.wait_for(session.list_tools(), timeout=10.0)
-                print(f"[OK] {name} tools:", [tool.name for tool in response.tools])
+                print(f"[OK] {name} connected")
             except asyncio.TimeoutError:
                 print(f"[ERROR] Timeout connecting to {name} (server not responding)")
                 continue
@@ -56,22 +85,86 @@ class MCPClient:
                 continue
             
         self._initialized = True
+        await self.refresh_tools()
         print("\n[SUCCESS] All servers connected successfully!")
-    async def get_all_tools(self):
+
+    async def _list_server_tools(self, server_name: str, session) -> List[dict]:
+        response = await asyncio.wait_for(session.list_tools(), timeout=10.0)
+        return [{
+            "name": tool.name,
+            "description": tool.description,
+            "inputSchema": tool.inputSchema
+        } for tool in response.tools]
+
+    async def refresh_tools(self) -> Dict[str, List[dict]]:
+        """Re-list every server's tools (concurrently) and rebuild the name -> server index."""
+        async with self._refresh_lock:
+            names = list(self.sessions)
+            results = await asyncio.gather(
+                *(self._list_server_tools(name, self.sessions[name]) for name in names),
+                return_exceptions=True,
+            )
+            catalog = {}
+            for name, result in zip(names, results):
+                if isinstance(result, Exception):
+                    print(f"[ERROR] Failed to list tools from {name}: {result}")
+                    # Keep serving what we had for this server
+                    catalog[name] = self._catalog.get(name, [])
+                else:
+                    catalog[name] = result
+                    print(f"[OK] {name} tools:", [tool["name"] for tool in result])
+
+            index, collisions = {}, {}
+            for server_name in names:  # config order: the first server to declare a name owns it
+                for tool in catalog[server_name]:
+                    owner = index.setdefault(tool["name"], server_name)
+                    if owner != server_name:
+                        collisions.setdefault(tool["name"], [owner]).append(server_name)
+            for tool_name, servers in collisions.items():
+                print(f"[WARNING] MCP tool '{tool_name}' is defined by {servers}; routing to {servers[0]}")
+
+            if catalog != self._catalog:
+                self.catalog_version += 1
+            self._catalog, self._tool_index, self.collisions = catalog, index, collisions
+            self._catalog_at = time.monotonic()
+            print(f"[MCP] catalog: {len(index)} tools from {len(names)} servers")
+            return catalog
+
+    def _schedule_refresh(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh_tools())
+
+    def _catalog_stale(self) -> bool:
+        return time.monotonic() - self._catalog_at > MCP_TOOLS_TTL
+
+    async def get_all_tools(self, force_refresh: bool = False):
+        """
+        Cached tool lists per server. Past the TTL the cached lists are still
+        returned while a refresh runs in the background.
+        """
         if not self._initialized:
             await self.connect_all()
 
-        all_tools = {}
-        for server_name, session in self.sessions.items():
-            response = await session.list_tools()
-            all_tools[server_name] = [{
-                "name": tool.name,
-                "description": tool.description,
-                "inputSchema": tool.inputSchema
-            } for tool in response.tools]
-        return all_tools
-
-    async def call_tool(self, server_name: str, tool_name: str, arguments: dict):
+        if force_refresh or not self._catalog_at:
+            await self.refresh_tools()
+        elif self._catalog_stale():
+            self._schedule_refresh()
+        return self._catalog
+
+    async def find_server(self, tool_name: str) -> Optional[str]:
+        """
+        Server that owns `tool_name` (O(1)). An unknown name triggers a refresh in
+        case the tool is new, but at most one such refresh per TTL window.
+        """
+        await self.get_all_tools()
+        server_name = self._tool_index.get(tool_name)
+        if server_name is None and self.sessions and time.monotonic() - self._miss_refresh_at > MCP_TOOLS_TTL:
+            self._miss_refresh_at = time.monotonic()  # before awaiting, so concurrent misses don't all refresh
+            await self.refresh_tools()
+            server_name = self._tool_index.get(tool_name)
+        return server_name
+
+    async def call_tool(self, server_name: str, tool_name: str, arguments: dict, timeout: Optional[float] = None):
         if not self._initialized:
             await self.connect_all()
  
@@ -79,7 +172,9 @@ class MCPClient:
         if not session:
             raise ValueError(f"Server '{server_name}' not found. Available servers: {list(self.sessions.keys())}")
         
-        result = await session.call_tool(tool_name, arguments)
+        # The session abandons the request itself once the caller's time is up
+        read_timeout = timedelta(seconds=timeout) if timeout else None
+        result = await session.call_tool(tool_name, arguments, read_timeout_seconds=read_timeout)
         return result.content
     
     async def format_info(self):
@@ -88,32 +183,39 @@ class MCPClient:
             await self.connect_all()
 
         formatted_tools = []
-        for server_name, session in self.sessions.items():
-            try:
-                response = await session.list_tools()
-                for tool in response.tools:
-                    tool_name = getattr(tool, "name", "Unknown")
-                    description = getattr(tool, "description", "No description available")
-                    description = description.replace("\n", " ").replace("  ", " ").strip()
-                    formatted_tools.append({
-                        "name": tool_name,
-                        "description": description or "No description available"
-                    })
-            except Exception as e:
-                print(f"[ERROR] Failed to get tools from {server_name}: {e}")
-                continue
+        for server_name, tools in (await self.get_all_tools()).items():
+            for tool in tools:
+                description = tool.get("description") or "No description available"
+                description = description.replace("\n", " ").replace("  ", " ").strip()
+                formatted_tools.append({
+                    "name": tool.get("name", "Unknown"),
+                    "description": description or "No description available"
+                })
 
         return formatted_tools
 
    
+    def catalog_stats(self) -> dict:
+        return {
+            "servers": len(self.sessions),
+            "tools": len(self._tool_index),
+            "collisions": self.collisions,
+            "age_seconds": round(time.monotonic() - self._catalog_at, 1) if self._catalog_at else None,
+            "ttl_seconds": MCP_TOOLS_TTL,
+        }
+
     async def cleanup(self):
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
         await self.exit_stack.aclose()
         self._initialized = False
+        self._catalog, self._tool_index, self._catalog_at, self._miss_refresh_at = {}, {}, 0.0, 0.0
+        self.catalog_version += 1
 
 mcp_client = MCPClient()
 
-async def call_mcp_tool(server_name: str, tool_name: str, arguments: dict):
-    return await mcp_client.call_tool(server_name, tool_name, arguments)
+async def call_mcp_tool(server_name: str, tool_name: str, arguments: dict, timeout: Optional[float] = None):
+    return await mcp_client.call_tool(server_name, tool_name, arguments, timeout=timeout)
 
 # if __name__ == "__main__":
 #     async def main():
@@ -7,6 +7,7 @@ load_dotenv()
 # API Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+TOKENIZER_MODEL = "gpt-4o-mini"  # tiktoken model (o200k_base) every token budget is counted with
 MAX_TOKENS = int(os.getenv("MAX_TOKENS", "1000"))
 TEMPERATURE = float(os.getenv("TEMPERATURE", "0.2"))
 
@@ -15,17 +16,97 @@ MAX_ITERATIONS = int(os.getenv("MAX_ITERATIONS", "10"))
 MAX_HISTORY_MESSAGES = int(os.getenv("MAX_HISTORY_MESSAGES", "8"))
 MAX_RETRY_ATTEMPTS = int(os.getenv("MAX_RETRY_ATTEMPTS", "3"))
 RETRY_DELAY = int(os.getenv("RETRY_DELAY", "2"))
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))  # in-flight Gemini calls per process
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "60"))  # seconds per Gemini call
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1200"))  # cap on the history turns sent per request
+HISTORY_SUMMARY_TOKENS = int(os.getenv("HISTORY_SUMMARY_TOKENS", "300"))  # cap on the rolling summary
+HISTORY_COMPACT_TURNS = int(os.getenv("HISTORY_COMPACT_TURNS", "6"))  # old turns per summary call
+HISTORY_COMPACT_TOKENS = int(os.getenv("HISTORY_COMPACT_TOKENS", "600"))  # ...or this many tokens of them
+
+# Gemini Context Cache Configuration
+# "off": static prefix only (implicit caching), "explicit": client.caches cached content,
+# "local": in-process stand-in for tests and offline runs
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "off").lower()
+GEMINI_CACHE_TTL = int(os.getenv("GEMINI_CACHE_TTL", "3600"))  # seconds a cached prefix lives
+
+# Tool Execution Configuration
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "8"))  # threads for sync tools (weather, pdf, email)
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "30"))  # default seconds per tool call
+# Per-tool overrides, e.g. "weather_tool=10,pdf_tool=60"
+TOOL_TIMEOUTS = {
+    name.strip(): float(seconds)
+    for name, seconds in (
+        item.split("=", 1) for item in os.getenv("TOOL_TIMEOUTS", "weather_tool=15,pdf_tool=60").split(",") if "=" in item
+    )
+}
+TOOL_CACHE_SIZE = int(os.getenv("TOOL_CACHE_SIZE", "512"))  # cached tool results kept
+# Result TTL in seconds per tool, e.g. "weather_tool=600,pdf_tool=300"; 0 disables.
+# send_email_tool is never cached, whatever this says.
+TOOL_CACHE_TTLS = {
+    name.strip(): float(seconds)
+    for name, seconds in (
+        item.split("=", 1) for item in os.getenv("TOOL_CACHE_TTLS", "weather_tool=600,pdf_tool=300").split(",") if "=" in item
+    )
+}
+
+# Request Deadline Configuration
+REQUEST_BUDGET = float(os.getenv("REQUEST_BUDGET", "60"))  # seconds to answer one message, tools included
+# Per-channel overrides, e.g. "web=45,telegram=90,whatsapp=90"
+REQUEST_BUDGETS = {
+    name.strip(): float(seconds)
+    for name, seconds in (
+        item.split("=", 1) for item in os.getenv("REQUEST_BUDGETS", "web=45,telegram=90,whatsapp=90").split(",") if "=" in item
+    )
+}
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))  # cap for one outbound HTTP request
 
 # Memory Configuration
 MEM0_KEY = os.getenv("MEM0_KEY")
 MAX_MEMORY_ITEMS = int(os.getenv("MAX_MEMORY_ITEMS", "5"))
+MEMORY_QUEUE_SIZE = int(os.getenv("MEMORY_QUEUE_SIZE", "256"))
+MEMORY_BATCH_SIZE = int(os.getenv("MEMORY_BATCH_SIZE", "8"))  # user turns per extraction call
+MEMORY_BATCH_WAIT = float(os.getenv("MEMORY_BATCH_WAIT", "2"))  # seconds to wait for a batch to fill
 
 # Vector Store Configuration
-VECTOR_SEARCH_K = int(os.getenv("VECTOR_SEARCH_K", "3"))
-MAX_CONTEXT_DOCS = int(os.getenv("MAX_CONTEXT_DOCS", "5"))
+VECTOR_DIR = os.getenv("VECTOR_DIR", "./chroma_vectors")
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()  # chroma | numpy
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none").lower()  # none | int8 (numpy backend)
+VECTOR_RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", "4"))
+EXPORT_DOCUMENT_STORES = os.getenv("EXPORT_DOCUMENT_STORES", "false").lower() == "true"
+MAX_CONTEXT_DOCS = int(os.getenv("MAX_CONTEXT_DOCS", "5"))  # most chunks packed into the pdf_tool context
+# Minimum cosine similarity for a vector hit; unset = the embedding model's default (see embeddingProvider)
+VECTOR_SCORE_THRESHOLD = float(os.getenv("VECTOR_SCORE_THRESHOLD")) if os.getenv("VECTOR_SCORE_THRESHOLD") else None
+VECTOR_SEARCH_WORKERS = int(os.getenv("VECTOR_SEARCH_WORKERS", "8"))
+VECTOR_SEARCH_TIMEOUT = float(os.getenv("VECTOR_SEARCH_TIMEOUT", "5"))
+VECTOR_STORE_CACHE_SIZE = int(os.getenv("VECTOR_STORE_CACHE_SIZE", "32"))
+VECTOR_STORE_WARM_COUNT = int(os.getenv("VECTOR_STORE_WARM_COUNT", "8"))
+PDF_CONTEXT_TOKENS = int(os.getenv("PDF_CONTEXT_TOKENS", "1500"))  # token budget for pdf_tool context
+PDF_CONTEXT_CANDIDATES = int(os.getenv("PDF_CONTEXT_CANDIDATES", "12"))  # chunks taken from each ranking (vector, BM25) and offered to the packer
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "256"))
+
+# Semantic Answer Cache Configuration
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))
 
 # SMTP Configuration
 SMTP_SERVER = os.getenv("SMTP_SERVER")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+
+# Ingestion Configuration
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "200"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+# Embedding Provider Configuration
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai").lower()  # openai | onnx | hashing
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+LOCAL_EMBEDDING_MODEL_DIR = os.getenv("LOCAL_EMBEDDING_MODEL_DIR", "./models/all-MiniLM-L6-v2")
+LOCAL_EMBEDDING_DIM = int(os.getenv("LOCAL_EMBEDDING_DIM", "384"))
+
+# Embedding Cache Configuration
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./chroma_vectors/embedding_cache.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
@@ -1,13 +1,16 @@
 from validations.schemas import MessageIn
 import os
+import json
 from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings
+from utils.embeddingProvider import get_embedding_provider
 from utils.toolSchema import tools_schema
 import datetime
 from typing import Dict, Any
 from openai import OpenAI
 from utils.toolAgent import ToolAgent
 from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from config.database import SessionLocal
 from utils.createSession import (
     updated_sessions,
     store_message_db,
@@ -16,7 +19,7 @@ from utils.createSession import (
 load_dotenv()
 sessions: Dict[str, Dict[str, Any]] = {}
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+embeddings = get_embedding_provider()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 # client = OpenAI(api_key=OPENAI_API_KEY)
@@ -170,15 +173,19 @@ client = genai.Client(api_key=GEMINI_API_KEY)
 
 # ---------------- Ask in session ----------------
 
+def _ensure_session(session_id: str):
+    if session_id not in sessions:
+        sessions[session_id] = {
+            "id": session_id,
+            "name": "Auto-created session",
+            "created_at": datetime.datetime.utcnow().isoformat(),
+            "messages": [],
+        }
+
+
 async def ask_in_session(session_id: str, data: "MessageIn",db: Session) -> str:
     try:
-        if session_id not in sessions:
-            sessions[session_id] = {
-                "id": session_id,
-                "name": "Auto-created session",
-                "created_at": datetime.datetime.utcnow().isoformat(),
-                "messages": [],
-            }
+        _ensure_session(session_id)
 
         updated_sessions(session_id, "user", data.question)
         store_message_db(session_id, "user", data.question)
@@ -194,3 +201,39 @@ async def ask_in_session(session_id: str, data: "MessageIn",db: Session) -> str:
     except Exception as e:
         print("Error in ask_in_session:", e)
         return "Error processing the request."
+
+
+# ---------------- Ask in session (streaming) ----------------
+
+def _sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+async def ask_in_session_stream(session_id: str, data: "MessageIn") -> StreamingResponse:
+    """
+    Server-Sent Events version of ask_in_session: text deltas and tool progress
+    are pushed as they happen; the agent persists the final message.
+    """
+    _ensure_session(session_id)
+    updated_sessions(session_id, "user", data.question)
+    store_message_db(session_id, "user", data.question)
+
+    async def event_stream():
+        # Own DB session: the request-scoped one is closed before streaming ends
+        db = SessionLocal()
+        try:
+            agent = ToolAgent(session_id, client, tools_schema, db)
+            conversation_history = sessions.get(session_id, {}).get("messages", [])
+            async for event in agent.stream_task(data.question, conversation_history, "action"):
+                yield _sse(event)
+        except Exception as e:
+            print("Error in ask_in_session_stream:", e)
+            yield _sse({"type": "error", "message": "Error processing the request."})
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -2,7 +2,10 @@ from fastapi import File, UploadFile
 from typing import Dict, Any, Optional
 import os
 import uuid
+import shutil
 import asyncio
+import functools
+import threading
 from dotenv import load_dotenv
 from services.documentService import (
     insert_uploaded_pdf,
@@ -15,11 +18,25 @@ from fastapi.responses import JSONResponse
 from langchain_community.document_loaders import PyMuPDFLoader
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import OpenAIEmbeddings
 
 from sqlalchemy.orm import Session
+from config.database import SessionLocal
+from config.settings import EMBED_BATCH_SIZE, EXPORT_DOCUMENT_STORES, VECTOR_DIR
 from tools.toolmanager import refresh_vector_database
+from utils.embeddingProvider import get_embedding_provider
+from utils.vectorIndex import (
+    add_document_chunks,
+    delete_document_chunks,
+    document_id_for,
+    mark_migrated,
+    write_vectors,
+)
+from utils.lexicalIndex import build_segment, get_lexical_index
+from utils.ingestionQueue import (
+    IngestionJob,
+    submit_ingestion_job,
+    get_ingestion_job,
+)
 
 load_dotenv()  # Load environment variables
 
@@ -29,11 +46,13 @@ default_vectorstore: Optional[Any] = None
 global_vectorstore = None
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+embeddings = get_embedding_provider()
 
-VECTOR_DIR = "./chroma_vectors"  # chroma vectorstore directory
 os.makedirs(VECTOR_DIR, exist_ok=True)
 
+# Serialises writes to the shared Chroma stores across ingestion workers
+_index_lock = threading.Lock()
+
 
 # async def upload_pdf(files: list[UploadFile] = File(...)):
 #     print("Uploading PDFs...")
@@ -131,65 +150,111 @@ os.makedirs(VECTOR_DIR, exist_ok=True)
 #             results.append({"filename": file.filename, "error": str(e)})
 #     return {"results": results}
 
+def _clean_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Chroma only accepts scalar, non-null metadata values."""
+    return {k: v for k, v in metadata.items() if isinstance(v, (str, int, float, bool))}
+
+
+def _ingest_pdf(job: IngestionJob, temp_filename: str, filename: str) -> Dict[str, Any]:
+    """Run parsing, chunking, embedding and indexing for one PDF on an ingestion worker."""
+    db = SessionLocal()
+    try:
+        # 1️⃣ Parsing
+        job.start_stage("parsing")
+        loader = PyMuPDFLoader(temp_filename)
+        documents = loader.load()
+        if not documents or all(not doc.page_content.strip() for doc in documents):
+            raise ValueError("No extractable text found in the PDF.")
+        job.finish_stage("parsing", pages=len(documents))
+
+        # 2️⃣ Chunking
+        job.start_stage("chunking")
+        splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+        chunks = splitter.split_documents(documents)
+        doc_id = f"{uuid.uuid4()}"
+        texts = [chunk.page_content for chunk in chunks]
+        ids = [f"{doc_id}-{i}" for i in range(len(chunks))]
+        metadatas = [
+            {**_clean_metadata(chunk.metadata), "source": filename, "doc_id": doc_id, "chunk_id": chunk_id}
+            for chunk, chunk_id in zip(chunks, ids)
+        ]
+        # BM25 term statistics are built here and committed with the vectors
+        lexical_segment = build_segment(doc_id, ids, texts, metadatas)
+        job.finish_stage("chunking", chunks=len(chunks))
+
+        # 3️⃣ Embedding (once per batch, shared by every target store)
+        job.start_stage("embedding", total=len(texts))
+        vectors = []
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            vectors.extend(embeddings.embed_documents(texts[start:start + EMBED_BATCH_SIZE]))
+            job.update_stage("embedding", len(vectors))
+        job.finish_stage("embedding")
+
+        # 4️⃣ Indexing (one unified collection; per-document store only as an export)
+        vector_file_path = os.path.join(VECTOR_DIR, doc_id)
+
+        job.start_stage("indexing", total=2 if EXPORT_DOCUMENT_STORES else 1)
+        with _index_lock:
+            add_document_chunks(ids, vectors, texts, metadatas)
+            get_lexical_index().add_segment(lexical_segment)
+            job.update_stage("indexing", 1)
+            if EXPORT_DOCUMENT_STORES:
+                write_vectors(vector_file_path, ids, vectors, texts, metadatas)
+                mark_migrated(vector_file_path)
+        insert_uploaded_pdf(db, filename, vector_file_path)
+        refresh_vector_database([vector_file_path])
+        job.finish_stage("indexing", doc_id=doc_id)
+
+        # The export store reuses the vectors instead of re-embedding every chunk
+        embeddings_avoided = len(texts) if EXPORT_DOCUMENT_STORES else 0
+        return {
+            "filename": filename,
+            "doc_id": doc_id,
+            "chunks_added": len(chunks),
+            "embeddings_computed": len(vectors),
+            "embeddings_avoided": embeddings_avoided,
+        }
+    finally:
+        db.close()
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+
+
 async def upload_pdf(files: list[UploadFile], db: Session):
+    """
+    Queue each uploaded PDF for background ingestion and return job ids right away.
+    Progress is available from GET /documents/jobs/{job_id}.
+    """
     print("Uploading PDFs...")
     results = []
-    global global_vectorstore
 
     for file in files:
+        temp_filename = f"{uuid.uuid4()}.pdf"
         try:
-            temp_filename = f"{uuid.uuid4()}.pdf"
             with open(temp_filename, "wb") as f:
                 f.write(await file.read())
 
-            loader = PyMuPDFLoader(temp_filename)
-            documents = loader.load()
-            os.remove(temp_filename)
-
-            if not documents or all(not doc.page_content.strip() for doc in documents):
-                results.append({
-                    "filename": file.filename,
-                    "error": "No extractable text found in the PDF.",
-                })
-                continue
-
-            splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-            chunks = splitter.split_documents(documents)
-            for chunk in chunks:
-                chunk.metadata["source"] = file.filename
-
-            # Update global vectorstore
-            if global_vectorstore is None:
-                global_vectorstore = Chroma.from_documents(
-                    documents=chunks,
-                    embedding=embeddings,
-                    persist_directory=os.path.join(VECTOR_DIR, "global"),
-                )
-            else:
-                global_vectorstore.add_documents(chunks)
-                global_vectorstore.persist()
-
-            # Create per-file vector store
-            vector_file_name = f"{uuid.uuid4()}"
-            vector_file_path = os.path.join(VECTOR_DIR, vector_file_name)
-            pdf_vectorstore = Chroma.from_documents(
-                documents=chunks,
-                embedding=embeddings,
-                persist_directory=vector_file_path,
+            job = submit_ingestion_job(
+                file.filename,
+                functools.partial(_ingest_pdf, temp_filename=temp_filename, filename=file.filename),
             )
-            pdf_vectorstore.persist()
-
-            # ✅ Insert into DB (now passing db)
-            insert_uploaded_pdf(db, file.filename, vector_file_path)
-
-            results.append({"filename": file.filename, "chunks_added": len(chunks)})
-
+            results.append({"filename": file.filename, "job_id": job.id, "status": job.status})
         except Exception as e:
+            # Includes IngestionQueueFull (the queue is only checked here, when the job is put on it)
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
             results.append({"filename": file.filename, "error": str(e)})
 
-    # ✅ Refresh vector cache after upload
-    refresh_vector_database()
-    return {"results": results}
+    if results and not any("job_id" in r for r in results):
+        return JSONResponse(status_code=429, content={"results": results})
+    return JSONResponse(status_code=202, content={"results": results})
+
+
+async def get_document_job(job_id: str):
+    job = get_ingestion_job(job_id)
+    if not job:
+        return JSONResponse(status_code=404, content={"error": f"No ingestion job with ID {job_id}"})
+    return job.to_dict()
 
 
 async def get_all_documents(db: Session):
@@ -211,7 +276,6 @@ async def get_all_documents(db: Session):
 
 
 async def delete_document_by_id(doc_id: int, db: Session):
-    global global_vectorstore
     try:
         vector_path = get_document_vector_path(db, doc_id)
         if not vector_path:
@@ -222,17 +286,15 @@ async def delete_document_by_id(doc_id: int, db: Session):
         if not deleted:
             return {"message": f"Failed to delete document ID {doc_id}"}
 
-        # Delete FAISS vector files from disk
-        for ext in [".faiss", ".pkl"]:
-            path = vector_path + ext
-            if os.path.exists(path):
-                os.remove(path)
+        # Drop its chunks from the unified index and any exported/legacy store
+        with _index_lock:
+            delete_document_chunks(document_id_for(vector_path))
+            get_lexical_index().remove_document(document_id_for(vector_path))
+        if os.path.isdir(vector_path):
+            shutil.rmtree(vector_path, ignore_errors=True)
 
-        # Optionally clear in-memory store
-        global_vectorstore = None
-        
         # ✅ Refresh vector cache after deletion
-        refresh_vector_database()
+        refresh_vector_database([vector_path], deleted=True)
 
         return {"message": f"Deleted document ID {doc_id} and associated vector files."}
 
@@ -83,7 +83,8 @@ async def handle_telegram_webhook(request: Request):
             session_id=chat_id,
             api_client=client,
             tools_schema=tools_schema,
-            db=db
+            db=db,
+            channel="telegram"
         )
 
         # 8️⃣ Ask AI to generate response
@@ -72,7 +72,8 @@ async def handle_whatsapp_webhook(request: Request):
                 session_id=chat_id,
                 api_client=client,
                 tools_schema=tools_schema,
-                db=db
+                db=db,
+                channel="whatsapp"
             )
 
             # 7️⃣ Generate AI response
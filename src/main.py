@@ -2,20 +2,75 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
 import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from config.database import Base, engine
+from config.settings import TOKENIZER_MODEL
 # from model.tableModel import UserMemory,ChatMessage,UploadedPDF,Product,Sessions
 
 from routes.route import router
+from tools.toolmanager import warm_vector_store_cache, save_vector_store_usage
+from utils.vectorstore_loader import load_global_vectorstore
+from utils.embeddingProvider import get_embedding_provider
+from utils.embeddingCache import get_embedding_cache
+from utils.createSession import get_encoding
+from utils.lexicalIndex import get_lexical_index
+from utils.ingestionQueue import start_ingestion_workers
+from utils.memoryWorker import start_memory_worker, drain_memory_queue
+from utils.toolCatalog import tool_catalog
+from utils.toolSchema import tools_schema
+from mcp_client import mcp_client
 
 # Load environment variables
 load_dotenv()
 
+
+async def _timed(name: str, coro):
+    """Await one startup component, logging how long it took; failures don't block startup."""
+    start = time.perf_counter()
+    try:
+        await coro
+        print(f"⏱️ [STARTUP] {name}: {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        print(f"❌ [STARTUP] {name} failed after {time.perf_counter() - start:.2f}s: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start = time.perf_counter()
+    start_ingestion_workers()
+    start_memory_worker()
+
+    # Blocking loaders run in threads while MCP servers connect
+    background = asyncio.gather(
+        _timed("embedding provider", asyncio.to_thread(get_embedding_provider)),
+        _timed("vector index", asyncio.to_thread(load_global_vectorstore)),
+        _timed("tokenizer", asyncio.to_thread(get_encoding, TOKENIZER_MODEL)),
+        _timed("lexical index", asyncio.to_thread(get_lexical_index)),
+    )
+    # MCP sessions are entered here so they're closed from the same task on shutdown
+    await _timed("mcp servers", mcp_client.connect_all())
+    await _timed("tool declarations", tool_catalog.get(tools_schema))
+    await background
+    warm_vector_store_cache()  # background thread; not awaited
+    print(f"✅ [STARTUP] ready in {time.perf_counter() - start:.2f}s")
+
+    yield
+
+    save_vector_store_usage()
+    get_embedding_cache().flush()
+    await drain_memory_queue()
+    await mcp_client.cleanup()
+
+
 # FastAPI app
-app = FastAPI(debug=True)
+app = FastAPI(debug=True, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -1,18 +1,8 @@
 from datetime import datetime
 
-async def build_tool_prompt(memory_text):
-    """
-    Returns a system prompt string for the multi-tool MCP assistant.
-    Improvements:
-    - Explicitly enforces sequential multi-tool calls for multi-task queries.
-    - Ensures one <thinking> + <use_mcp_tool> per subtask.
-    - Final <attempt_completion> is emitted only after *all* tasks are completed.
-    """
-
-    current_date = datetime.now().strftime("%Y-%m-%d")
-    current_time = datetime.now().strftime("%H:%M:%S")
-
-    prompt = f"""
+# Identical on every call so Gemini can reuse it (implicit prefix caching or an
+# explicit cached content); anything that changes per request goes in the suffix.
+TOOL_SYSTEM_PROMPT = """
 # SYSTEM: identity + metadata
 Assistant identity: Rouh — an emotionally-intelligent MCP assistant (human-like, friendly, concise).
 Purpose: Fulfill user requests using MCP tools; produce email-ready Markdown outputs.
@@ -23,11 +13,6 @@ For requests with multiple tasks:
 - If one task depends on another's result: call tools SEQUENTIALLY (wait for first result before calling next)
 - After receiving ALL tool results, provide final summary - DO NOT call any tools again
 
-Today's date: {current_date}  
-Current time: {current_time}
-
----
-
 ## Available Tools: weather_tool, pdf_tool, send_email_tool
 
 ---
@@ -66,4 +51,25 @@ Current time: {current_time}
 - Sequentially handle all subtasks before finalization.
 """
 
-    return prompt
\ No newline at end of file
+
+def build_tool_prompt() -> str:
+    """
+    Returns the static system prompt for the multi-tool MCP assistant.
+    - Explicitly enforces sequential multi-tool calls for multi-task queries.
+    - Final summary is given only after *all* tasks are completed.
+    """
+    return TOOL_SYSTEM_PROMPT
+
+
+def build_context_suffix(memory_text: str = "", summary: str = "") -> str:
+    """
+    Per-request context sent with the user turn, after the cached prefix:
+    date and time (to the minute), saved user facts and the conversation summary.
+    """
+    now = datetime.now()
+    lines = [f"Today's date: {now.strftime('%Y-%m-%d')}", f"Current time: {now.strftime('%H:%M')}"]
+    if memory_text:
+        lines.append(f"<user_memory>\n{memory_text}\n</user_memory>")
+    if summary:
+        lines.append(f"<conversation_summary>\n{summary}\n</conversation_summary>")
+    return "<context>\n" + "\n".join(lines) + "\n</context>"
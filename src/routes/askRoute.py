@@ -3,7 +3,7 @@ from validations.schemas import MessageIn
 from sqlalchemy.orm import Session
 from config.database import get_db
 from fastapi import Depends
-from controllers.askControllers import ask_in_session
+from controllers.askControllers import ask_in_session, ask_in_session_stream
 
 askRouter = APIRouter() 
 
@@ -19,3 +19,11 @@ async def ask_question_in_session(session_id: str, data: MessageIn,db: Session =
     """
     #  {"message":"Done Ask...",session_id: session_id, "question": data.q}
     return await ask_in_session(session_id, data,db)
+
+
+@askRouter.post("/{session_id}/stream")
+async def ask_question_in_session_stream(session_id: str, data: MessageIn):
+    """
+    Same as ask, streamed as Server-Sent Events (delta, tool_call, tool_result, done).
+    """
+    return await ask_in_session_stream(session_id, data)
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
 from sqlalchemy.orm import Session
 from config.database import get_db
-from controllers.documentController import upload_pdf,get_all_documents,delete_document_by_id
+from controllers.documentController import upload_pdf,get_all_documents,delete_document_by_id,get_document_job
 from services.documentService import insert_uploaded_pdf, fetch_all_uploaded_pdfs
 
 documentsRouter = APIRouter()
@@ -16,6 +16,13 @@ async def upload_pdfs(files: UploadFile = File(...),db: Session = Depends(get_db
 
     return await upload_pdf(files,db)
 
+@documentsRouter.get("/jobs/{job_id}")
+async def get_upload_job(job_id: str):
+    """
+    Report status and per-stage progress of a background ingestion job.
+    """
+    return await get_document_job(job_id)
+
 @documentsRouter.get("/all")
 async def get_pdfs(db: Session = Depends(get_db)):
     return await get_all_documents(db)
@@ -0,0 +1,30 @@
+from fastapi import APIRouter
+from utils.embeddingCache import get_embedding_cache
+from tools.toolmanager import query_embedding_cache_stats, vector_store_cache_stats, context_packer, tool_result_cache_stats
+from utils.semanticCache import answer_cache
+from utils.toolCatalog import tool_catalog
+from mcp_client import mcp_client
+from utils.memoryWorker import memory_worker_stats
+from utils.historyManager import history_manager
+from utils.promptCache import prompt_cache
+
+metricsRouter = APIRouter()
+
+@metricsRouter.get("/")
+async def get_metrics():
+    """
+    Cache and performance counters.
+    """
+    return {
+        "embedding_cache": get_embedding_cache().stats(),
+        "query_embedding_cache": query_embedding_cache_stats(),
+        "vector_store_cache": vector_store_cache_stats(),
+        "pdf_answer_cache": answer_cache.stats(),
+        "pdf_context": context_packer.stats(),
+        "tool_result_cache": tool_result_cache_stats(),
+        "tool_catalog": tool_catalog.stats(),
+        "mcp_catalog": mcp_client.catalog_stats(),
+        "memory_worker": memory_worker_stats(),
+        "history": history_manager.stats(),
+        "prompt_cache": prompt_cache.stats(),
+    }
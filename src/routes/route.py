@@ -7,6 +7,7 @@ from .usermemoryRoute import memoryRouter
 from .mcpRoute import router as mcpRouter
 from .telegramRoute import router as telegramRouter
 from .whatappRoute import router as whatsappRouter
+from .metricsRoute import metricsRouter
 
 from fastapi.templating import Jinja2Templates
 
@@ -34,6 +35,8 @@ router.include_router(telegramRouter, prefix="/telegram")
 
 router.include_router(whatsappRouter, prefix="/whatsapp")
 
+router.include_router(metricsRouter, prefix="/metrics")
+
 # Direct chat endpoint
 # from controllers.telegramController import handle_telegram_webhook
 
@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
 from model.tableModel import UserMemory
-from typing import List
+from typing import Dict, List
 
 def fetch_latest_memory(db: Session, k: int = 5) -> str:
     """
@@ -28,3 +28,25 @@ def save_memory(db: Session, field: str, value: str):
     db.commit()
     db.refresh(memory)
     print(f"✅ Saved memory: {field} = {value}")
+
+
+def save_memories(db: Session, facts: Dict[str, str]) -> int:
+    """
+    Upsert several memory facts with one lookup and a single commit.
+    Returns the number of facts written.
+    """
+    facts = {str(k): str(v) for k, v in (facts or {}).items() if k and v}
+    if not facts:
+        return 0
+    existing = {
+        row.field: row
+        for row in db.query(UserMemory).filter(UserMemory.field.in_(list(facts))).all()
+    }
+    for field, value in facts.items():
+        if field in existing:
+            existing[field].value = value
+        else:
+            db.add(UserMemory(field=field, value=value))
+    db.commit()
+    print(f"✅ Saved {len(facts)} memories: {', '.join(facts)}")
+    return len(facts)
@@ -1,5 +1,7 @@
-import json, os, inspect, datetime, requests
-from typing import Callable, Dict
+import json, os, re, inspect, datetime, threading, requests, asyncio, functools, contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
 from dotenv import load_dotenv
 
 from langchain_chroma import Chroma
@@ -8,7 +10,37 @@ from services.documentService import get_all_vector_paths
 from services.productService import save_product_db
 # from services.emailService import save_email_db
 
-from langchain_openai import OpenAIEmbeddings
+from utils.embeddingProvider import get_embedding_provider, embedding_model_name, score_threshold, LEGACY_EMBEDDING_MODEL
+from utils.vectorIndex import (
+    get_unified_index,
+    unified_distance_space,
+    distance_space,
+    document_filter,
+    legacy_store_paths,
+    search_stores,
+    reciprocal_rank_fusion,
+)
+from utils.lexicalIndex import get_lexical_index
+from utils.semanticCache import answer_cache, identifier_terms
+from utils.vectorStoreCache import VectorStoreCache
+from utils.contextPacker import ContextPacker
+from utils.createSession import count_tokens
+from utils.toolResultCache import ToolCachePolicy, ToolResultCache, args_key, successful_result
+from utils.deadline import time_left, http_timeout
+from config.settings import (
+    VECTOR_DIR,
+    VECTOR_STORE_CACHE_SIZE,
+    VECTOR_STORE_WARM_COUNT,
+    QUERY_EMBEDDING_CACHE_SIZE,
+    MAX_CONTEXT_DOCS,
+    PDF_CONTEXT_TOKENS,
+    PDF_CONTEXT_CANDIDATES,
+    TOOL_WORKERS,
+    TOOL_TIMEOUT,
+    TOOL_TIMEOUTS,
+    TOOL_CACHE_SIZE,
+    TOOL_CACHE_TTLS,
+)
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
@@ -22,22 +54,32 @@ from email.mime.multipart import MIMEMultipart
 TOOLS: Dict[str, Callable] = {}
 load_dotenv()
 
+# Sync tools run here so several calls in one turn overlap and the event loop stays free
+_tool_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+
+
+def tool_timeout(tool_name: str) -> float:
+    return TOOL_TIMEOUTS.get(tool_name, TOOL_TIMEOUT)
+
 def get_embeddings():
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-    return OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+    return get_embedding_provider()
 
 from openai import OpenAI
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 # embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
 
 client = OpenAI(api_key=OPENAI_API_KEY)
+PDF_ANSWER_MODEL = "gpt-4o-mini"
+PDF_NO_DOCUMENTS = "No PDF documents available."
+PDF_NO_MATCH = "No relevant information found in PDF."
+context_packer = ContextPacker(PDF_CONTEXT_TOKENS, max_docs=MAX_CONTEXT_DOCS)
 
 
 def weather_tool(city: str) -> dict:
     """Get the current weather for a given city."""
     geo_url = "https://geocoding-api.open-meteo.com/v1/search"
     geo_params = {"name": city, "count": 1}
-    geo_resp = requests.get(geo_url, params=geo_params)
+    geo_resp = requests.get(geo_url, params=geo_params, timeout=http_timeout())
     geo_data = geo_resp.json()
     if not geo_data.get("results"):
         return {"error": f"Location '{city}' not found"}
@@ -48,7 +90,7 @@ def weather_tool(city: str) -> dict:
 
     weather_url = "https://api.open-meteo.com/v1/forecast"
     params = {"latitude": lat, "longitude": lon, "current_weather": True, "timezone": "auto"}
-    weather_resp = requests.get(weather_url, params=params)
+    weather_resp = requests.get(weather_url, params=params, timeout=http_timeout())
     weather_data = weather_resp.json()
     current = weather_data.get("current_weather", {})
     temperature = current.get("temperature")
@@ -66,35 +108,121 @@ def weather_tool(city: str) -> dict:
     print("User query (city):", response)
     return response
 
-# Cache for vector stores to avoid reloading
-_vector_store_cache = {}
+def _open_vector_store(vector_path: str) -> Chroma:
+    return Chroma(persist_directory=vector_path, embedding_function=get_embeddings())
 
-def pdf_tool(query: str, db=None) -> str:
-    if not db:
-        from config.database import get_db
-        db = next(get_db())
-    
-    vector_paths = get_all_vector_paths(db)
+
+# Opened per-document stores (LRU), so queries don't reload them from disk
+_vector_store_cache = VectorStoreCache(
+    _open_vector_store,
+    max_entries=VECTOR_STORE_CACHE_SIZE,
+    usage_path=os.path.join(VECTOR_DIR, "store_usage.json"),
+)
+
+# Recent query embeddings, keyed by normalised query text (LRU)
+_query_embedding_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+_query_embedding_lock = threading.Lock()
+_query_embedding_stats = {"hits": 0, "misses": 0}
+
+
+# Words that only pad a question; negations, prepositions and question words are kept
+QUERY_FILLER_WORDS = {
+    "a", "an", "the", "is", "are", "am", "be", "do", "does", "can", "could", "would", "will",
+    "i", "me", "my", "you", "your", "u", "we", "us", "please", "pls", "kindly", "tell", "know",
+    "want", "like", "hi", "hello", "hey", "thanks", "there", "s", "whats",
+}
+
+
+def _normalize_query(query: str) -> str:
+    """
+    Cache key that ignores case, punctuation, contractions, filler words and
+    simple plurals, so cosmetic rewordings ("what's your return policy?" /
+    "tell me the return policy") share an entry. Word order and every content
+    word still have to match; genuine paraphrases are left to the semantic
+    answer cache, which compares the embeddings themselves.
+    """
+    words = re.findall(r"\w+", query.lower().replace("'", "").replace("\u2019", ""))
+    content = [w for w in words if w not in QUERY_FILLER_WORDS]
+    content = [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w for w in content]
+    return " ".join(content) or " ".join(words)
+
+
+def embed_query_cached(query: str) -> List[float]:
+    """Embed a query once, reusing recent results (same _normalize_query key) without a network call."""
+    key = _normalize_query(query) or query
+    with _query_embedding_lock:
+        if key in _query_embedding_cache:
+            _query_embedding_cache.move_to_end(key)
+            _query_embedding_stats["hits"] += 1
+            return _query_embedding_cache[key]
+        _query_embedding_stats["misses"] += 1
+
+    vector = get_embeddings().embed_query(query)
+
+    with _query_embedding_lock:
+        _query_embedding_cache[key] = vector
+        while len(_query_embedding_cache) > QUERY_EMBEDDING_CACHE_SIZE:
+            _query_embedding_cache.popitem(last=False)
+    return vector
+
+
+def retrieve_pdf_chunks(
+    query: str, query_vector: List[float], vector_paths: List[str], documents: Optional[List[str]] = None
+) -> List[tuple]:
+    """Hybrid (vector + BM25) retrieval for pdf_tool: fused (chunk, score) pairs, best first."""
+    # Unified index plus any stores uploaded before it existed (until migrated)
+    stores = [(get_unified_index(get_embeddings()), unified_distance_space())]
+    # Legacy stores hold legacy-model vectors, so they're only comparable to that model's queries
+    legacy_paths = legacy_store_paths(vector_paths) if embedding_model_name() == LEGACY_EMBEDDING_MODEL else []
+    for vector_path in legacy_paths:
+        stores.append((_vector_store_cache.get(vector_path), distance_space(vector_path)))
+
+    # Candidates per ranking; the packer keeps the best MAX_CONTEXT_DOCS that fit its budget
+    candidates = PDF_CONTEXT_CANDIDATES
+    vector_ranking = search_stores(
+        stores,
+        query_vector,
+        k=candidates,
+        final_k=candidates,
+        where=document_filter(documents),
+        score_threshold=score_threshold(),
+    )
+    # Exact terms (SKUs, order numbers, product names) from the BM25 index
+    lexical_ranking = get_lexical_index().search(query, k=candidates, sources=documents)
+    return reciprocal_rank_fusion([vector_ranking, lexical_ranking], final_k=candidates)
+
+
+def pdf_tool(query: str, documents: Optional[List[str]] = None, db=None) -> str:
+    if db:
+        vector_paths = get_all_vector_paths(db)
+    else:
+        # Own short-lived session: tool calls run on worker threads
+        from config.database import SessionLocal
+        db = SessionLocal()
+        try:
+            vector_paths = get_all_vector_paths(db)
+        finally:
+            db.close()
     if not vector_paths:
-        return "No PDF documents available."
-
-    retriever_docs = []
-    for vector_path in vector_paths:
-        # Use cached store if available
-        if vector_path not in _vector_store_cache:
-            _vector_store_cache[vector_path] = Chroma(
-                persist_directory=vector_path,
-                embedding_function=get_embeddings(),
-            )
-        store = _vector_store_cache[vector_path]
-        docs = store.similarity_search(query, k=3)
-        retriever_docs.extend(docs)
+        return PDF_NO_DOCUMENTS
+
+    # Embed the question once and reuse the vector for every store
+    query_vector = embed_query_cached(query)
+
+    # Near-identical question already answered against the same documents, naming the same SKUs/numbers
+    cache_scope = (tuple(sorted(documents)) if documents else None, identifier_terms(query))
+    cached_answer = answer_cache.lookup(query_vector, scope=cache_scope)
+    if cached_answer is not None:
+        print("✅ pdf_tool semantic cache hit")
+        return cached_answer
 
+    scored_docs = retrieve_pdf_chunks(query, query_vector, vector_paths, documents)
+
+    # Best chunks that fit the token budget, in reading order
+    context, retriever_docs, context_tokens = context_packer.pack(scored_docs)
     if not retriever_docs:
-        return "No relevant information found in PDF."
+        return PDF_NO_MATCH
 
-    context = "\n\n".join([doc.page_content for doc in retriever_docs[:5]])
-    
     extraction_prompt = f"""
 You are an assistant that extracts concise, direct answers from PDF context.
 
@@ -109,17 +237,49 @@ Instruction:
 - If no answer is clear, respond "I don't know."
 """
     summary = client.chat.completions.create(
-        model="gpt-4o-mini",
+        model=PDF_ANSWER_MODEL,
         messages=[{"role": "system", "content": extraction_prompt}],
         stream=False,
+        timeout=http_timeout(tool_timeout("pdf_tool")),
     )
+    usage = getattr(summary, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", None) or count_tokens(extraction_prompt, PDF_ANSWER_MODEL)
+    context_packer.record(context_tokens, prompt_tokens)
+    print(f"[PDF_TOOL] {len(retriever_docs)} chunks, {context_tokens} context / {prompt_tokens} prompt tokens")
+
+    answer = summary.choices[0].message.content.strip()
+    answer_cache.store(query_vector, answer, scope=cache_scope)
+    return answer
+
+def clear_vector_cache(vector_paths: Optional[List[str]] = None):
+    """Drop cached stores for `vector_paths` (all of them if None) so they reload on next query"""
+    _vector_store_cache.invalidate(vector_paths)
 
-    return summary.choices[0].message.content.strip()
 
-def clear_vector_cache():
-    """Clear the vector store cache to force reload on next query"""
-    global _vector_store_cache
-    _vector_store_cache = {}
+def warm_vector_store_cache():
+    """Open the most-used unmigrated stores in the background (called at startup)."""
+    if embedding_model_name() != LEGACY_EMBEDDING_MODEL:
+        return None
+    paths = legacy_store_paths(_vector_store_cache.most_used(VECTOR_STORE_WARM_COUNT))
+    if not paths:
+        return None
+    return _vector_store_cache.warm(paths)
+
+
+def save_vector_store_usage():
+    _vector_store_cache.save_usage()
+
+
+def vector_store_cache_stats() -> dict:
+    return _vector_store_cache.stats()
+
+
+def query_embedding_cache_stats() -> dict:
+    return {
+        "entries": len(_query_embedding_cache),
+        "max_entries": QUERY_EMBEDDING_CACHE_SIZE,
+        **_query_embedding_stats,
+    }
 
 
 # def product_insert_tool(name: str, price: float, description: str, category: str = "general",**kwargs) -> dict:
@@ -182,6 +342,66 @@ def send_email_tool(to_email: str, subject: str, body: str, mode: str = "send"):
 
 #     import xml.etree.ElementTree as ET
 
+def _timeout_result(tool_name: str, timeout: float) -> dict:
+    print(f"⏱️ Tool {tool_name} timed out after {timeout:.1f}s")
+    return {
+        "status": "error",
+        "tool": tool_name,
+        "result": None,
+        "message": f"Tool {tool_name} timed out after {timeout:.1f}s"
+    }
+
+
+# -------------------- Tool result cache --------------------
+LOCAL_TOOLS: Dict[str, Callable] = {
+    "weather_tool": weather_tool,
+    "pdf_tool": pdf_tool,
+    "send_email_tool": send_email_tool,
+}
+
+# Side effects: every call must really run
+NEVER_CACHE = {"send_email_tool"}
+
+
+def _city_key(args: dict) -> Optional[str]:
+    city = " ".join(str(args.get("city") or "").lower().split())
+    return city or None
+
+
+def _pdf_query_key(args: dict):
+    query = args.get("query")
+    if not query:
+        return None
+    documents = args.get("documents")
+    return _normalize_query(str(query)), tuple(sorted(documents)) if documents else None
+
+
+def _pdf_answer_found(result: dict) -> bool:
+    # "Nothing found" may change as soon as a document is uploaded
+    return successful_result(result) and result.get("result") not in (PDF_NO_DOCUMENTS, PDF_NO_MATCH)
+
+
+def _cache_policies() -> Dict[str, ToolCachePolicy]:
+    key_fns = {"weather_tool": _city_key, "pdf_tool": _pdf_query_key}
+    accepts = {"pdf_tool": _pdf_answer_found}
+    return {
+        name: ToolCachePolicy(
+            ttl,
+            key_fns.get(name, args_key),
+            cacheable=name not in NEVER_CACHE,
+            accept=accepts.get(name, successful_result),
+        )
+        for name, ttl in TOOL_CACHE_TTLS.items()
+    }
+
+
+tool_result_cache = ToolResultCache(_cache_policies(), TOOL_CACHE_SIZE)
+
+
+def tool_result_cache_stats() -> dict:
+    return tool_result_cache.stats()
+
+
 async def handle_tool_call(tool_call, db=None, context=None):
     """Executes a tool call and returns structured output."""
     if isinstance(tool_call, dict):
@@ -203,31 +423,38 @@ async def handle_tool_call(tool_call, db=None, context=None):
     else:
         tool_args = {}
 
+    # Cached result, or shared with an identical call already running;
+    # this caller waits no longer than its own tool timeout / request deadline
+    timeout = time_left(tool_timeout(tool_name))
+    try:
+        return await tool_result_cache.run(
+            tool_name, tool_args, lambda: _execute_tool(tool_name, tool_args, server_name), timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        return _timeout_result(tool_name, timeout)
+
+
+async def _execute_tool(tool_name: str, tool_args: dict, server_name: Optional[str] = None) -> dict:
+    """Runs a local or MCP tool under its timeout (capped by the request deadline); never raises."""
+    timeout = time_left(tool_timeout(tool_name))
+    if timeout <= 0:
+        return _timeout_result(tool_name, 0.0)
     print(f"🔧 Running tool: {tool_name} with args: {tool_args}")
-    
-    # Define local tools
-    local_tools = {
-        "weather_tool": weather_tool,
-        "pdf_tool": pdf_tool,
-        "send_email_tool": send_email_tool
-    }
-    
+
     # Check if this is a local tool
-    tool_fn = local_tools.get(tool_name)
+    tool_fn = LOCAL_TOOLS.get(tool_name)
     
     if not tool_fn:
         # Not a local tool, try MCP
         try:
-            # Find which server has this tool
+            # Find which server has this tool (cached name -> server index)
             if not server_name:
-                all_tools = await mcp_client.get_all_tools()
-                for srv_name, tools in all_tools.items():
-                    if any(t["name"] == tool_name for t in tools):
-                        server_name = srv_name
-                        break
+                server_name = await mcp_client.find_server(tool_name)
             
             if server_name:
-                result = await call_mcp_tool(server_name, tool_name, tool_args)
+                result = await asyncio.wait_for(
+                    call_mcp_tool(server_name, tool_name, tool_args, timeout=timeout), timeout=timeout
+                )
                 return {
                     "status": "success",
                     "tool": tool_name,
@@ -236,6 +463,8 @@ async def handle_tool_call(tool_call, db=None, context=None):
                 }
             else:
                 return {"status": "error", "tool": tool_name, "message": f"Unknown tool {tool_name}"}
+        except asyncio.TimeoutError:
+            return _timeout_result(tool_name, timeout)
         except Exception as e:
             return {
                 "status": "error",
@@ -246,14 +475,18 @@ async def handle_tool_call(tool_call, db=None, context=None):
 
     # Handle local tools
     try:
-        # Add db parameter for tools that need it
-        if tool_name == "pdf_tool" and db:
-            tool_args["db"] = db
-            
+        # The request's DB session isn't passed on: sync tools run on worker
+        # threads and a SQLAlchemy Session must not be shared across threads.
         if inspect.iscoroutinefunction(tool_fn):
-            tool_output = await tool_fn(**tool_args)
+            tool_output = await asyncio.wait_for(tool_fn(**tool_args), timeout=timeout)
         else:
-            tool_output = tool_fn(**tool_args)
+            loop = asyncio.get_running_loop()
+            # run_in_executor doesn't copy contextvars; the tool's HTTP calls need the deadline
+            context = contextvars.copy_context()
+            tool_output = await asyncio.wait_for(
+                loop.run_in_executor(_tool_executor, functools.partial(context.run, tool_fn, **tool_args)),
+                timeout=timeout,
+            )
 
         if isinstance(tool_output, dict):
             tool_message = tool_output.get("message", json.dumps(tool_output))
@@ -267,6 +500,9 @@ async def handle_tool_call(tool_call, db=None, context=None):
             "message": f"{tool_message}"
         }
 
+    except asyncio.TimeoutError:
+        # The worker thread can't be interrupted; it finishes in the background
+        return _timeout_result(tool_name, timeout)
     except Exception as e:
         return {
             "status": "error",
@@ -319,9 +555,18 @@ async def get_all_mcp_tools():
         print(f"Error getting MCP tools: {e}")
         return {}
 
-def refresh_vector_database():
-    """Call this when PDFs are uploaded/deleted to refresh the cache"""
-    clear_vector_cache()
-    print("✅ Vector database cache cleared")
+def refresh_vector_database(vector_paths: Optional[List[str]] = None, deleted: bool = False):
+    """
+    Call this when PDFs are uploaded/deleted.
+    Only the stores at `vector_paths` are reopened (every store if None);
+    cached answers are always dropped since the corpus changed.
+    """
+    if deleted and vector_paths:
+        _vector_store_cache.forget(vector_paths)
+    else:
+        clear_vector_cache(vector_paths)
+    answer_cache.clear()
+    tool_result_cache.invalidate("pdf_tool")
+    print(f"✅ Vector database cache refreshed ({len(vector_paths) if vector_paths else 'all'} stores)")
 
 
@@ -0,0 +1,108 @@
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import TOKENIZER_MODEL
+from utils.createSession import count_tokens
+
+# Below this many tokens left, a trimmed chunk isn't worth adding
+MIN_TRIMMED_TOKENS = 24
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_END.split(text) if s.strip()]
+
+
+def trim_to_tokens(text: str, budget: int, model_name: str = TOKENIZER_MODEL) -> str:
+    """Longest prefix of whole sentences that fits in `budget` tokens ('' if none)."""
+    kept, used = [], 0
+    for sentence in split_sentences(text):
+        cost = count_tokens(sentence + " ", model_name)
+        if used + cost > budget:
+            break
+        kept.append(sentence)
+        used += cost
+    return " ".join(kept)
+
+
+def _position(doc) -> Tuple[str, int, int]:
+    """Reading order: source, page, then chunk number from '<doc_id>-<i>' chunk ids."""
+    meta = doc.metadata or {}
+    chunk_id = str(meta.get("chunk_id", ""))
+    tail = chunk_id.rsplit("-", 1)[-1]
+    return (
+        str(meta.get("source", "")),
+        int(meta.get("page", 0) or 0),
+        int(tail) if tail.isdigit() else 0,
+    )
+
+
+class ContextPacker:
+    """
+    Greedily fills a token budget with the best-scoring chunks, up to
+    `max_docs` of them (no cap if None). Duplicates are skipped, a chunk that doesn't fit is trimmed at a sentence
+    boundary, and the result is laid out in document reading order.
+    """
+
+    def __init__(self, budget: int, model_name: str = TOKENIZER_MODEL, separator: str = "\n\n", max_docs: Optional[int] = None):
+        self.budget = budget
+        self.max_docs = max_docs
+        self.model_name = model_name
+        self.separator = separator
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.context_tokens = 0
+        self.prompt_tokens = 0
+        self.last_prompt_tokens = 0
+
+    def pack(self, scored_docs: List[Tuple[Any, float]]) -> Tuple[str, List[Any], int]:
+        """Returns (context text, chunks used, context tokens)."""
+        separator_cost = count_tokens(self.separator, self.model_name)
+        remaining = self.budget
+        seen = set()
+        picked = []
+
+        for doc, _score in sorted(scored_docs, key=lambda item: item[1], reverse=True):
+            key = " ".join(doc.page_content.lower().split())
+            if not key or key in seen:
+                continue
+            seen.add(key)
+
+            text = doc.page_content.strip()
+            cost = count_tokens(text, self.model_name) + separator_cost
+            if cost > remaining:
+                if remaining - separator_cost < MIN_TRIMMED_TOKENS:
+                    continue
+                text = trim_to_tokens(text, remaining - separator_cost, self.model_name)
+                if not text:
+                    continue
+                cost = count_tokens(text, self.model_name) + separator_cost
+            picked.append((doc, text))
+            remaining -= cost
+            if remaining < MIN_TRIMMED_TOKENS or (self.max_docs is not None and len(picked) >= self.max_docs):
+                break
+
+        picked.sort(key=lambda item: _position(item[0]))
+        context = self.separator.join(text for _doc, text in picked)
+        return context, [doc for doc, _text in picked], count_tokens(context, self.model_name)
+
+    def record(self, context_tokens: int, prompt_tokens: int):
+        """Track tokens sent per call so prompt cost shows up on /metrics."""
+        with self._lock:
+            self.calls += 1
+            self.context_tokens += context_tokens
+            self.prompt_tokens += prompt_tokens
+            self.last_prompt_tokens = prompt_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "budget": self.budget,
+            "max_docs": self.max_docs,
+            "calls": self.calls,
+            "context_tokens_total": self.context_tokens,
+            "prompt_tokens_total": self.prompt_tokens,
+            "last_prompt_tokens": self.last_prompt_tokens,
+            "avg_prompt_tokens": round(self.prompt_tokens / self.calls, 1) if self.calls else 0.0,
+        }
@@ -4,6 +4,7 @@ from dotenv import load_dotenv
 from datetime import datetime
 from typing import Dict, Any, Optional
 import tiktoken
+from functools import lru_cache
 from langchain_community.chat_models import ChatOpenAI
 import json
 
@@ -13,6 +14,7 @@ import re
 from services.sessionService import insert_session,update_session_name
 from services.usermemoryService import fetch_latest_memory,save_memory
 from config.database import get_db
+from config.settings import TOKENIZER_MODEL
 from services.messageService import insert_message
 from openai import OpenAI
 load_dotenv()
@@ -69,12 +71,16 @@ def updated_sessions(session_id: str, role: str, content: str):
 
     sessions[session_id]["messages"].append({"role": role, "content": content})
 
-def count_tokens(text: str, model_name="gpt-3") -> int:
+@lru_cache(maxsize=None)
+def get_encoding(model_name: str = TOKENIZER_MODEL):
+    """tiktoken encoding for a model, loaded once per process."""
     try:
-        encoding = tiktoken.encoding_for_model(model_name)
+        return tiktoken.encoding_for_model(model_name)
     except KeyError:
-        encoding = tiktoken.get_encoding("cl100k_base")
-    return len(encoding.encode(text))
+        return tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(text: str, model_name: str = TOKENIZER_MODEL) -> int:
+    return len(get_encoding(model_name).encode(text))
 
 def store_message_db(session_id: str, role: str, message: str):
     import json
@@ -131,6 +137,37 @@ def extract_memory(messages: list[dict]) -> dict:
         print("⚠️ Memory extract parse error:", raw)
         return {}
 
+def summarize_history(previous_summary: str, messages: list[dict], max_tokens: int = 300) -> str:
+    """
+    Fold older conversation turns into the running summary of a session.
+    Returns the updated summary text.
+    """
+    text = "\n".join([f"{m['role']}: {m['content']}" for m in messages])
+
+    prompt = f"""
+    You maintain a running summary of a conversation between a user and a shop assistant.
+    Update the summary below with the new turns.
+
+    Rules:
+    - Keep facts, decisions, open questions and anything the user asked to remember.
+    - Drop greetings and small talk.
+    - Plain text, at most {max_tokens // 2} words.
+
+    Current summary:
+    {previous_summary or "(empty)"}
+
+    New turns:
+    {text}
+    """
+
+    response = client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[{"role": "system", "content": prompt}],
+        temperature=0,
+        max_tokens=max_tokens,
+    )
+    return (response.choices[0].message.content or "").strip()
+
 def retrieve_memory_db(db,k: int = 5):
     """
     Retrieve latest k user memory facts (field=value).
@@ -0,0 +1,70 @@
+import time
+from contextlib import contextmanager
+from contextvars import Context, ContextVar, copy_context
+from typing import Iterator, Optional
+
+from config.settings import REQUEST_BUDGET, REQUEST_BUDGETS, HTTP_TIMEOUT
+
+
+class Deadline:
+    """Point in time (monotonic clock) by which the current request must be answered."""
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def cap(self, timeout: float) -> float:
+        return min(timeout, self.remaining())
+
+
+# Copied into asyncio tasks and to_thread calls, so tools and MCP calls see the request's deadline
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+def request_budget(channel: str) -> float:
+    return REQUEST_BUDGETS.get(channel, REQUEST_BUDGET)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def without_deadline() -> Context:
+    """Copy of the current context with no deadline, for work shared by several requests."""
+    context = copy_context()
+    context.run(_current_deadline.set, None)
+    return context
+
+
+def time_left(timeout: float) -> float:
+    """`timeout`, shortened to what is left of the current request's deadline (if any)."""
+    deadline = _current_deadline.get()
+    return timeout if deadline is None else deadline.cap(timeout)
+
+
+def http_timeout(timeout: float = HTTP_TIMEOUT) -> float:
+    """Timeout for one outbound HTTP call; raises if the request is already out of time."""
+    left = time_left(timeout)
+    if left <= 0:
+        raise TimeoutError("request deadline exceeded")
+    return left
+
+
+@contextmanager
+def deadline_scope(budget: float) -> Iterator[Deadline]:
+    deadline = Deadline(budget)
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        try:
+            _current_deadline.reset(token)
+        except ValueError:
+            # Closed from another context (e.g. an abandoned stream being finalized)
+            pass
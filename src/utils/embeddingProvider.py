@@ -0,0 +1,144 @@
+import os
+import re
+import hashlib
+import threading
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config.settings import (
+    EMBEDDING_PROVIDER,
+    EMBEDDING_MODEL,
+    LOCAL_EMBEDDING_MODEL_DIR,
+    LOCAL_EMBEDDING_DIM,
+    EMBED_BATCH_SIZE,
+    VECTOR_SCORE_THRESHOLD,
+)
+from utils.embeddingCache import CachedEmbeddings
+
+# Model every store written before providers were configurable was embedded with
+LEGACY_EMBEDDING_MODEL = "openai:text-embedding-ada-002"
+
+# Cosine floor for a relevant hit. ada-002 vectors share a narrow cone (unrelated
+# text still scores ~0.7); newer OpenAI, ONNX and hashing models spread much wider.
+SCORE_THRESHOLDS = {LEGACY_EMBEDDING_MODEL: 0.7}
+DEFAULT_SCORE_THRESHOLD = 0.2
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic CPU embeddings via feature hashing of words and character
+    trigrams. No model files or network needed; lexical rather than semantic.
+    """
+
+    def __init__(self, dim: int = LOCAL_EMBEDDING_DIM):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = re.findall(r"\w+", text.lower())
+        grams = [w[i:i + 3] for w in words for i in range(max(len(w) - 2, 1))]
+        return words + [f"#{g}" for g in grams]
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                sign = 1.0 if digest[4] & 1 else -1.0
+                matrix[row, bucket] += sign
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_batch(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0].tolist()
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence-transformer style encoder run with ONNX Runtime on CPU.
+    `model_dir` must contain model.onnx and a HuggingFace tokenizer.json.
+    """
+
+    def __init__(self, model_dir: str = LOCAL_EMBEDDING_MODEL_DIR, batch_size: int = EMBED_BATCH_SIZE, max_length: int = 256):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, "model.onnx"), providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, then L2 normalise
+        mask = attention_mask[:, :, np.newaxis].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-9, None)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        rows = []
+        for start in range(0, len(texts), self.batch_size):
+            rows.append(self._embed_batch(texts[start:start + self.batch_size]))
+        return np.vstack(rows).tolist() if rows else []
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0].tolist()
+
+
+def embedding_model_name() -> str:
+    """Identifier stored on collections so vectors from different models never mix."""
+    if EMBEDDING_PROVIDER == "onnx":
+        return f"onnx:{os.path.basename(os.path.normpath(LOCAL_EMBEDDING_MODEL_DIR))}"
+    if EMBEDDING_PROVIDER == "hashing":
+        return f"hashing:{LOCAL_EMBEDDING_DIM}"
+    return f"openai:{EMBEDDING_MODEL}"
+
+
+def score_threshold() -> float:
+    """Cosine similarity below which a vector hit is treated as unrelated to the query."""
+    if VECTOR_SCORE_THRESHOLD is not None:
+        return VECTOR_SCORE_THRESHOLD
+    return SCORE_THRESHOLDS.get(embedding_model_name(), DEFAULT_SCORE_THRESHOLD)
+
+
+def _build_provider() -> Embeddings:
+    if EMBEDDING_PROVIDER == "onnx":
+        return OnnxEmbeddings()
+    if EMBEDDING_PROVIDER == "hashing":
+        return HashingEmbeddings()
+    if EMBEDDING_PROVIDER != "openai":
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER '{EMBEDDING_PROVIDER}' (expected openai, onnx or hashing)")
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings(model=EMBEDDING_MODEL, openai_api_key=os.getenv("OPENAI_API_KEY"))
+
+
+_provider: Optional[CachedEmbeddings] = None
+_provider_lock = threading.Lock()
+
+
+def get_embedding_provider() -> CachedEmbeddings:
+    """Configured embedding backend (behind the on-disk embedding cache), built once."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = CachedEmbeddings(_build_provider(), model_name=embedding_model_name())
+            print(f"[EMBEDDINGS] using {embedding_model_name()}")
+    return _provider
@@ -0,0 +1,191 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.settings import (
+    MAX_HISTORY_MESSAGES,
+    HISTORY_TOKEN_BUDGET,
+    HISTORY_SUMMARY_TOKENS,
+    HISTORY_COMPACT_TURNS,
+    HISTORY_COMPACT_TOKENS,
+    TOKENIZER_MODEL,
+)
+from utils.createSession import count_tokens, summarize_history
+from utils.contextPacker import trim_to_tokens
+
+TASK_OPEN, TASK_CLOSE = "<task>", "</task>"
+# Role of the message that replaces a session's compacted turns
+SUMMARY_ROLE = "summary"
+
+
+def _unwrap(content: str) -> str:
+    text = (content or "").strip()
+    if text.startswith(TASK_OPEN) and text.endswith(TASK_CLOSE):
+        text = text[len(TASK_OPEN):-len(TASK_CLOSE)].strip()
+    return text
+
+
+def session_summary(messages: List[Dict]) -> str:
+    """Rolling summary stored at the head of a compacted session, or ''."""
+    if messages and messages[0].get("role") == SUMMARY_ROLE:
+        return messages[0].get("content", "")
+    return ""
+
+
+def normalize_turns(messages: List[Dict]) -> List[Tuple[int, str, str]]:
+    """
+    (raw index, role, text) for the user/assistant turns of a session.
+    Tool output and empty pre-tool replies are dropped, and the <task>-wrapped
+    copy the agent records next to the raw user message is de-duplicated.
+    """
+    turns = []
+    for index, message in enumerate(messages):
+        role = message.get("role")
+        if role not in ("user", "assistant"):
+            continue
+        text = _unwrap(message.get("content", ""))
+        if not text:
+            continue
+        if turns and turns[-1][1] == role == "user" and turns[-1][2] == text:
+            continue
+        turns.append((index, role, text))
+    return turns
+
+
+class HistoryManager:
+    """
+    Packs the most recent turns of a session into a token budget (and at most
+    `max_messages` turns). Older turns not yet summarized fill whatever budget
+    is left; once `compact_turns` of them (or `compact_tokens` worth) have piled
+    up they are folded into the session's rolling summary in one background call.
+    The summary replaces those turns in the session's own message list, so it
+    lives exactly as long as the messages it stands for.
+    """
+
+    def __init__(
+        self,
+        budget: int,
+        max_messages: int,
+        summary_tokens: int,
+        compact_turns: int = 6,
+        compact_tokens: int = 600,
+        model_name: str = TOKENIZER_MODEL,
+    ):
+        self.budget = budget
+        self.max_messages = max_messages
+        self.summary_tokens = summary_tokens
+        self.compact_turns = max(1, compact_turns)
+        self.compact_tokens = max(1, compact_tokens)
+        self.model_name = model_name
+        self._compacting: Dict[str, asyncio.Task] = {}
+        self.builds = 0
+        self.compactions = 0
+        self.compacted_turns = 0
+        self.errors = 0
+        self.history_tokens = 0
+        self.last_history_tokens = 0
+
+    def build(self, session_id: str, messages: Optional[List[Dict]], task: str) -> Tuple[str, List[Tuple[str, str]]]:
+        """
+        Returns (summary, [(role, text), ...]) for the prompt, oldest turn first.
+        The current task is excluded even if the caller already recorded it.
+        """
+        messages = messages if messages is not None else []
+        turns = normalize_turns(messages)
+        current = _unwrap(task)
+        while turns and turns[-1][1] == "user" and turns[-1][2] == current:
+            turns.pop()
+
+        picked, remaining = [], self.budget
+        for index, role, text in reversed(turns):
+            if len(picked) >= self.max_messages:
+                break
+            cost = count_tokens(text, self.model_name)
+            if cost > remaining:
+                # A single oversized latest turn is trimmed rather than dropped
+                if not picked:
+                    text = trim_to_tokens(text, remaining, self.model_name)
+                    if text:
+                        picked.append((index, role, text))
+                        remaining -= count_tokens(text, self.model_name)
+                break
+            picked.append((index, role, text))
+            remaining -= cost
+        picked.reverse()
+
+        # Older turns aren't in the summary yet: they keep what is left of the budget
+        # (newest first) until a compaction folds them in
+        boundary = picked[0][0] if picked else (turns[-1][0] + 1 if turns else 0)
+        overflow = [turn for turn in turns if turn[0] < boundary]
+        overflow_tokens, carried, carrying = 0, [], True
+        for index, role, text in reversed(overflow):
+            cost = count_tokens(text, self.model_name)
+            overflow_tokens += cost
+            if carrying and cost <= remaining:
+                carried.append((index, role, text))
+                remaining -= cost
+            else:
+                carrying = False
+        carried.reverse()
+        used = self.budget - remaining
+
+        self.builds += 1
+        self.history_tokens += used
+        self.last_history_tokens = used
+
+        # Hysteresis: one summary call per batch of old turns, not one per message
+        if len(overflow) >= self.compact_turns or overflow_tokens >= self.compact_tokens:
+            self._schedule_compaction(
+                session_id, messages, boundary, [{"role": role, "content": text} for _i, role, text in overflow]
+            )
+
+        return session_summary(messages), [(role, text) for _index, role, text in carried + picked]
+
+    # -------------------- Compaction --------------------
+    def _schedule_compaction(self, session_id: str, messages: List[Dict], boundary: int, overflow: List[Dict]):
+        running = self._compacting.get(session_id)
+        if running is not None and not running.done():
+            return
+        self._compacting[session_id] = asyncio.create_task(self._compact(session_id, messages, boundary, overflow))
+
+    async def _compact(self, session_id: str, messages: List[Dict], boundary: int, overflow: List[Dict]):
+        try:
+            summary = await asyncio.to_thread(
+                summarize_history, session_summary(messages), overflow, self.summary_tokens
+            )
+            if not summary:
+                raise ValueError("empty summary")
+            summary = trim_to_tokens(summary, self.summary_tokens, self.model_name) or summary
+            # Sessions only ever append, so the prefix is still the summarized part
+            # (including any earlier summary); one slice assignment swaps it out
+            messages[:boundary] = [{"role": SUMMARY_ROLE, "content": summary}]
+            self.compactions += 1
+            self.compacted_turns += len(overflow)
+            print(f"🗜️ Compacted {len(overflow)} turns of session {session_id} into its summary")
+        except Exception as e:
+            self.errors += 1
+            print(f"❌ History compaction failed for session {session_id}: {e}")
+        finally:
+            self._compacting.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "budget": self.budget,
+            "max_messages": self.max_messages,
+            "compact_turns": self.compact_turns,
+            "compacting": len(self._compacting),
+            "builds": self.builds,
+            "compactions": self.compactions,
+            "compacted_turns": self.compacted_turns,
+            "errors": self.errors,
+            "last_history_tokens": self.last_history_tokens,
+            "avg_history_tokens": round(self.history_tokens / self.builds, 1) if self.builds else 0.0,
+        }
+
+
+history_manager = HistoryManager(
+    HISTORY_TOKEN_BUDGET,
+    MAX_HISTORY_MESSAGES,
+    HISTORY_SUMMARY_TOKENS,
+    compact_turns=HISTORY_COMPACT_TURNS,
+    compact_tokens=HISTORY_COMPACT_TOKENS,
+)
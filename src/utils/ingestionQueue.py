@@ -0,0 +1,125 @@
+import asyncio
+import uuid
+import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from config.settings import INGEST_WORKERS, INGEST_QUEUE_SIZE, INGEST_JOB_HISTORY
+
+INGEST_STAGES = ["parsing", "chunking", "embedding", "indexing"]
+
+# Dedicated pool so PDF parsing / embedding never competes with the default
+# executor used by the DB helpers behind /ask.
+_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest")
+_queue: Optional[asyncio.Queue] = None
+_workers: list = []
+_jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+
+
+class IngestionQueueFull(Exception):
+    """Raised when the bounded ingestion queue cannot take another job."""
+
+
+def _now() -> str:
+    return datetime.datetime.utcnow().isoformat()
+
+
+class IngestionJob:
+    """Tracks status and per-stage progress of one PDF ingestion."""
+
+    def __init__(self, filename: str):
+        self.id = str(uuid.uuid4())
+        self.filename = filename
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.created_at = _now()
+        self.finished_at: Optional[str] = None
+        self.stages: Dict[str, Dict[str, Any]] = {
+            stage: {"status": "pending", "done": 0, "total": None} for stage in INGEST_STAGES
+        }
+
+    def start_stage(self, stage: str, total: Optional[int] = None):
+        self.stages[stage].update(status="running", total=total, started_at=_now())
+
+    def update_stage(self, stage: str, done: int, total: Optional[int] = None):
+        self.stages[stage]["done"] = done
+        if total is not None:
+            self.stages[stage]["total"] = total
+
+    def finish_stage(self, stage: str, **info):
+        entry = self.stages[stage]
+        if entry["total"] is not None:
+            entry["done"] = entry["total"]
+        entry.update(status="done", finished_at=_now(), **info)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "status": self.status,
+            "error": self.error,
+            "result": self.result,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "stages": self.stages,
+        }
+
+
+async def _worker(worker_id: int):
+    loop = asyncio.get_running_loop()
+    while True:
+        job, runner = await _queue.get()
+        job.status = "running"
+        print(f"[INGEST] worker {worker_id} picked job {job.id} ({job.filename})")
+        try:
+            job.result = await loop.run_in_executor(_executor, runner, job)
+            job.status = "completed"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            for entry in job.stages.values():
+                if entry["status"] == "running":
+                    entry["status"] = "failed"
+            print(f"❌ Ingestion job {job.id} failed: {e}")
+        finally:
+            job.finished_at = _now()
+            _queue.task_done()
+
+
+def start_ingestion_workers():
+    """Create the queue and worker tasks on the running event loop (idempotent)."""
+    global _queue
+    if _queue is not None:
+        return
+    _queue = asyncio.Queue(maxsize=INGEST_QUEUE_SIZE)
+    for i in range(INGEST_WORKERS):
+        _workers.append(asyncio.create_task(_worker(i + 1)))
+    print(f"[INGEST] started {INGEST_WORKERS} workers (queue size {INGEST_QUEUE_SIZE})")
+
+
+def submit_ingestion_job(filename: str, runner: Callable[[IngestionJob], Dict[str, Any]]) -> IngestionJob:
+    """
+    Queue `runner(job)` for execution on the ingestion pool.
+    Raises IngestionQueueFull instead of waiting when the queue is at capacity.
+    """
+    start_ingestion_workers()
+    job = IngestionJob(filename)
+    try:
+        _queue.put_nowait((job, runner))
+    except asyncio.QueueFull:
+        raise IngestionQueueFull(f"Ingestion queue is full ({INGEST_QUEUE_SIZE} pending jobs), please retry shortly.")
+
+    _jobs[job.id] = job
+    # Forget the oldest finished jobs so the registry stays bounded
+    while len(_jobs) > INGEST_JOB_HISTORY:
+        oldest_id, oldest = next(iter(_jobs.items()))
+        if oldest.status in ("queued", "running"):
+            break
+        _jobs.pop(oldest_id)
+    return job
+
+
+def get_ingestion_job(job_id: str) -> Optional[IngestionJob]:
+    return _jobs.get(job_id)
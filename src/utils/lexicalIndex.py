@@ -0,0 +1,178 @@
+# BM25 inverted index over PDF chunks, used next to the vector index so SKU
+# codes, order numbers and exact product names match lexically.
+# Persisted as one JSON segment per document under VECTOR_DIR/lexical, so an
+# upload or delete only writes/removes that document's segment.
+#   python -m utils.lexicalIndex backfill   # segments for already-indexed docs
+import os
+import re
+import sys
+import json
+import math
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from config.settings import VECTOR_DIR
+
+LEXICAL_INDEX_DIR = os.path.join(VECTOR_DIR, "lexical")
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; compound codes like 'AB-1234' also yield their parts."""
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        terms.append(token)
+        parts = re.split(r"[-_./]", token)
+        if len(parts) > 1:
+            terms.extend(p for p in parts if p)
+    return terms
+
+
+def build_segment(doc_id: str, chunk_ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Term frequencies for one document's chunks, computed while chunking."""
+    return {
+        "doc_id": doc_id,
+        "chunks": [
+            {"chunk_id": cid, "text": text, "metadata": meta, "tf": dict(Counter(tokenize(text)))}
+            for cid, text, meta in zip(chunk_ids, texts, metadatas)
+        ],
+    }
+
+
+class LexicalIndex:
+    def __init__(self, directory: str = LEXICAL_INDEX_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.doc_len: Dict[str, int] = {}
+        self.chunks: Dict[str, Dict[str, Any]] = {}
+        self.doc_chunks: Dict[str, List[str]] = {}
+        self.total_len = 0
+        self._load()
+
+    def _segment_path(self, doc_id: str) -> str:
+        return os.path.join(self.directory, f"{doc_id}.json")
+
+    def _load(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                with open(os.path.join(self.directory, name), "r", encoding="utf-8") as f:
+                    self._apply_segment(json.load(f))
+
+    def _apply_segment(self, segment: Dict[str, Any]):
+        chunk_ids = []
+        for chunk in segment["chunks"]:
+            cid = chunk["chunk_id"]
+            for term, tf in chunk["tf"].items():
+                self.postings[term][cid] = tf
+            length = sum(chunk["tf"].values())
+            self.doc_len[cid] = length
+            self.total_len += length
+            self.chunks[cid] = {"text": chunk["text"], "metadata": chunk["metadata"], "terms": list(chunk["tf"])}
+            chunk_ids.append(cid)
+        self.doc_chunks[segment["doc_id"]] = chunk_ids
+
+    def add_segment(self, segment: Dict[str, Any]):
+        """Persist and index one document's segment (replacing any previous one)."""
+        with self._lock:
+            self._remove(segment["doc_id"])
+            tmp_path = self._segment_path(segment["doc_id"]) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(segment, f)
+            os.replace(tmp_path, self._segment_path(segment["doc_id"]))
+            self._apply_segment(segment)
+
+    def remove_document(self, doc_id: str):
+        with self._lock:
+            self._remove(doc_id)
+            if os.path.exists(self._segment_path(doc_id)):
+                os.remove(self._segment_path(doc_id))
+
+    def _remove(self, doc_id: str):
+        for cid in self.doc_chunks.pop(doc_id, []):
+            chunk = self.chunks.pop(cid, None)
+            if chunk:
+                for term in chunk["terms"]:
+                    postings = self.postings.get(term)
+                    if postings is not None:
+                        postings.pop(cid, None)
+                        if not postings:
+                            del self.postings[term]
+            self.total_len -= self.doc_len.pop(cid, 0)
+
+    def search(self, query: str, k: int, sources: Optional[List[str]] = None) -> List[Tuple[Document, float]]:
+        """Top-k chunks by BM25, optionally restricted to some source filenames."""
+        allowed = set(sources) if sources else None
+        with self._lock:
+            n = len(self.doc_len)
+            if not n:
+                return []
+            avgdl = self.total_len / n
+            scores: Dict[str, float] = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for cid, tf in postings.items():
+                    if allowed is not None and self.chunks[cid]["metadata"].get("source") not in allowed:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[cid] / avgdl)
+                    scores[cid] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            return [
+                (Document(page_content=self.chunks[cid]["text"], metadata=dict(self.chunks[cid]["metadata"])), score)
+                for cid, score in top
+            ]
+
+    def document_ids(self) -> List[str]:
+        return list(self.doc_chunks)
+
+
+_index: Optional[LexicalIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_lexical_index() -> LexicalIndex:
+    """Process-wide index, loaded from its segments on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = LexicalIndex()
+    return _index
+
+
+def backfill_from_unified_index() -> int:
+    """Write segments for documents already in the unified vector index but not here."""
+    from utils.vectorIndex import unified_get  # vectorIndex imports this module
+
+    index = get_lexical_index()
+    known = set(index.document_ids())
+    data = unified_get(include_embeddings=False)
+    grouped: Dict[str, List[Tuple[str, str, Dict[str, Any]]]] = defaultdict(list)
+    for cid, text, meta in zip(data["ids"], data["documents"], data["metadatas"]):
+        doc_id = (meta or {}).get("doc_id")
+        if doc_id and doc_id not in known:
+            grouped[doc_id].append((meta.get("chunk_id", cid), text, meta))
+    for doc_id, rows in grouped.items():
+        chunk_ids, texts, metadatas = zip(*rows)
+        index.add_segment(build_segment(doc_id, list(chunk_ids), list(texts), list(metadatas)))
+        print(f"[LEXICAL] {doc_id}: {len(rows)} chunks")
+    return len(grouped)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "backfill":
+        count = backfill_from_unified_index()
+        print(f"✅ Backfilled lexical segments for {count} documents")
+    else:
+        print("Usage: python -m utils.lexicalIndex backfill")
+        sys.exit(1)
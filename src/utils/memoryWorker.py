@@ -0,0 +1,118 @@
+import re
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import MEMORY_QUEUE_SIZE, MEMORY_BATCH_SIZE, MEMORY_BATCH_WAIT
+
+# Messages made only of these words never carry user facts
+TRIVIAL_WORDS = {
+    "hi", "hii", "hello", "hey", "yo", "hiya", "howdy", "morning", "evening", "afternoon", "good", "night",
+    "thanks", "thank", "you", "thx", "ty", "ok", "okay", "k", "cool", "great", "nice", "sure", "yes", "yeah",
+    "yep", "no", "nope", "bye", "goodbye", "cya", "see", "later", "lol", "haha", "hmm", "please", "pls",
+    "how", "are", "whats", "up", "sup", "there", "welcome", "np", "alright", "fine", "done",
+}
+
+_queue: Optional[asyncio.Queue] = None
+_worker: Optional[asyncio.Task] = None
+_stats = {"enqueued": 0, "skipped": 0, "dropped": 0, "batches": 0, "turns": 0, "facts": 0, "errors": 0}
+
+
+def is_trivial(text: str) -> bool:
+    """
+    Cheap local check for greetings, acknowledgements and other fact-free messages.
+    Only short messages made entirely of TRIVIAL_WORDS (or with no words at all,
+    e.g. emoji) are skipped; any other script is always sent for extraction.
+    """
+    words = re.findall(r"\w+", text.lower().replace("'", ""), re.UNICODE)
+    if not words:
+        return True
+    return len(words) <= 6 and all(w in TRIVIAL_WORDS for w in words)
+
+
+def start_memory_worker():
+    """Create the queue and the extraction task on the running event loop (idempotent)."""
+    global _queue, _worker
+    if _queue is not None:
+        return
+    _queue = asyncio.Queue(maxsize=MEMORY_QUEUE_SIZE)
+    _worker = asyncio.create_task(_run())
+    print(f"[MEMORY] worker started (batch {MEMORY_BATCH_SIZE}, wait {MEMORY_BATCH_WAIT}s)")
+
+
+def submit_memory_turn(session_id: str, text: str) -> bool:
+    """Queue a user message for fact extraction; never blocks the caller."""
+    if is_trivial(text):
+        _stats["skipped"] += 1
+        return False
+    start_memory_worker()
+    try:
+        _queue.put_nowait((session_id, text))
+    except asyncio.QueueFull:
+        _stats["dropped"] += 1
+        print("⚠️ Memory queue full, dropping turn")
+        return False
+    _stats["enqueued"] += 1
+    return True
+
+
+async def _next_batch() -> List[Tuple[str, str]]:
+    """First queued turn, plus whatever else arrives within MEMORY_BATCH_WAIT."""
+    batch = [await _queue.get()]
+    deadline = asyncio.get_running_loop().time() + MEMORY_BATCH_WAIT
+    while len(batch) < MEMORY_BATCH_SIZE:
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(_queue.get(), timeout=remaining))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+
+def _extract_and_save(turns: List[Tuple[str, str]]) -> int:
+    # Imported here: createSession pulls in the DB layer and the OpenAI client
+    from config.database import SessionLocal
+    from services.usermemoryService import save_memories
+    from utils.createSession import extract_memory
+
+    facts = extract_memory([{"role": "user", "content": text} for _session_id, text in turns])
+    if not isinstance(facts, dict) or not facts:
+        return 0
+    db = SessionLocal()
+    try:
+        return save_memories(db, facts)
+    finally:
+        db.close()
+
+
+async def _run():
+    while True:
+        batch = await _next_batch()
+        try:
+            saved = await asyncio.to_thread(_extract_and_save, batch)
+            _stats["batches"] += 1
+            _stats["turns"] += len(batch)
+            _stats["facts"] += saved
+        except Exception as e:
+            _stats["errors"] += 1
+            print(f"❌ Memory extraction failed for {len(batch)} turns: {e}")
+        finally:
+            for _ in batch:
+                _queue.task_done()
+
+
+async def drain_memory_queue(timeout: float = 10.0):
+    """Give queued turns a chance to be extracted before shutdown."""
+    if _queue is None:
+        return
+    try:
+        await asyncio.wait_for(_queue.join(), timeout=timeout)
+    except asyncio.TimeoutError:
+        print(f"⚠️ {_queue.qsize()} memory turns still queued at shutdown")
+    if _worker:
+        _worker.cancel()
+
+
+def memory_worker_stats() -> Dict[str, int]:
+    return {**_stats, "queued": _queue.qsize() if _queue else 0}
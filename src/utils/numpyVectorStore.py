@@ -0,0 +1,256 @@
+import os
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+SEARCH_BLOCK_ROWS = 65536  # rows scored per matrix-vector product
+
+
+def quantize_int8(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-vector int8 codes: row ~= codes * scale."""
+    codes = np.empty(matrix.shape, dtype=np.int8)
+    scales = np.empty(matrix.shape[0], dtype=np.float32)
+    for start in range(0, matrix.shape[0], SEARCH_BLOCK_ROWS):
+        block = np.asarray(matrix[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+        block_scales = np.abs(block).max(axis=1) / 127.0
+        block_scales[block_scales == 0] = 1.0
+        codes[start:start + len(block)] = np.round(block / block_scales[:, np.newaxis]).astype(np.int8)
+        scales[start:start + len(block)] = block_scales
+    return codes, scales
+
+
+class NumpyVectorStore:
+    """
+    Minimal vector engine: unit-normalised float32 embeddings in a memory-mapped
+    `vectors-<generation>.npy`, chunk text and metadata in a columnar
+    `columns.json` sidecar.
+    Search is a blocked matrix-vector product with argpartition top-k and
+    exposes the same calls pdf_tool uses on Chroma.
+
+    With quantization="int8" the scan runs over in-memory int8 codes and only
+    the top `k * rescore_factor` candidates are re-scored exactly against the
+    memory-mapped float32 rows, so resident memory is ~1 byte per dimension.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        embedding_function=None,
+        model: Optional[str] = None,
+        quantization: str = "none",
+        rescore_factor: int = 4,
+    ):
+        if quantization not in ("none", "int8"):
+            raise ValueError(f"Unsupported quantization '{quantization}' (expected none or int8)")
+        self.directory = directory
+        self.embedding_function = embedding_function
+        self.model = model
+        self.quantization = quantization
+        self.rescore_factor = max(1, rescore_factor)
+        os.makedirs(directory, exist_ok=True)
+        self._columns_path = os.path.join(directory, "columns.json")
+        self._write_lock = threading.Lock()
+        self._snapshot = self._load()
+        tagged = self._snapshot[1].get("embedding_model")
+        if model and tagged and tagged != model:
+            raise ValueError(f"Store in {directory} holds '{tagged}' vectors, not '{model}'")
+        # Opened without a model (e.g. for maintenance): keep the store's own tag on writes
+        self.model = model or tagged
+
+    # -------------------- Storage --------------------
+    def _load(self) -> Tuple[Optional[np.ndarray], Dict[str, Any], Optional[Tuple[np.ndarray, np.ndarray]]]:
+        if not os.path.exists(self._columns_path):
+            empty = {"ids": [], "documents": [], "metadata": {}, "embedding_model": self.model, "generation": 0}
+            return None, empty, None
+        with open(self._columns_path, "r", encoding="utf-8") as f:
+            columns = json.load(f)
+        matrix = np.load(os.path.join(self.directory, columns["vectors_file"]), mmap_mode="r")
+
+        quantized = None
+        if self.quantization == "int8":
+            if columns.get("codes_file"):
+                quantized = (
+                    np.load(os.path.join(self.directory, columns["codes_file"])),
+                    np.load(os.path.join(self.directory, columns["scales_file"])),
+                )
+            else:
+                # Written without quantization; build codes in memory until the next write
+                quantized = quantize_int8(matrix)
+        return matrix, columns, quantized
+
+    def _generation_files(self, columns: Dict[str, Any]) -> List[str]:
+        return [columns[key] for key in ("vectors_file", "codes_file", "scales_file") if columns.get(key)]
+
+    def _save(self, matrix: np.ndarray, columns: Dict[str, Any]):
+        # Each write gets a new generation file: open memmaps of the previous one
+        # stay valid for in-flight searches (and Windows can't replace a mapped file).
+        _, previous, _ = self._snapshot
+        generation = previous.get("generation", 0) + 1
+        matrix = matrix.astype(np.float32, copy=False)
+        columns.update(embedding_model=self.model, generation=generation, vectors_file=f"vectors-{generation}.npy")
+        np.save(os.path.join(self.directory, columns["vectors_file"]), matrix)
+        if self.quantization == "int8":
+            codes, scales = quantize_int8(matrix)
+            columns.update(codes_file=f"codes-{generation}.npy", scales_file=f"scales-{generation}.npy")
+            np.save(os.path.join(self.directory, columns["codes_file"]), codes)
+            np.save(os.path.join(self.directory, columns["scales_file"]), scales)
+
+        tmp_columns = self._columns_path + ".tmp"
+        with open(tmp_columns, "w", encoding="utf-8") as f:
+            json.dump(columns, f)
+        os.replace(tmp_columns, self._columns_path)
+        self._snapshot = self._load()
+
+        for name in self._generation_files(previous):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass  # still mapped somewhere; removed on a later write
+
+    @staticmethod
+    def _normalise(vectors) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[np.newaxis, :]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def __len__(self) -> int:
+        return len(self._snapshot[1]["ids"])
+
+    def bytes_per_vector(self) -> float:
+        """Resident bytes scanned per vector (float32 rows are only paged in for re-scoring)."""
+        matrix, _, quantized = self._snapshot
+        if matrix is None:
+            return 0.0
+        if quantized is None:
+            return float(matrix.shape[1] * 4)
+        return float(matrix.shape[1] + 4)  # int8 codes + float32 scale
+
+    # -------------------- Writes --------------------
+    def upsert(self, ids: list, vectors: list, texts: list, metadatas: list):
+        new_rows = self._normalise(vectors)
+        with self._write_lock:
+            matrix, columns, _ = self._snapshot
+            replaced = set(ids)
+            keep = [i for i, existing in enumerate(columns["ids"]) if existing not in replaced]
+            base = np.asarray(matrix[keep]) if matrix is not None else np.empty((0, new_rows.shape[1]), np.float32)
+            if base.shape[1] != new_rows.shape[1]:
+                raise ValueError(f"Vector dimension {new_rows.shape[1]} does not match store ({base.shape[1]})")
+
+            meta_columns = {key: [values[i] for i in keep] for key, values in columns["metadata"].items()}
+            keys = set(meta_columns) | {key for meta in metadatas for key in (meta or {})}
+            for key in keys:
+                column = meta_columns.setdefault(key, [None] * len(keep))
+                column.extend((meta or {}).get(key) for meta in metadatas)
+
+            self._save(
+                np.vstack([base, new_rows]),
+                {
+                    "ids": [columns["ids"][i] for i in keep] + list(ids),
+                    "documents": [columns["documents"][i] for i in keep] + list(texts),
+                    "metadata": meta_columns,
+                },
+            )
+
+    def delete(self, where: Dict[str, Any]):
+        with self._write_lock:
+            matrix, columns, _ = self._snapshot
+            if matrix is None:
+                return
+            keep = np.flatnonzero(~self._mask(columns, where))
+            self._save(
+                np.asarray(matrix[keep]),
+                {
+                    "ids": [columns["ids"][i] for i in keep],
+                    "documents": [columns["documents"][i] for i in keep],
+                    "metadata": {k: [v[i] for i in keep] for k, v in columns["metadata"].items()},
+                },
+            )
+
+    # -------------------- Reads --------------------
+    @staticmethod
+    def _mask(columns: Dict[str, list], where: Optional[Dict[str, Any]]) -> np.ndarray:
+        """Rows matching a Chroma-style filter ({key: value} or {key: {"$in": [...]}})."""
+        mask = np.ones(len(columns["ids"]), dtype=bool)
+        for key, condition in (where or {}).items():
+            values = columns["metadata"].get(key, [None] * len(mask))
+            if isinstance(condition, dict) and "$in" in condition:
+                allowed = set(condition["$in"])
+                mask &= np.fromiter((v in allowed for v in values), dtype=bool, count=len(mask))
+            else:
+                mask &= np.fromiter((v == condition for v in values), dtype=bool, count=len(mask))
+        return mask
+
+    def _metadata_at(self, columns: Dict[str, list], row: int) -> Dict[str, Any]:
+        return {k: v[row] for k, v in columns["metadata"].items() if v[row] is not None}
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Document, float]]:
+        """(doc, cosine distance) pairs, lowest distance first, like Chroma."""
+        matrix, columns, quantized = self._snapshot
+        if matrix is None or not len(columns["ids"]):
+            return []
+        query = self._normalise(embedding)[0]
+        mask = self._mask(columns, filter) if filter else None
+
+        if quantized is None:
+            rows = np.arange(matrix.shape[0])
+            scores = self._scan(matrix, query)
+        else:
+            # Approximate scan over int8 codes, then exact re-scoring of the shortlist
+            codes, scales = quantized
+            approx = self._scan(codes, query) * scales
+            if mask is not None:
+                approx[~mask] = -np.inf
+            shortlist = min(k * self.rescore_factor, len(approx))
+            rows = np.sort(np.argpartition(-approx, shortlist - 1)[:shortlist])
+            rows = rows[np.isfinite(approx[rows])]
+            scores = np.asarray(matrix[rows]) @ query if len(rows) else np.empty(0, np.float32)
+            mask = None
+
+        if mask is not None:
+            scores[~mask] = -np.inf
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (
+                Document(page_content=columns["documents"][rows[i]], metadata=self._metadata_at(columns, rows[i])),
+                float(1.0 - scores[i]),
+            )
+            for i in top
+            if np.isfinite(scores[i])
+        ]
+
+    @staticmethod
+    def _scan(matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
+        scores = np.empty(matrix.shape[0], dtype=np.float32)
+        for start in range(0, matrix.shape[0], SEARCH_BLOCK_ROWS):
+            block = np.asarray(matrix[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+        return scores
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        vector = self.embedding_function.embed_query(query)
+        return [doc for doc, _ in self.similarity_search_by_vector_with_relevance_scores(vector, k, filter)]
+
+    def get(self, where: Optional[Dict[str, Any]] = None, include_embeddings: bool = True) -> Dict[str, list]:
+        """Rows matching `where` in the shape chromadb's collection.get() returns."""
+        matrix, columns, _ = self._snapshot
+        if matrix is None:
+            return {"ids": [], "embeddings": [], "documents": [], "metadatas": []}
+        rows = np.flatnonzero(self._mask(columns, where))
+        return {
+            "ids": [columns["ids"][i] for i in rows],
+            "embeddings": np.asarray(matrix[rows]) if include_embeddings else None,
+            "documents": [columns["documents"][i] for i in rows],
+            "metadatas": [self._metadata_at(columns, i) for i in rows],
+        }
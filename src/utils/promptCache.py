@@ -0,0 +1,160 @@
+import time
+import uuid
+import asyncio
+import hashlib
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from google.genai import types
+
+from config.settings import GEMINI_CONTEXT_CACHE, GEMINI_CACHE_TTL
+from utils.deadline import time_left
+
+# Recreate a cached content this long before it expires
+REFRESH_MARGIN = 60
+# Seconds a create call may take before the request goes ahead with the prompt inline
+CREATE_TIMEOUT = 10
+
+
+class LocalCaches:
+    """
+    In-process stand-in for `client.aio.caches`: same create/delete calls,
+    nothing leaves the process. Used by the "local" mode and in tests.
+    """
+
+    def __init__(self):
+        self._items: Dict[str, Any] = {}
+
+    async def create(self, model: str, config: types.CreateCachedContentConfig):
+        name = f"local/cachedContents/{uuid.uuid4().hex[:12]}"
+        self._items[name] = SimpleNamespace(name=name, model=model, config=config)
+        return self._items[name]
+
+    async def delete(self, name: str, config: Optional[Any] = None):
+        self._items.pop(name, None)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class PromptCache:
+    """
+    Keeps the static part of a request (system instruction + tool declarations)
+    in a Gemini cached content and hands out the config fields that reference it.
+    Falls back to sending the prefix inline when caching is off or creation fails
+    (e.g. the prefix is below the model's minimum cacheable size).
+    """
+
+    def __init__(self, mode: str, ttl: int):
+        self.mode = mode if mode in ("off", "explicit", "local") else "off"
+        self.ttl = max(ttl, REFRESH_MARGIN * 2)
+        self.local = LocalCaches()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._failed: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.creates = 0
+        self.failures = 0
+        self.inline = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    @staticmethod
+    def prefix_key(model: str, system_instruction: str, tools_key: Optional[str]) -> str:
+        payload = f"{model}\n{tools_key or ''}\n{system_instruction}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _caches(self, api_client):
+        return self.local if self.mode == "local" else api_client.aio.caches
+
+    async def config_fields(self, api_client, model: str, system_instruction: str, tools: List, tools_key: Optional[str]) -> Dict[str, Any]:
+        """Fields for GenerateContentConfig: either `cached_content` or the inline prefix."""
+        inline = {"system_instruction": system_instruction, "tools": tools}
+        if self.mode == "off":
+            self.inline += 1
+            return inline
+
+        key = self.prefix_key(model, system_instruction, tools_key)
+        entry = await self._entry(api_client, key, model, system_instruction, tools)
+        if entry is None:
+            self.inline += 1
+            return inline
+        # The local stand-in can't be referenced by the real API, so its prefix stays inline
+        return inline if self.mode == "local" else {"cached_content": entry["name"]}
+
+    async def _entry(self, api_client, key: str, model: str, system_instruction: str, tools: List) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry and entry["expires_at"] - REFRESH_MARGIN > now:
+            self.hits += 1
+            return entry
+        if now - self._failed.get(key, 0) < self.ttl:
+            return None
+
+        async with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry["expires_at"] - REFRESH_MARGIN > time.time():
+                self.hits += 1
+                return entry
+            caches = self._caches(api_client)
+            try:
+                cached = await asyncio.wait_for(
+                    caches.create(
+                        model=model,
+                        config=types.CreateCachedContentConfig(
+                            system_instruction=system_instruction,
+                            tools=tools,
+                            ttl=f"{self.ttl}s",
+                            display_name="shop-chatbot-tool-prompt",
+                        ),
+                    ),
+                    timeout=time_left(CREATE_TIMEOUT),
+                )
+            except asyncio.TimeoutError:
+                # Slow, not broken: try again on the next request
+                print("⚠️ Gemini cached content creation timed out, sending prompt inline")
+                return None
+            except Exception as e:
+                self.failures += 1
+                self._failed[key] = time.time()
+                print(f"⚠️ Could not create Gemini cached content, sending prompt inline: {e}")
+                return None
+
+            # Only the current prefix is kept; replaced ones are deleted in the background
+            stale = [old["name"] for old in self._entries.values()]
+            self._entries = {key: {"name": cached.name, "expires_at": time.time() + self.ttl}}
+            self.creates += 1
+            print(f"🗄️ Cached system prompt + tools as {cached.name} for {self.ttl}s")
+            for name in stale:
+                asyncio.create_task(self._delete(caches, name))
+            return self._entries[key]
+
+    @staticmethod
+    async def _delete(caches, name: str):
+        try:
+            await caches.delete(name=name)
+        except Exception as e:
+            print(f"⚠️ Could not delete cached content {name}: {e}")
+
+    def record_usage(self, usage_metadata):
+        """Prompt vs cached input tokens as reported by Gemini (covers implicit caching too)."""
+        if usage_metadata is None:
+            return
+        self.prompt_tokens += getattr(usage_metadata, "prompt_token_count", None) or 0
+        self.cached_tokens += getattr(usage_metadata, "cached_content_token_count", None) or 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "creates": self.creates,
+            "failures": self.failures,
+            "inline": self.inline,
+            "prompt_tokens_total": self.prompt_tokens,
+            "cached_tokens_total": self.cached_tokens,
+            "cached_ratio": round(self.cached_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0,
+        }
+
+
+prompt_cache = PromptCache(GEMINI_CONTEXT_CACHE, GEMINI_CACHE_TTL)
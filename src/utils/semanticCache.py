@@ -0,0 +1,97 @@
+import re
+import time
+import threading
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_SIZE
+
+_TERM_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+
+
+def identifier_terms(text: str) -> Tuple[str, ...]:
+    """
+    Terms with a digit (SKUs, order numbers, sizes), sorted. Embeddings barely
+    move when one of these changes, so they belong in the cache scope.
+    """
+    return tuple(sorted({term for term in _TERM_RE.findall(text.lower()) if any(c.isdigit() for c in term)}))
+
+
+class SemanticAnswerCache:
+    """
+    Answers keyed by query embedding.
+    A lookup hits when a cached query in the same scope (e.g. document filter)
+    has cosine similarity >= `threshold`; the check is one matrix-vector product.
+    """
+
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD, max_entries: int = SEMANTIC_CACHE_SIZE):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._vectors: Optional[np.ndarray] = None  # (n, dim) unit vectors
+        self._scopes: List[Hashable] = []
+        self._answers: List[str] = []
+        self._last_used: List[float] = []
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def lookup(self, vector, scope: Hashable = None) -> Optional[str]:
+        query = self._unit(vector)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != query.shape[0]:
+                self.misses += 1
+                return None
+            sims = self._vectors @ query
+            sims[np.array([s != scope for s in self._scopes])] = -1.0
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._last_used[best] = time.time()
+            return self._answers[best]
+
+    def store(self, vector, answer: str, scope: Hashable = None):
+        query = self._unit(vector)
+        with self._lock:
+            if self._vectors is not None and self._vectors.shape[1] != query.shape[0]:
+                # Embedding model changed; old vectors are not comparable
+                self._reset()
+            if self._vectors is not None and len(self._answers) >= self.max_entries:
+                oldest = int(np.argmin(self._last_used))
+                self._vectors = np.delete(self._vectors, oldest, axis=0)
+                for column in (self._scopes, self._answers, self._last_used):
+                    del column[oldest]
+            row = query[np.newaxis, :]
+            self._vectors = row if self._vectors is None else np.vstack([self._vectors, row])
+            self._scopes.append(scope)
+            self._answers.append(answer)
+            self._last_used.append(time.time())
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._answers),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+answer_cache = SemanticAnswerCache()
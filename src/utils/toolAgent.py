@@ -1,18 +1,23 @@
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from tools.toolmanager import handle_tool_call, parse_use_mcp_tool
-from prompt.toolPrompt import build_tool_prompt
+from prompt.toolPrompt import build_tool_prompt, build_context_suffix
 from dotenv import load_dotenv
 from utils.createSession import (
     updated_sessions,
     store_message_db,
-    extract_memory,
     retrieve_memory_db,
-    save_memory_db,
 )
 from mcp_client import mcp_client  
+from config.settings import GEMINI_MODEL, GEMINI_MAX_CONCURRENCY, GEMINI_TIMEOUT
+from utils.toolCatalog import tool_catalog
+from utils.memoryWorker import submit_memory_turn
+from utils.historyManager import history_manager
+from utils.promptCache import prompt_cache
+from utils.deadline import deadline_scope, request_budget, current_deadline, time_left
 import re
 import json
 import os
+import asyncio
 from google import genai
 from google.genai import types
 
@@ -20,88 +25,17 @@ load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 # Keep a global client fallback in case ToolAgent wasn't passed an api_client
 client = genai.Client(api_key=GEMINI_API_KEY)
-
-
-# ==========================================================
-# 🧹 Schema Cleaner (Unchanged)
-# ==========================================================
-def clean_schema(schema):
-    """Recursively sanitize JSON schema for Gemini tool specs."""
-    if isinstance(schema, dict):
-        for bad_key in [
-            "additional_properties",
-            "additionalProperties",
-            "examples",
-            "nullable",
-            "default",
-            "title",
-            "description",
-        ]:
-            schema.pop(bad_key, None)
-
-        if "properties" in schema:
-            props = schema["properties"]
-            if isinstance(props, dict):
-                for key, val in list(props.items()):
-                    if not isinstance(val, dict):
-                        props[key] = {"type": "string", "description": str(val)}
-                    else:
-                        props[key] = clean_schema(val)
-            else:
-                schema["properties"] = {}
-
-        if "items" in schema:
-            schema["items"] = clean_schema(schema["items"])
-
-        if "required" in schema:
-            valid_props = set(schema.get("properties", {}).keys())
-            valid_required = [r for r in schema["required"] if r in valid_props]
-            if valid_required:
-                schema["required"] = valid_required
-            else:
-                schema.pop("required", None)
-
-        if schema.get("type") not in ["object", "array", "string", "number", "boolean"]:
-            schema["type"] = "object"
-            schema.setdefault("properties", {})
-
-        schema = {k: v for k, v in schema.items() if v is not None}
-
-    elif isinstance(schema, list):
-        return [clean_schema(i) for i in schema]
-
-    return schema
-
-
-# ==========================================================
-# 🔧 Convert OpenAI-style → Gemini tools
-# ==========================================================
-def convert_openai_tools_to_gemini(tools_schema):
-    gemini_tool = types.Tool(function_declarations=[])
-
-    for tool in tools_schema:
-        fn = tool.get("function", tool)
-        if not isinstance(fn, dict) or "name" not in fn:
-            print(f"⚠️ Skipping malformed tool schema: {tool}")
-            continue
-
-        clean_params = clean_schema(
-            fn.get("parameters", {"type": "object", "properties": {}})
-        )
-        gemini_tool.function_declarations.append(
-            types.FunctionDeclaration(
-                name=fn["name"],
-                description=fn.get("description", ""),
-                parameters=clean_params,
-            )
-        )
-    print('\033[92m=====gemini_tool=====\033[0m',gemini_tool)
-    return [gemini_tool]
+# Caps concurrent Gemini round trips across all chats (web, Telegram, WhatsApp)
+_gemini_semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+# Streamed parts buffered between Gemini and a slower client
+STREAM_BUFFER_CHUNKS = 256
+_STREAM_END = object()
 
 
 class ToolAgent:
-    def __init__(self, session_id: str, api_client: Optional[Any], tools_schema: Optional[Dict] = None, db: Optional[Any] = None):
+    def __init__(self, session_id: str, api_client: Optional[Any], tools_schema: Optional[Dict] = None, db: Optional[Any] = None, channel: str = "web"):
         self.session_id = session_id
+        self.channel = channel  # picks the request budget (web, telegram, whatsapp)
         self.api_client = api_client or client
         self.tools_schema = tools_schema or {}
         self.message_history: List[Dict] = []
@@ -110,8 +44,10 @@ class ToolAgent:
         self.context = []
         self.db = db
         self.system_prompt = ""
+        self.prefix_fields: Dict[str, Any] = {}  # cached_content, or the inline system prompt + tools
         self.tools_executed = set()  # Track executed tools
         self.mode = "action"
+        self.completed_tools: List[Dict] = []  # results that finished this turn, for partial answers
 
     # -------------------- History Logging --------------------
     def add_to_history(
@@ -130,76 +66,79 @@ class ToolAgent:
         self.message_history.append(message)
         updated_sessions(self.session_id, role, content or "")
 
-    # -------------------- Start Task --------------------
-    async def start_task(
-        self, task: str, conversation_history: Optional[List] = None, mode: Optional[str] = "action"
-    ) -> str:
+    # -------------------- Task Setup --------------------
+    async def _prepare_task(self, task: str, conversation_history: Optional[List], mode: Optional[str]) -> Tuple[List, List]:
+        """Reset state, record the task, build the system prompt and tools; returns (contents, gemini_tools)."""
         self.result = ""
         self.message_history = []
         self.tool_call_error_attempt = 0
         self.mode = mode
+        self.completed_tools = []
+
+        # -------------------- Prepare Context --------------------
+        # Recent turns within the token budget; older ones live in the rolling summary
+        summary, recent_turns = history_manager.build(self.session_id, conversation_history, task)
 
         # Wrap user task
         task_content = f"<task>\n{task}\n</task>"
         self.add_to_history("user", task_content)
 
         # -------------------- Extract & Save User Info --------------------
-        try:
-            extracted = extract_memory([{"role": "user", "content": task}])
-            if extracted:
-                for field, value in extracted.items():
-                    save_memory_db(field, value)
-        except Exception as e:
-            print(f"❌ Error extracting memory: {e}")
+        # Background worker batches turns into one extraction call; not awaited
+        submit_memory_turn(self.session_id, task)
 
-        # -------------------- Prepare Context --------------------
-        last_messages = self.message_history[-8:]  # last 8 messages
-        history_text = "\n".join([f"{m['role']}: {m['content']}" for m in last_messages])
         memory_text = retrieve_memory_db(self.db, k=3) if self.db is not None else ""
 
-        self.system_prompt = await build_tool_prompt(memory_text)
+        # Static prefix (identity, rules, tools) first so it can be cached; per-request bits ride with the task
+        self.system_prompt = build_tool_prompt()
+        context_suffix = build_context_suffix(memory_text, summary)
 
         # -------------------- Prepare Tools (Once) --------------------
-        merged_tools = list(self.tools_schema)
-        try:
-            from mcp_client import mcp_client
-            mcp_tool_data = await mcp_client.get_all_tools()
-            for server_name, tools in mcp_tool_data.items():
-                for tool in tools:
-                    schema = tool.get("inputSchema", {"type": "object", "properties": {}})
-                    schema = clean_schema(schema)
-                    desc = tool.get('description', 'No description provided.')
-                    # Truncate long descriptions to save tokens
-                    if len(desc) > 100:
-                        desc = desc[:97] + "..."
-                    merged_tools.append({
-                        "function": {
-                            "name": tool["name"],
-                            "description": f"[{server_name}] {desc}",
-                            "parameters": schema,
-                        }
-                    })
-            print(f"🧩 Loaded {len(merged_tools)} total tools (local + MCP).")
-        except Exception as e:
-            print(f"⚠️ Could not load MCP tools: {e}")
-
-        # Deduplicate by tool name
-        seen_names = set()
-        unique_tools = []
-        for tool in merged_tools:
-            fn = tool.get("function", tool)
-            name = fn.get("name")
-            if name and name not in seen_names:
-                seen_names.add(name)
-                unique_tools.append(tool)
-        
-        gemini_tools = convert_openai_tools_to_gemini(unique_tools)
+        gemini_tools = await tool_catalog.get(self.tools_schema)
+        self.prefix_fields = await prompt_cache.config_fields(
+            self.api_client, GEMINI_MODEL, self.system_prompt, gemini_tools, tool_catalog.key
+        )
+
+        return self._history_contents(recent_turns, task_content, context_suffix), gemini_tools
+
+    @staticmethod
+    def _history_contents(turns: List[Tuple[str, str]], task_content: str, context_suffix: str) -> List:
+        """Gemini contents for the packed turns plus context and task; same-role neighbours are merged."""
+        contents = []
+        for role, text in turns + [("user", context_suffix), ("user", task_content)]:
+            gemini_role = "model" if role == "assistant" else "user"
+            if not contents and gemini_role == "model":
+                continue  # a conversation has to open with a user turn
+            if contents and contents[-1].role == gemini_role:
+                contents[-1].parts.append(types.Part(text=text))
+            else:
+                contents.append(types.Content(role=gemini_role, parts=[types.Part(text=text)]))
+        return contents
+
+    # -------------------- Start Task --------------------
+    async def start_task(
+        self, task: str, conversation_history: Optional[List] = None, mode: Optional[str] = "action"
+    ) -> str:
+        # One budget for the whole message; Gemini, tool, MCP and HTTP timeouts are capped by it
+        with deadline_scope(request_budget(self.channel)) as deadline:
+            try:
+                await asyncio.wait_for(self._run_task(task, conversation_history, mode), timeout=deadline.remaining())
+            except asyncio.TimeoutError:
+                # wait_for cancelled whatever was still running (Gemini call, tool calls)
+                print(f'\033[91m=====Request budget of {deadline.budget:g}s used up=====\033[0m')
+                self.result = self._partial_answer()
+
+        self.add_to_history("assistant", self.result)
+        store_message_db(self.session_id, "assistant", self.result)
+        return self.result
+
+    async def _run_task(self, task: str, conversation_history: Optional[List], mode: Optional[str]):
+        conversation_contents, gemini_tools = await self._prepare_task(task, conversation_history, mode)
 
         # -------------------- Task Loop (Max 5 iterations) --------------------
         max_iterations = 5
         iteration = 0
-        conversation_contents = [types.Content(role="user", parts=[types.Part(text=task_content)])]
-        
+
         while iteration < max_iterations:
             iteration += 1
             print(f'\033[93m=====Iteration {iteration}/{max_iterations}=====\033[0m')
@@ -214,8 +153,192 @@ class ToolAgent:
             self.result = "Task completed after maximum iterations."
             print('\033[91m=====Max iterations reached=====\033[0m')
 
-        store_message_db(self.session_id, "assistant", self.result)
-        return self.result
+    def _partial_answer(self, drafted: str = "") -> str:
+        """What the user gets when the budget runs out: any drafted text plus the tool results that finished."""
+        finished = [r for r in self.completed_tools if r.get("status") == "success"]
+        if not drafted and not finished:
+            return "Sorry, that took longer than I can spend on one message. Please try again."
+        lines = [drafted.strip()] if drafted.strip() else []
+        if finished:
+            lines.append("I ran out of time before finishing everything. Here's what I have so far:")
+            for r in finished:
+                message = str(r.get("message", ""))
+                lines.append(f"- **{r.get('tool')}**: {message[:500] + '...' if len(message) > 500 else message}")
+        else:
+            lines.append("_(I ran out of time before finishing this answer.)_")
+        return "\n".join(lines)
+
+    # -------------------- Gemini Helpers --------------------
+    def _generation_config(self, gemini_tools: List) -> types.GenerateContentConfig:
+        prefix = self.prefix_fields or {"system_instruction": self.system_prompt, "tools": gemini_tools}
+        return types.GenerateContentConfig(
+            temperature=0.3,
+            max_output_tokens=900,
+            **prefix
+        )
+
+    async def _run_function_call(self, fc) -> Tuple[Dict, types.Part]:
+        """Execute one Gemini function call; returns (tool result, function_response part)."""
+        function_name = fc.name
+        function_args = dict(fc.args or {})
+
+        tool_call_dict = {
+            "function": {
+                "name": function_name,
+                "arguments": function_args
+            }
+        }
+
+        print('\033[92m=====executing_tool=====\033[0m', function_name, function_args)
+        result = await handle_tool_call(tool_call_dict, self.db)
+        print('\033[92m=====tool_result=====\033[0m', result)
+        self.completed_tools.append(result)
+
+        part = types.Part(function_response=types.FunctionResponse(
+            name=function_name,
+            response={"result": result.get("message", str(result))}
+        ))
+        return result, part
+
+    async def _run_function_calls(self, function_calls: List) -> List[types.Part]:
+        """
+        Run every function call of one turn concurrently (each bounded by its tool
+        timeout); responses come back in the order Gemini asked for them.
+        """
+        outcomes = await asyncio.gather(*(self._run_function_call(fc) for fc in function_calls))
+        return self._collect_tool_responses(outcomes)
+
+    def _collect_tool_responses(self, outcomes: List[Tuple[Dict, types.Part]]) -> List[types.Part]:
+        for result, _part in outcomes:
+            self.add_to_history("function", result.get("message", str(result)))
+        return [part for _result, part in outcomes]
+
+    # -------------------- Streaming --------------------
+    async def stream_task(
+        self, task: str, conversation_history: Optional[List] = None, mode: Optional[str] = "action"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Same loop as start_task, but yields events as they happen:
+        {"type": "delta", "text"}, {"type": "tool_call", "name", "args"},
+        {"type": "tool_result", "name", "status"} and finally {"type": "done", "result"}.
+        The final answer is persisted even if the client disconnects mid-stream;
+        if the request budget runs out, the partial answer comes as an "error" event.
+        """
+        # Same per-message budget as start_task; every wait below is capped by it
+        with deadline_scope(request_budget(self.channel)) as deadline:
+            streamed_text = ""
+            try:
+                # Inside the try, so a failure here still ends with an error event and is persisted
+                conversation_contents, gemini_tools = await self._prepare_task(task, conversation_history, mode)
+                max_iterations = 5
+                for iteration in range(1, max_iterations + 1):
+                    print(f'\033[93m=====Stream iteration {iteration}/{max_iterations}=====\033[0m')
+                    reply, model_parts, function_calls = "", [], []
+                    async for kind, value in self._stream_response(conversation_contents, gemini_tools):
+                        if kind == "delta":
+                            reply += value
+                            streamed_text += value
+                            yield {"type": "delta", "text": value}
+                        elif kind == "part":
+                            model_parts.append(value)
+                            if getattr(value, "function_call", None):
+                                function_calls.append(value.function_call)
+
+                    if not function_calls:
+                        self.result = reply or "I apologize, but I couldn't generate a response. Please try again."
+                        break
+
+                    self.add_to_history("assistant", reply)
+                    conversation_contents.append(types.Content(role="model", parts=model_parts))
+                    for fc in function_calls:
+                        yield {"type": "tool_call", "name": fc.name, "args": dict(fc.args or {})}
+                    # Concurrent, reported as each finishes, reassembled in call order
+                    tasks = [asyncio.create_task(self._run_function_call(fc)) for fc in function_calls]
+                    try:
+                        for finished in asyncio.as_completed(tasks, timeout=deadline.remaining()):
+                            result, _part = await finished
+                            yield {"type": "tool_result", "name": result.get("tool"), "status": result.get("status")}
+                    finally:
+                        for task in tasks:
+                            task.cancel()
+                    tool_response_parts = self._collect_tool_responses([task.result() for task in tasks])
+                    conversation_contents.append(types.Content(role="user", parts=tool_response_parts))
+                else:
+                    self.result = self.result or "Task completed after maximum iterations."
+                    print('\033[91m=====Max iterations reached=====\033[0m')
+
+                yield {"type": "done", "result": self.result}
+
+            except asyncio.TimeoutError:
+                if deadline.expired():
+                    print(f"❌ Request budget of {deadline.budget:g}s used up mid-stream")
+                    self.result = self._partial_answer(streamed_text)
+                    yield {"type": "error", "message": "deadline", "result": self.result}
+                else:
+                    print(f"❌ Gemini stream timed out after {GEMINI_TIMEOUT}s")
+                    self.result = streamed_text or "The assistant took too long to respond. Please try again."
+                    yield {"type": "error", "message": "timeout", "result": self.result}
+            except Exception as e:
+                print(f"❌ Exception during stream_task(): {e}")
+                self.result = streamed_text or f"An error occurred: {e}"
+                yield {"type": "error", "message": str(e), "result": self.result}
+            finally:
+                # Runs on normal completion and when the client goes away (generator closed)
+                self.add_to_history("assistant", self.result or streamed_text)
+                store_message_db(self.session_id, "assistant", self.result or streamed_text)
+
+    async def _stream_response(self, conversation_contents: List, gemini_tools: List) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Yields ("delta", text) for text as it arrives and ("part", part) for every model part.
+        A separate task reads the Gemini stream into a bounded queue, so the concurrency
+        slot is released when Gemini finishes, not when a slow client has read everything.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_BUFFER_CHUNKS)
+        reader = asyncio.create_task(self._read_stream(conversation_contents, gemini_tools, queue))
+        try:
+            while True:
+                item = await queue.get()
+                if item is _STREAM_END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Client gone or stream failed: stop reading and free the slot
+            reader.cancel()
+
+    async def _read_stream(self, conversation_contents: List, gemini_tools: List, queue: asyncio.Queue):
+        """Producer for _stream_response; holds the Gemini semaphore only while the stream is open."""
+        api_client = self.api_client or client
+        try:
+            async with _gemini_semaphore:
+                stream = await asyncio.wait_for(
+                    api_client.aio.models.generate_content_stream(
+                        model=GEMINI_MODEL,
+                        contents=conversation_contents,
+                        config=self._generation_config(gemini_tools),
+                    ),
+                    timeout=time_left(GEMINI_TIMEOUT),
+                )
+                iterator = stream.__aiter__()
+                usage = None
+                while True:
+                    try:
+                        # Timeout applies per chunk, so long answers aren't cut off
+                        chunk = await asyncio.wait_for(iterator.__anext__(), timeout=time_left(GEMINI_TIMEOUT))
+                    except StopAsyncIteration:
+                        break
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    for candidate in (chunk.candidates or [])[:1]:
+                        for part in getattr(candidate.content, "parts", None) or []:
+                            if getattr(part, "text", None) and not getattr(part, "thought", False):
+                                await queue.put(("delta", part.text))
+                            await queue.put(("part", part))
+            prompt_cache.record_usage(usage)
+            await queue.put(_STREAM_END)
+        except Exception as e:
+            # Re-raised in the consumer (timeouts included)
+            await queue.put(e)
 
     # # # -------------------- API Requests / Tool Execution --------------------
     async def make_api_requests(self, conversation_contents: List, gemini_tools: List) -> Tuple[bool, Optional[str]]:
@@ -226,25 +349,23 @@ class ToolAgent:
         """
 
         try:
-            # Build config
-            config = types.GenerateContentConfig(
-                temperature=0.3,
-                max_output_tokens=900,
-                system_instruction=self.system_prompt,
-                tools=gemini_tools
-            )
-            print('\033[92m=====tools=====\033[0m',gemini_tools)
-            print('\033[92m=====config=====\033[0m', config)
+            config = self._generation_config(gemini_tools)
 
             api_client = self.api_client or client
 
-            response = api_client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=conversation_contents,
-                config=config
-            )
+            # Async client so other chats keep running while this one waits on Gemini
+            async with _gemini_semaphore:
+                response = await asyncio.wait_for(
+                    api_client.aio.models.generate_content(
+                        model=GEMINI_MODEL,
+                        contents=conversation_contents,
+                        config=config
+                    ),
+                    timeout=time_left(GEMINI_TIMEOUT),
+                )
 
             print('\033[92m=====raw_response=====\033[0m', response)
+            prompt_cache.record_usage(getattr(response, "usage_metadata", None))
 
             # Parse Gemini response
             assistant_reply = ""
@@ -299,32 +420,8 @@ class ToolAgent:
                 # Add model response to conversation
                 conversation_contents.append(candidate.content)
                 
-                # Execute tools and add results
-                tool_response_parts = []
-                for fc in function_calls:
-                    function_name = fc.name
-                    function_args = dict(fc.args)
-                    
-                    tool_call_dict = {
-                        "function": {
-                            "name": function_name,
-                            "arguments": function_args
-                        }
-                    }
-                    
-                    print('\033[92m=====executing_tool=====\033[0m', function_name, function_args)
-                    result = await handle_tool_call(tool_call_dict, self.db)
-                    print('\033[92m=====tool_result=====\033[0m', result)
-                    
-                    tool_result_content = result.get("message", str(result))
-                    self.add_to_history("function", tool_result_content)
-                    
-                    tool_response_parts.append(
-                        types.Part(function_response=types.FunctionResponse(
-                            name=function_name,
-                            response={"result": tool_result_content}
-                        ))
-                    )
+                # Execute tools concurrently and add results in call order
+                tool_response_parts = await self._run_function_calls(function_calls)
                 
                 # Add tool results to conversation
                 conversation_contents.append(types.Content(role="user", parts=tool_response_parts))
@@ -337,6 +434,16 @@ class ToolAgent:
             
             return True, None
 
+        except asyncio.TimeoutError:
+            deadline = current_deadline()
+            if deadline is not None and deadline.expired():
+                print(f"❌ Request budget of {deadline.budget:g}s used up waiting on Gemini")
+                self.result = self._partial_answer()
+            else:
+                print(f"❌ Gemini call timed out after {GEMINI_TIMEOUT}s")
+                self.result = "The assistant took too long to respond. Please try again."
+            return True, self.result
+
         except Exception as e:
             print(f"❌ Exception during make_api_requests(): {e}")
             self.result = f"An error occurred: {e}"
@@ -0,0 +1,197 @@
+import copy
+import json
+import time
+import asyncio
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.genai import types
+
+
+# ==========================================================
+# 🧹 Schema Cleaner (Unchanged)
+# ==========================================================
+def clean_schema(schema):
+    """Recursively sanitize JSON schema for Gemini tool specs."""
+    if isinstance(schema, dict):
+        for bad_key in [
+            "additional_properties",
+            "additionalProperties",
+            "examples",
+            "nullable",
+            "default",
+            "title",
+            "description",
+        ]:
+            schema.pop(bad_key, None)
+
+        if "properties" in schema:
+            props = schema["properties"]
+            if isinstance(props, dict):
+                for key, val in list(props.items()):
+                    if not isinstance(val, dict):
+                        props[key] = {"type": "string", "description": str(val)}
+                    else:
+                        props[key] = clean_schema(val)
+            else:
+                schema["properties"] = {}
+
+        if "items" in schema:
+            schema["items"] = clean_schema(schema["items"])
+
+        if "required" in schema:
+            valid_props = set(schema.get("properties", {}).keys())
+            valid_required = [r for r in schema["required"] if r in valid_props]
+            if valid_required:
+                schema["required"] = valid_required
+            else:
+                schema.pop("required", None)
+
+        if schema.get("type") not in ["object", "array", "string", "number", "boolean"]:
+            schema["type"] = "object"
+            schema.setdefault("properties", {})
+
+        schema = {k: v for k, v in schema.items() if v is not None}
+
+    elif isinstance(schema, list):
+        return [clean_schema(i) for i in schema]
+
+    return schema
+
+
+# ==========================================================
+# 🔧 Convert OpenAI-style → Gemini tools
+# ==========================================================
+def convert_openai_tools_to_gemini(tools_schema):
+    gemini_tool = types.Tool(function_declarations=[])
+
+    for tool in tools_schema:
+        fn = tool.get("function", tool)
+        if not isinstance(fn, dict) or "name" not in fn:
+            print(f"⚠️ Skipping malformed tool schema: {tool}")
+            continue
+
+        clean_params = clean_schema(
+            fn.get("parameters", {"type": "object", "properties": {}})
+        )
+        gemini_tool.function_declarations.append(
+            types.FunctionDeclaration(
+                name=fn["name"],
+                description=fn.get("description", ""),
+                parameters=clean_params,
+            )
+        )
+    return [gemini_tool]
+
+
+# ==========================================================
+# 🧩 Tool Catalog (local + MCP declarations, compiled once)
+# ==========================================================
+MCP_DESCRIPTION_LIMIT = 100  # characters; keeps declarations small
+
+
+def _merge_tools(tools_schema, mcp_tool_data: Optional[Dict[str, list]]) -> List[Dict]:
+    """Local schemas plus MCP tools in OpenAI function format, first name wins."""
+    merged_tools = copy.deepcopy(list(tools_schema))
+    for server_name, tools in (mcp_tool_data or {}).items():
+        for tool in tools:
+            schema = clean_schema(copy.deepcopy(tool.get("inputSchema") or {"type": "object", "properties": {}}))
+            desc = tool.get("description") or "No description provided."
+            # Truncate long descriptions to save tokens
+            if len(desc) > MCP_DESCRIPTION_LIMIT:
+                desc = desc[:MCP_DESCRIPTION_LIMIT - 3] + "..."
+            merged_tools.append({
+                "function": {
+                    "name": tool["name"],
+                    "description": f"[{server_name}] {desc}",
+                    "parameters": schema,
+                }
+            })
+
+    # Deduplicate by tool name
+    seen_names = set()
+    unique_tools = []
+    for tool in merged_tools:
+        fn = tool.get("function", tool)
+        name = fn.get("name")
+        if name and name not in seen_names:
+            seen_names.add(name)
+            unique_tools.append(tool)
+    return unique_tools
+
+
+def catalog_key(tools_schema, mcp_tool_data: Optional[Dict[str, list]]) -> str:
+    """Hash of everything the compiled declarations depend on."""
+    payload = json.dumps({"local": tools_schema, "mcp": mcp_tool_data}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ToolCatalog:
+    """
+    Gemini tool declarations compiled once and shared by every request.
+    Recompiled only when the local schema or some MCP server's tool list changes.
+    The catalog hash itself is only recomputed when the MCP catalog version moves.
+    """
+
+    def __init__(self):
+        self._compiled: Dict[str, List[types.Tool]] = {}
+        self._lock = asyncio.Lock()
+        self.key: Optional[str] = None
+        self._key_version = None
+        self._version_key: Optional[str] = None
+        self.tool_names: List[str] = []
+        self.compiles = 0
+        self.hits = 0
+        self.last_compile_seconds = 0.0
+
+    async def _mcp_tools(self) -> Tuple[Optional[Dict[str, list]], Optional[int]]:
+        """(tool lists per server, catalog version); (None, None) when MCP is unavailable."""
+        try:
+            from mcp_client import mcp_client
+            return await mcp_client.get_all_tools(), mcp_client.catalog_version
+        except Exception as e:
+            print(f"⚠️ Could not load MCP tools: {e}")
+            return None, None
+
+    def _key(self, tools_schema, mcp_tool_data, mcp_version) -> str:
+        # Local schemas are static module data, so the list's identity stands in for its contents
+        version = (id(tools_schema), mcp_version)
+        if version != self._key_version:
+            self._version_key = catalog_key(tools_schema, mcp_tool_data)
+            self._key_version = version
+        return self._version_key
+
+    async def get(self, tools_schema) -> List[types.Tool]:
+        mcp_tool_data, mcp_version = await self._mcp_tools()
+        key = self._key(tools_schema, mcp_tool_data, mcp_version)
+        compiled = self._compiled.get(key)
+        if compiled is not None:
+            self.hits += 1
+            return compiled
+
+        async with self._lock:
+            if key not in self._compiled:
+                start = time.perf_counter()
+                unique_tools = _merge_tools(tools_schema, mcp_tool_data)
+                # Only the current catalog is kept; older ones are unreachable
+                self._compiled = {key: convert_openai_tools_to_gemini(unique_tools)}
+                self.key = key
+                self.tool_names = [t.get("function", t)["name"] for t in unique_tools]
+                self.compiles += 1
+                self.last_compile_seconds = time.perf_counter() - start
+                print(f"🧩 Compiled {len(unique_tools)} tool declarations (local + MCP) in {self.last_compile_seconds * 1000:.1f}ms")
+            else:
+                self.hits += 1
+            return self._compiled[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tools": len(self.tool_names),
+            "key": self.key[:12] if self.key else None,
+            "compiles": self.compiles,
+            "hits": self.hits,
+            "last_compile_ms": round(self.last_compile_seconds * 1000, 2),
+        }
+
+
+tool_catalog = ToolCatalog()
@@ -0,0 +1,173 @@
+import json
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from utils.deadline import without_deadline
+
+
+def args_key(args: Dict[str, Any]) -> str:
+    """Default key: the arguments as canonical JSON."""
+    return json.dumps(args, sort_keys=True, default=str)
+
+
+def successful_result(result: Dict[str, Any]) -> bool:
+    """Default acceptance: status success and the tool didn't return an {"error": ...} payload."""
+    if not isinstance(result, dict) or result.get("status") != "success":
+        return False
+    output = result.get("result")
+    return not (isinstance(output, dict) and output.get("error"))
+
+
+class ToolCachePolicy:
+    """
+    How one tool's results are cached: `ttl` seconds, `key_fn` mapping the
+    call arguments to a cache key (None means "don't cache this call") and
+    `accept` deciding whether a finished result is worth keeping.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        key_fn: Callable[[Dict[str, Any]], Optional[Hashable]] = args_key,
+        cacheable: bool = True,
+        accept: Callable[[Dict[str, Any]], bool] = successful_result,
+    ):
+        self.ttl = ttl
+        self.key_fn = key_fn
+        self.cacheable = cacheable and ttl > 0
+        self.accept = accept
+
+
+class ToolResultCache:
+    """
+    TTL cache of successful tool results, keyed per tool by its policy's key
+    function. Identical calls that arrive while one is running share that
+    execution instead of starting their own. Tools without a policy, or with
+    cacheable=False, always run.
+    invalidate() may be called from any thread (ingestion runs on a worker pool);
+    a call that started before it won't store its result.
+    A shared execution runs without any request's deadline; each caller bounds
+    its own wait with `timeout` instead.
+    """
+
+    def __init__(self, policies: Dict[str, ToolCachePolicy], max_entries: int):
+        self.policies = policies
+        self.max_entries = max(1, max_entries)
+        self._results: "OrderedDict[Tuple[str, Hashable], Tuple[float, Dict]]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, Hashable], Tuple[asyncio.Task, Tuple[int, int]]] = {}
+        self._lock = threading.Lock()
+        self._generations: Dict[str, int] = {}  # per tool, bumped by invalidate()
+        self._generation = 0  # bumped by invalidate() of every tool
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bypassed = 0
+        self.expired = 0
+
+    def _key(self, tool_name: str, args: Dict[str, Any]) -> Optional[Tuple[str, Hashable]]:
+        policy = self.policies.get(tool_name)
+        if policy is None or not policy.cacheable:
+            return None
+        try:
+            key = policy.key_fn(args)
+        except Exception as e:
+            print(f"⚠️ Cache key for {tool_name} failed, running uncached: {e}")
+            return None
+        return None if key is None else (tool_name, key)
+
+    async def run(
+        self, tool_name: str, args: Dict[str, Any], execute: Callable[[], Awaitable[Dict]], timeout: Optional[float] = None
+    ) -> Dict:
+        """
+        Raises asyncio.TimeoutError if a shared execution outlasts this caller's `timeout`,
+        or right away (nothing started or joined) if `timeout` is already used up.
+        """
+        key = self._key(tool_name, args)
+        if key is None:
+            self.bypassed += 1
+            return await execute()
+
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                expires_at, result = cached
+                if expires_at > time.monotonic():
+                    self._results.move_to_end(key)
+                    self.hits += 1
+                else:
+                    del self._results[key]
+                    self.expired += 1
+                    cached = None
+        if cached is not None:
+            print(f"⚡ Tool cache hit: {tool_name}")
+            return dict(result)
+        if timeout is not None and timeout <= 0:
+            raise asyncio.TimeoutError
+
+        with self._lock:
+            generation = self._current_generation(tool_name)
+        inflight = self._inflight.get(key)
+        # A call started before the last invalidate() isn't joined
+        if inflight is not None and inflight[1] == generation:
+            task = inflight[0]
+            self.coalesced += 1
+            print(f"🔗 Joining in-flight {tool_name} call")
+        else:
+            self.misses += 1
+            # Not the first caller's deadline: later callers may have more time left
+            task = asyncio.create_task(self._execute(key, execute, generation), context=without_deadline())
+            self._inflight[key] = (task, generation)
+        # Shielded: one caller giving up must not cancel the call for the others
+        return dict(await asyncio.wait_for(asyncio.shield(task), timeout=timeout))
+
+    def _current_generation(self, tool_name: str) -> Tuple[int, int]:
+        return self._generation, self._generations.get(tool_name, 0)
+
+    async def _execute(self, key: Tuple[str, Hashable], execute: Callable[[], Awaitable[Dict]], started: Tuple[int, int]) -> Dict:
+        tool_name = key[0]
+        try:
+            result = await execute()
+            # Errors, timeouts and empty answers are retried on the next call, not cached
+            if self.policies[tool_name].accept(result):
+                with self._lock:
+                    # Invalidated while running: the result may predate the change
+                    if self._current_generation(tool_name) == started:
+                        self._results[key] = (time.monotonic() + self.policies[tool_name].ttl, result)
+                        self._results.move_to_end(key)
+                        while len(self._results) > self.max_entries:
+                            self._results.popitem(last=False)
+            return result
+        finally:
+            if self._inflight.get(key, (None,))[0] is asyncio.current_task():
+                del self._inflight[key]
+
+    def invalidate(self, tool_name: Optional[str] = None):
+        """Drop cached results for one tool (or all tools). Thread-safe."""
+        with self._lock:
+            if tool_name is None:
+                self._generation += 1
+                self._results.clear()
+                return
+            self._generations[tool_name] = self._generations.get(tool_name, 0) + 1
+            for key in [k for k in self._results if k[0] == tool_name]:
+                del self._results[key]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        with self._lock:
+            entries = len(self._results)
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "expired": self.expired,
+            "bypassed": self.bypassed,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "ttls": {name: p.ttl for name, p in self.policies.items() if p.cacheable},
+        }
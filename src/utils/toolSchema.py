@@ -10,7 +10,12 @@ tools_schema = [
                     "query": {
                         "type": "string",
                         "description": "The user's natural language question to search in the uploaded PDF",
-                    }
+                    },
+                    "documents": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Optional PDF filenames to restrict the search to. Omit to search all documents.",
+                    },
                 },
                 "required": ["query"],
             },
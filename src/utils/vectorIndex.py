@@ -0,0 +1,364 @@
+# Unified vector index shared by every uploaded PDF.
+# All chunks live in one collection (Chroma under VECTOR_DIR/unified, or the
+# NumPy engine under VECTOR_DIR/numpy when VECTOR_BACKEND=numpy) with
+# doc_id / source / chunk_id metadata. Per-document stores are export-only;
+# older ones are searched until migrated:
+#   python -m utils.vectorIndex migrate
+#   python -m utils.vectorIndex export <doc_id> <persist_directory>
+import os
+import re
+import sys
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+import chromadb
+from langchain_chroma import Chroma
+
+from config.settings import (
+    VECTOR_DIR,
+    VECTOR_BACKEND,
+    VECTOR_QUANTIZATION,
+    VECTOR_RESCORE_FACTOR,
+    VECTOR_SEARCH_WORKERS,
+    VECTOR_SEARCH_TIMEOUT,
+)
+from utils.numpyVectorStore import NumpyVectorStore
+from utils.lexicalIndex import build_segment, get_lexical_index
+from utils.embeddingProvider import LEGACY_EMBEDDING_MODEL, embedding_model_name
+
+CHROMA_COLLECTION = "langchain"  # langchain's default collection name
+CHROMA_WRITE_BATCH = 1000
+# New collections index by cosine distance; older ones were created with Chroma's default (squared L2)
+CHROMA_SPACE = "cosine"
+UNIFIED_INDEX_DIR = os.path.join(VECTOR_DIR, "unified")
+NUMPY_INDEX_DIR = os.path.join(VECTOR_DIR, "numpy")
+MIGRATED_MARKER = ".migrated"
+# Directories under VECTOR_DIR that are not per-document stores
+RESERVED_DIRS = {"unified", "global", "lexical", "numpy"}
+
+_unified_index: Optional[Any] = None
+_numpy_stores: Dict[str, NumpyVectorStore] = {}
+_distance_spaces: Dict[Tuple[str, str], str] = {}
+_unified_lock = threading.Lock()
+_search_executor = ThreadPoolExecutor(max_workers=VECTOR_SEARCH_WORKERS, thread_name_prefix="vsearch")
+
+
+def document_id_for(vector_path: str) -> str:
+    """Document ids are the uuid directory name recorded in uploaded_pdfs.vector_path."""
+    return os.path.basename(os.path.normpath(vector_path))
+
+
+def collection_name_for(model: str) -> str:
+    """One collection per embedding model; the legacy model keeps langchain's default name."""
+    if model == LEGACY_EMBEDDING_MODEL:
+        return CHROMA_COLLECTION
+    slug = re.sub(r"[^a-zA-Z0-9._-]+", "-", model).strip("-._")
+    return f"{CHROMA_COLLECTION}_{slug}"[:63]
+
+
+def _collection(persist_directory: str, model: Optional[str] = None):
+    """Open the collection for `model` (default: active provider), refusing mismatched tags."""
+    model = model or embedding_model_name()
+    collection = chromadb.PersistentClient(path=persist_directory).get_or_create_collection(
+        collection_name_for(model),
+        metadata={"embedding_model": model},
+        configuration={"hnsw": {"space": CHROMA_SPACE}},
+    )
+    tagged = (collection.metadata or {}).get("embedding_model", LEGACY_EMBEDDING_MODEL)
+    if tagged != model:
+        raise ValueError(f"Collection in {persist_directory} holds '{tagged}' vectors, not '{model}'")
+    return collection
+
+
+def collection_space(collection) -> str:
+    """Distance function a Chroma collection was created with ("l2" unless set)."""
+    configuration = collection.configuration or {}
+    for index in ("hnsw", "spann"):
+        space = (configuration.get(index) or {}).get("space")
+        if space:
+            return space
+    return (collection.metadata or {}).get("hnsw:space", "l2")
+
+
+def distance_space(persist_directory: str, collection_name: str = CHROMA_COLLECTION) -> str:
+    """collection_space() of a collection on disk; fixed at creation, so looked up once."""
+    key = (os.path.normpath(persist_directory), collection_name)
+    if key not in _distance_spaces:
+        collection = chromadb.PersistentClient(path=persist_directory).get_collection(collection_name)
+        _distance_spaces[key] = collection_space(collection)
+    return _distance_spaces[key]
+
+
+def unified_distance_space() -> str:
+    """Distance space of the store get_unified_index() returns (the NumPy engine reports cosine)."""
+    if VECTOR_BACKEND == "numpy":
+        return "cosine"
+    return distance_space(UNIFIED_INDEX_DIR, collection_name_for(embedding_model_name()))
+
+
+def cosine_from_distance(distance: float, space: str) -> float:
+    """Cosine similarity for a Chroma distance between unit-length embeddings."""
+    if space == "l2":
+        # Chroma's l2 is squared: |a - b|² = 2 - 2·cos
+        return 1.0 - distance / 2.0
+    if space in ("cosine", "ip"):
+        return 1.0 - distance
+    raise ValueError(f"Unsupported distance space '{space}'")
+
+
+def write_vectors(persist_directory: str, ids: list, vectors: list, texts: list, metadatas: list, model: Optional[str] = None):
+    """Upsert precomputed vectors into the Chroma collection at `persist_directory`."""
+    collection = _collection(persist_directory, model)
+    for start in range(0, len(ids), CHROMA_WRITE_BATCH):
+        end = start + CHROMA_WRITE_BATCH
+        collection.upsert(
+            ids=ids[start:end],
+            embeddings=vectors[start:end],
+            documents=texts[start:end],
+            metadatas=metadatas[start:end],
+        )
+
+
+def mark_migrated(persist_directory: str):
+    """Flag a per-document store as covered by the unified index."""
+    with open(os.path.join(persist_directory, MIGRATED_MARKER), "w") as f:
+        f.write("unified\n")
+
+
+def _numpy_store(model: Optional[str] = None, embedding_function=None) -> NumpyVectorStore:
+    model = model or embedding_model_name()
+    with _unified_lock:
+        if model not in _numpy_stores:
+            directory = os.path.join(NUMPY_INDEX_DIR, collection_name_for(model))
+            _numpy_stores[model] = NumpyVectorStore(
+                directory,
+                embedding_function,
+                model=model,
+                quantization=VECTOR_QUANTIZATION,
+                rescore_factor=VECTOR_RESCORE_FACTOR,
+            )
+        store = _numpy_stores[model]
+        if embedding_function is not None:
+            store.embedding_function = embedding_function
+    return store
+
+
+def add_document_chunks(ids: list, vectors: list, texts: list, metadatas: list, model: Optional[str] = None):
+    if VECTOR_BACKEND == "numpy":
+        _numpy_store(model).upsert(ids, vectors, texts, metadatas)
+    else:
+        write_vectors(UNIFIED_INDEX_DIR, ids, vectors, texts, metadatas, model)
+
+
+def _all_numpy_stores() -> List[NumpyVectorStore]:
+    """Every model's NumPy store on disk (open ones reused, so their snapshots stay current)."""
+    with _unified_lock:
+        stores = {store.directory: store for store in _numpy_stores.values()}
+    if os.path.isdir(NUMPY_INDEX_DIR):
+        for name in sorted(os.listdir(NUMPY_INDEX_DIR)):
+            directory = os.path.join(NUMPY_INDEX_DIR, name)
+            if os.path.isdir(directory) and directory not in stores:
+                stores[directory] = NumpyVectorStore(
+                    directory, quantization=VECTOR_QUANTIZATION, rescore_factor=VECTOR_RESCORE_FACTOR
+                )
+    return list(stores.values())
+
+
+def delete_document_chunks(doc_id: str):
+    """
+    Remove a document's chunks from every embedding model's collection, not just
+    the active one, so switching providers back can't resurrect them.
+    """
+    where = {"doc_id": doc_id}
+    if VECTOR_BACKEND == "numpy":
+        for store in _all_numpy_stores():
+            store.delete(where=where)
+        return
+    client = chromadb.PersistentClient(path=UNIFIED_INDEX_DIR)
+    for collection in client.list_collections():
+        name = getattr(collection, "name", collection)  # chromadb < 0.6 returned names
+        if name == CHROMA_COLLECTION or name.startswith(f"{CHROMA_COLLECTION}_"):
+            client.get_collection(name).delete(where=where)
+
+
+def unified_get(where: Optional[Dict[str, Any]] = None, include_embeddings: bool = True) -> Dict[str, list]:
+    """Raw rows from the unified index in chromadb's get() shape."""
+    if VECTOR_BACKEND == "numpy":
+        return _numpy_store().get(where, include_embeddings)
+    include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+    return _collection(UNIFIED_INDEX_DIR).get(where=where, include=include)
+
+
+def get_unified_index(embedding_function):
+    """Search view over the unified collection, opened once per process."""
+    global _unified_index
+    if VECTOR_BACKEND == "numpy":
+        return _numpy_store(embedding_function=embedding_function)
+    with _unified_lock:
+        if _unified_index is None:
+            model = embedding_model_name()
+            _collection(UNIFIED_INDEX_DIR, model)  # create/validate the model tag
+            _unified_index = Chroma(
+                collection_name=collection_name_for(model),
+                persist_directory=UNIFIED_INDEX_DIR,
+                embedding_function=embedding_function,
+            )
+    return _unified_index
+
+
+def document_filter(documents: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+    """Chroma `where` clause restricting a search to the given source filenames."""
+    if not documents:
+        return None
+    return {"source": {"$in": list(documents)}}
+
+
+def _search_one(store, space: str, query_vector: List[float], k: int, where: Optional[Dict[str, Any]]):
+    """Vector search on one store, returning (doc, cosine similarity) with higher = better."""
+    # Despite the name, this returns raw distances in the collection's space
+    results = store.similarity_search_by_vector_with_relevance_scores(query_vector, k=k, filter=where)
+    return [(doc, cosine_from_distance(distance, space)) for doc, distance in results]
+
+
+def _dedup_key(text: str) -> frozenset:
+    return frozenset(re.findall(r"\w+", text.lower()))
+
+
+def _is_near_duplicate(tokens: frozenset, seen: List[frozenset], threshold: float = 0.9) -> bool:
+    for other in seen:
+        union = len(tokens | other)
+        if union and len(tokens & other) / union >= threshold:
+            return True
+    return False
+
+
+def search_stores(
+    stores: List[Tuple[Any, str]],
+    query_vector: List[float],
+    k: int,
+    final_k: int,
+    where: Optional[Dict[str, Any]] = None,
+    score_threshold: float = 0.0,
+    timeout: float = VECTOR_SEARCH_TIMEOUT,
+) -> List[Tuple[Any, float]]:
+    """
+    Search every (store, distance space) pair in parallel and merge by cosine similarity.
+    Stores that miss the deadline are skipped; near-duplicate chunks and
+    results below `score_threshold` are dropped before taking the top `final_k`.
+    """
+    futures = {
+        _search_executor.submit(_search_one, store, space, query_vector, k, where): i
+        for i, (store, space) in enumerate(stores)
+    }
+    done, not_done = wait(futures, timeout=timeout)
+    if not_done:
+        print(f"⚠️ {len(not_done)}/{len(stores)} vector stores missed the {timeout}s search deadline")
+
+    heap = []
+    for future in done:
+        try:
+            results = future.result()
+        except Exception as e:
+            print(f"❌ Vector store search failed: {e}")
+            continue
+        for rank, (doc, score) in enumerate(results):
+            if score >= score_threshold:
+                heap.append((-score, futures[future], rank, doc))
+    heapq.heapify(heap)
+
+    merged, seen_ids, seen_tokens = [], set(), []
+    while heap and len(merged) < final_k:
+        neg_score, _store, _rank, doc = heapq.heappop(heap)
+        chunk_id = doc.metadata.get("chunk_id")
+        tokens = _dedup_key(doc.page_content)
+        if (chunk_id and chunk_id in seen_ids) or _is_near_duplicate(tokens, seen_tokens):
+            continue
+        if chunk_id:
+            seen_ids.add(chunk_id)
+        seen_tokens.append(tokens)
+        merged.append((doc, -neg_score))
+    return merged
+
+
+def reciprocal_rank_fusion(rankings: List[List[Tuple[Any, float]]], final_k: int, rrf_k: int = 60) -> List[Tuple[Any, float]]:
+    """
+    Fuse several ranked (doc, score) lists; a chunk scores sum(1 / (rrf_k + rank)).
+    Near-duplicate chunks (e.g. the same passage under two chunk ids) keep only
+    their best-fused copy, so they don't take several of the `final_k` slots.
+    """
+    fused: Dict[str, float] = {}
+    docs: Dict[str, Any] = {}
+    for ranking in rankings:
+        for rank, (doc, _score) in enumerate(ranking, start=1):
+            key = doc.metadata.get("chunk_id") or doc.page_content
+            fused[key] = fused.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+
+    merged, seen_tokens = [], []
+    for key, score in sorted(fused.items(), key=lambda item: item[1], reverse=True):
+        if len(merged) >= final_k:
+            break
+        tokens = _dedup_key(docs[key].page_content)
+        if _is_near_duplicate(tokens, seen_tokens):
+            continue
+        seen_tokens.append(tokens)
+        merged.append((docs[key], score))
+    return merged
+
+
+def legacy_store_paths(vector_paths: List[str]) -> List[str]:
+    """Per-document stores that predate the unified index and were never migrated."""
+    return [
+        p for p in vector_paths
+        if os.path.isdir(p) and not os.path.exists(os.path.join(p, MIGRATED_MARKER))
+    ]
+
+
+def export_document_store(doc_id: str, persist_directory: str) -> int:
+    """Write one document's chunks from the unified index into a standalone store."""
+    data = unified_get(where={"doc_id": doc_id})
+    if not data["ids"]:
+        return 0
+    write_vectors(persist_directory, data["ids"], data["embeddings"], data["documents"], data["metadatas"])
+    mark_migrated(persist_directory)
+    return len(data["ids"])
+
+
+def migrate_legacy_stores(vector_dir: str = VECTOR_DIR) -> Dict[str, int]:
+    """Copy every unmigrated per-document store into the unified index."""
+    migrated = {}
+    for name in sorted(os.listdir(vector_dir)):
+        path = os.path.join(vector_dir, name)
+        if name in RESERVED_DIRS or not legacy_store_paths([path]):
+            continue
+        # Stores from before the unified index were all embedded with the legacy model
+        data = _collection(path, LEGACY_EMBEDDING_MODEL).get(include=["embeddings", "documents", "metadatas"])
+        ids = [f"{name}-{i}" for i in range(len(data["ids"]))]
+        metadatas = []
+        for chunk_id, meta in zip(ids, data["metadatas"]):
+            meta = dict(meta or {})
+            meta.setdefault("source", name)
+            meta.update(doc_id=name, chunk_id=chunk_id)
+            metadatas.append(meta)
+        if ids:
+            add_document_chunks(ids, data["embeddings"], data["documents"], metadatas, LEGACY_EMBEDDING_MODEL)
+            get_lexical_index().add_segment(build_segment(name, ids, list(data["documents"]), metadatas))
+        mark_migrated(path)
+        migrated[name] = len(ids)
+        print(f"[MIGRATE] {name}: {len(ids)} chunks")
+    return migrated
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "migrate"
+    if command == "migrate":
+        result = migrate_legacy_stores()
+        print(f"✅ Migrated {len(result)} stores, {sum(result.values())} chunks into {UNIFIED_INDEX_DIR}")
+    elif command == "export" and len(sys.argv) == 4:
+        count = export_document_store(sys.argv[2], sys.argv[3])
+        print(f"✅ Exported {count} chunks of {sys.argv[2]} to {sys.argv[3]}")
+    else:
+        print("Usage: python -m utils.vectorIndex [migrate | export <doc_id> <persist_directory>]")
+        sys.exit(1)
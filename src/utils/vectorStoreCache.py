@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+class VectorStoreCache:
+    """
+    Size-bounded LRU of opened vector stores, keyed by vector_path.
+    Per-path usage counts are persisted to `usage_path` so the most-used
+    stores can be warmed in the background on the next startup.
+    """
+
+    def __init__(self, loader: Callable[[str], Any], max_entries: int, usage_path: str, save_interval: float = 60.0):
+        self.loader = loader
+        self.max_entries = max(1, max_entries)
+        self.usage_path = usage_path
+        self.save_interval = save_interval
+        self._stores: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._generation = 0  # bumped by invalidate()
+        self._usage: Counter = self._read_usage()
+        self._last_saved = time.time()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+
+    # -------------------- Usage counts --------------------
+    def _read_usage(self) -> Counter:
+        try:
+            with open(self.usage_path, "r", encoding="utf-8") as f:
+                return Counter(json.load(f))
+        except (OSError, ValueError):
+            return Counter()
+
+    def save_usage(self):
+        with self._lock:
+            usage = dict(self._usage)
+            self._last_saved = time.time()
+        try:
+            os.makedirs(os.path.dirname(self.usage_path) or ".", exist_ok=True)
+            tmp_path = self.usage_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(usage, f)
+            os.replace(tmp_path, self.usage_path)
+        except OSError as e:
+            print(f"⚠️ Could not save vector store usage: {e}")
+
+    def most_used(self, n: int) -> List[str]:
+        with self._lock:
+            return [path for path, _count in self._usage.most_common(n)]
+
+    # -------------------- Cache --------------------
+    def get(self, path: str) -> Any:
+        with self._lock:
+            self._usage[path] += 1
+            save_due = time.time() - self._last_saved >= self.save_interval
+            store = self._stores.get(path)
+            if store is not None:
+                self._stores.move_to_end(path)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if save_due:
+            self.save_usage()
+        return store if store is not None else self._load(path)
+
+    def _load(self, path: str) -> Any:
+        # One loader per path; concurrent misses on the same store wait for it
+        with self._lock:
+            load_lock = self._load_locks.setdefault(path, threading.Lock())
+        with load_lock:
+            with self._lock:
+                if path in self._stores:
+                    return self._stores[path]
+                started = self._generation
+            start = time.perf_counter()
+            store = self.loader(path)
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.loads += 1
+                self.load_seconds += elapsed
+                # Invalidated while loading: the store may predate the change, so don't cache it
+                if self._generation == started:
+                    self._stores[path] = store
+                    while len(self._stores) > self.max_entries:
+                        self._stores.popitem(last=False)
+                        self.evictions += 1
+                self._load_locks.pop(path, None)
+        return store
+
+    def invalidate(self, paths: Optional[Iterable[str]] = None):
+        """Drop the given paths (or everything) so they reload on next use."""
+        with self._lock:
+            self._generation += 1
+            if paths is None:
+                self._stores.clear()
+                return
+            for path in paths:
+                self._stores.pop(path, None)
+
+    def forget(self, paths: Iterable[str]):
+        """Invalidate deleted stores and drop their usage counts."""
+        paths = list(paths)
+        self.invalidate(paths)
+        with self._lock:
+            for path in paths:
+                self._usage.pop(path, None)
+
+    def warm(self, paths: List[str]) -> threading.Thread:
+        """Load `paths` on a background thread without counting them as usage."""
+        def _run():
+            start = time.perf_counter()
+            loaded = 0
+            for path in paths[:self.max_entries]:
+                try:
+                    self._load(path)
+                    loaded += 1
+                except Exception as e:
+                    print(f"⚠️ Could not warm vector store {path}: {e}")
+            print(f"🔥 Warmed {loaded} vector stores in {time.perf_counter() - start:.2f}s")
+
+        thread = threading.Thread(target=_run, name="vstore-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._stores),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "loads": self.loads,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "load_seconds_total": round(self.load_seconds, 3),
+            "avg_load_seconds": round(self.load_seconds / self.loads, 4) if self.loads else 0.0,
+        }
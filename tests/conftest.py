@@ -0,0 +1,78 @@
+import sys
+import types
+import importlib
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Top-level modules of the app (src/ and the repo root)
+APP_MODULES = ("config", "controllers", "model", "prompt", "routes", "services", "tools", "utils", "mcp_client")
+
+
+def _loaded_app_modules():
+    return [name for name in sys.modules if name.split(".")[0] in APP_MODULES]
+
+
+def _count_tokens(text: str, model_name: str = "gpt-4o-mini") -> int:
+    """One token per whitespace-separated word: deterministic and needs no tokenizer download."""
+    return len(text.split())
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    """
+    Imports app modules fresh for one test: data directories under tmp_path,
+    placeholder API keys, offline embeddings and an in-memory SQLite database
+    in place of config.database (which connects to MySQL at import).
+    Returns importlib.import_module; everything imported is dropped afterwards.
+    """
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "hashing")
+    monkeypatch.setenv("VECTOR_DIR", str(tmp_path / "vectors"))
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", str(tmp_path / "embedding_cache.sqlite3"))
+    monkeypatch.chdir(tmp_path)
+    for name in _loaded_app_modules():
+        monkeypatch.delitem(sys.modules, name)
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    database = types.ModuleType("config.database")
+    database.engine = engine
+    database.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    database.Base = declarative_base()
+
+    def get_db():
+        db = database.SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    database.get_db = get_db
+    monkeypatch.setitem(sys.modules, "config.database", database)
+
+    yield importlib.import_module
+
+    for name in _loaded_app_modules():
+        sys.modules.pop(name, None)
+
+
+@pytest.fixture
+def session_helpers(app, monkeypatch):
+    """
+    Token counting and history summaries without tiktoken downloads or OpenAI:
+    modules imported through `app` get this utils.createSession instead.
+    """
+    helpers = types.ModuleType("utils.createSession")
+    helpers.count_tokens = _count_tokens
+    helpers.summaries = []
+
+    def summarize_history(previous_summary, messages, max_tokens):
+        helpers.summaries.append((previous_summary, list(messages)))
+        return " ".join(filter(None, [previous_summary, f"summary of {len(messages)} turns"]))
+
+    helpers.summarize_history = summarize_history
+    monkeypatch.setitem(sys.modules, "utils.createSession", helpers)
+    return helpers
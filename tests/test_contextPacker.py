@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import pytest
+
+
+@pytest.fixture
+def packer_module(app, session_helpers):
+    return app("utils.contextPacker")
+
+
+def doc(text, source="manual.pdf", page=0, chunk=0):
+    return SimpleNamespace(page_content=text, metadata={"source": source, "page": page, "chunk_id": f"d-{chunk}"})
+
+
+def words(n, tag):
+    return " ".join(f"{tag}{i}" for i in range(n))
+
+
+def test_best_chunks_fill_the_budget_in_reading_order(packer_module):
+    packer = packer_module.ContextPacker(budget=100, separator="\n\n")
+    scored = [
+        (doc(words(30, "late"), page=3), 0.9),
+        (doc(words(30, "early"), page=1), 0.8),
+        (doc(words(30, "low"), page=2), 0.1),
+    ]
+
+    context, docs, tokens = packer.pack(scored)
+
+    # The separator is empty to the whitespace counter, so all three fit
+    assert [d.metadata["page"] for d in docs] == [1, 2, 3]
+    assert context.startswith("early0")
+    assert tokens == 90
+
+
+def test_lowest_scoring_chunks_are_left_out_when_over_budget(packer_module):
+    packer = packer_module.ContextPacker(budget=70)
+    scored = [(doc(words(30, "a"), page=1), 0.9), (doc(words(30, "b"), page=2), 0.8), (doc(words(30, "c"), page=3), 0.1)]
+    _context, docs, tokens = packer.pack(scored)
+    assert [d.metadata["page"] for d in docs] == [1, 2]
+    assert tokens <= 70
+
+
+def test_a_chunk_that_does_not_fit_is_trimmed_at_a_sentence(packer_module):
+    packer = packer_module.ContextPacker(budget=60)
+    long_text = " ".join(f"Sentence {i} has five words." for i in range(20))
+    context, docs, _tokens = packer.pack([(doc(words(30, "a"), page=1), 0.9), (doc(long_text, page=2), 0.5)])
+    assert len(docs) == 2
+    trimmed = context.split("\n\n")[1]
+    assert trimmed.endswith("words.") and len(trimmed.split()) <= 30
+
+
+def test_duplicates_are_skipped(packer_module):
+    packer = packer_module.ContextPacker(budget=100)
+    text = words(10, "x")
+    _context, docs, _tokens = packer.pack([(doc(text, chunk=1), 0.9), (doc(f"  {text.upper()} ", chunk=2), 0.8)])
+    assert len(docs) == 1
+
+
+def test_max_docs_caps_the_number_of_chunks(packer_module):
+    packer = packer_module.ContextPacker(budget=1000, max_docs=2)
+    scored = [(doc(words(5, f"t{i}_"), page=i), 1.0 - i / 10) for i in range(5)]
+    _context, docs, _tokens = packer.pack(scored)
+    assert [d.metadata["page"] for d in docs] == [0, 1]
+    assert packer.stats()["max_docs"] == 2
+
+
+def test_record_tracks_prompt_tokens(packer_module):
+    packer = packer_module.ContextPacker(budget=100)
+    packer.record(40, 120)
+    packer.record(60, 180)
+    stats = packer.stats()
+    assert stats["calls"] == 2 and stats["avg_prompt_tokens"] == 150.0 and stats["last_prompt_tokens"] == 180
@@ -0,0 +1,80 @@
+import itertools
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+import utils.embeddingCache as embedding_cache
+from utils.embeddingCache import CachedEmbeddings, EmbeddingCache
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    """Strictly increasing time.time() so last_used order is deterministic."""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(embedding_cache, "time", SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+def last_used(cache, key):
+    return cache._conn.execute("SELECT last_used FROM embeddings WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_hits_are_batched_instead_of_written_one_by_one(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=10)
+    cache.put_many({"a": [1.0, 0.0]})
+    before = last_used(cache, "a")
+
+    for _ in range(3):
+        assert cache.get_many(["a"]) == {"a": [1.0, 0.0]}
+    assert cache.stats()["pending_touches"] == 1
+    assert cache.stats()["touch_flushes"] == 0
+    assert last_used(cache, "a") == before
+
+    cache.flush()
+    assert last_used(cache, "a") > before
+    assert cache.stats()["pending_touches"] == 0
+
+
+def test_touches_flush_once_enough_pile_up(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "TOUCH_FLUSH_SIZE", 2)
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=10)
+    cache.put_many({"a": [1.0], "b": [2.0]})
+    cache.get_many(["a"])
+    assert cache.stats()["touch_flushes"] == 0
+    cache.get_many(["b"])
+    assert cache.stats()["touch_flushes"] == 1
+
+
+def test_eviction_sees_hits_that_were_not_flushed_yet(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.put_many({"old": [1.0]})
+    cache.put_many({"newer": [2.0]})
+    cache.get_many(["old"])  # pending touch: "old" is now the most recently used
+
+    cache.put_many({"newest": [3.0]})
+
+    assert set(cache.get_many(["old", "newer", "newest"])) == {"old", "newest"}
+    assert cache.stats()["evictions"] == 1
+
+
+class Counting(Embeddings):
+    def __init__(self):
+        self.seen = []
+
+    def embed_documents(self, texts):
+        self.seen.extend(texts)
+        return [[float(len(t))] for t in texts]
+
+    def embed_query(self, text):
+        self.seen.append(text)
+        return [float(len(text))]
+
+
+def test_only_cache_misses_reach_the_embedding_model(tmp_path):
+    inner = Counting()
+    cached = CachedEmbeddings(inner, model_name="m", cache=EmbeddingCache(str(tmp_path / "cache.sqlite3")))
+
+    assert cached.embed_documents(["ab", "abc", "ab"]) == [[2.0], [3.0], [2.0]]
+    assert cached.embed_documents(["abc", "abcd"]) == [[3.0], [4.0]]
+    assert cached.embed_query("ab") == [2.0]
+    assert inner.seen == ["ab", "abc", "abcd"]
@@ -0,0 +1,16 @@
+import pytest
+
+
+def test_score_threshold_defaults_per_embedding_model(app, monkeypatch):
+    assert app("utils.embeddingProvider").score_threshold() == pytest.approx(0.2)
+
+
+def test_legacy_model_gets_a_higher_score_threshold(app, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_PROVIDER", "openai")
+    monkeypatch.setenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+    assert app("utils.embeddingProvider").score_threshold() == pytest.approx(0.7)
+
+
+def test_configured_score_threshold_wins(app, monkeypatch):
+    monkeypatch.setenv("VECTOR_SCORE_THRESHOLD", "0.35")
+    assert app("utils.embeddingProvider").score_threshold() == pytest.approx(0.35)
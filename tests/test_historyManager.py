@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def history(app, session_helpers):
+    return app("utils.historyManager")
+
+
+def turns(n, words=5):
+    """n alternating user/assistant messages of `words` tokens each."""
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": " ".join([f"m{i}"] * words)}
+        for i in range(n)
+    ]
+
+
+def test_build_keeps_recent_turns_oldest_first_and_drops_the_current_task(history):
+    manager = history.HistoryManager(budget=100, max_messages=10, summary_tokens=50)
+    messages = turns(3) + [
+        {"role": "function", "content": "tool output"},
+        {"role": "user", "content": "<task>what now</task>"},
+    ]
+
+    summary, picked = manager.build("s1", messages, "what now")
+
+    assert summary == ""
+    assert [role for role, _text in picked] == ["user", "assistant", "user"]
+    assert picked[0][1].startswith("m0")
+    assert all("what now" not in text for _role, text in picked)
+
+
+def test_carried_turns_count_against_the_token_budget(history):
+    manager = history.HistoryManager(budget=12, max_messages=10, summary_tokens=50, compact_turns=100, compact_tokens=1000)
+    _summary, picked = manager.build("s1", turns(4), "next")
+    # Two 5-token turns fit; the older ones wait for a summary outside the prompt
+    assert [text.split()[0] for _role, text in picked] == ["m2", "m3"]
+    assert manager.stats()["last_history_tokens"] == 10 <= manager.budget
+
+
+def test_turns_past_the_message_cap_use_the_remaining_budget(history):
+    manager = history.HistoryManager(budget=17, max_messages=2, summary_tokens=50, compact_turns=100, compact_tokens=1000)
+    _summary, picked = manager.build("s1", turns(5), "next")
+    # 2 in the window + 1 carried overflow turn; a second one would exceed the budget
+    assert [text.split()[0] for _role, text in picked] == ["m2", "m3", "m4"]
+    assert manager.stats()["last_history_tokens"] == 15
+
+
+def test_oversized_latest_turn_is_trimmed_not_dropped(history):
+    manager = history.HistoryManager(budget=5, max_messages=10, summary_tokens=50)
+    long_turn = [{"role": "assistant", "content": "Short one. " + "word " * 50}]
+    _summary, picked = manager.build("s1", long_turn, "next")
+    assert picked == [("assistant", "Short one.")]
+
+
+def test_overflow_is_compacted_into_a_summary_message(history, session_helpers):
+    async def scenario():
+        manager = history.HistoryManager(budget=10, max_messages=10, summary_tokens=50, compact_turns=4, compact_tokens=1000)
+        messages = turns(4)
+        # Below the threshold: nothing is summarized
+        manager.build("s1", messages, "next")
+        assert not session_helpers.summaries
+
+        messages.extend(turns(2))
+        summary, _picked = manager.build("s1", messages, "next")
+        assert summary == ""
+        await asyncio.gather(*manager._compacting.values())
+        return manager, messages
+
+    manager, messages = asyncio.run(scenario())
+    assert len(session_helpers.summaries) == 1
+    assert len(session_helpers.summaries[0][1]) == 4
+    # The summary takes the place of the turns it covers, in the session itself
+    assert messages[0] == {"role": "summary", "content": "summary of 4 turns"}
+    assert len(messages) == 3
+    assert manager.stats()["compactions"] == 1
+
+    summary, picked = manager.build("s1", messages, "next")
+    assert summary == "summary of 4 turns"
+    assert len(picked) == 2
+
+
+def test_turns_are_kept_when_summarizing_fails(history, session_helpers):
+    def failing_summary(previous_summary, messages, max_tokens):
+        raise RuntimeError("summary service down")
+
+    session_helpers.summarize_history = failing_summary
+    history.summarize_history = failing_summary
+
+    async def scenario():
+        manager = history.HistoryManager(budget=10, max_messages=10, summary_tokens=50, compact_turns=2)
+        messages = turns(6)
+        manager.build("s1", messages, "next")
+        await asyncio.gather(*manager._compacting.values())
+        return manager, messages
+
+    manager, messages = asyncio.run(scenario())
+    assert messages == turns(6)
+    assert manager.stats()["errors"] == 1
+
+
+def test_a_later_compaction_folds_in_the_previous_summary(history, session_helpers):
+    async def scenario():
+        manager = history.HistoryManager(budget=10, max_messages=10, summary_tokens=50, compact_turns=4, compact_tokens=1000)
+        messages = [{"role": "summary", "content": "earlier"}] + turns(6)
+        manager.build("s1", messages, "next")
+        await asyncio.gather(*manager._compacting.values())
+        return messages
+
+    messages = asyncio.run(scenario())
+    assert session_helpers.summaries[0][0] == "earlier"
+    assert messages[0] == {"role": "summary", "content": "earlier summary of 4 turns"}
+    assert len(messages) == 3
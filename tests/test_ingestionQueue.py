@@ -0,0 +1,153 @@
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def ingestion(app, monkeypatch):
+    monkeypatch.setenv("INGEST_WORKERS", "1")
+    monkeypatch.setenv("INGEST_QUEUE_SIZE", "1")
+    monkeypatch.setenv("INGEST_JOB_HISTORY", "2")
+    return app("utils.ingestionQueue")
+
+
+def staged_runner(release: threading.Event = None, fail: bool = False):
+    def run(job):
+        job.start_stage("parsing")
+        job.finish_stage("parsing", pages=3)
+        job.start_stage("embedding", total=4)
+        job.update_stage("embedding", 2)
+        if release is not None:
+            release.wait(5)
+        if fail:
+            raise ValueError("No extractable text found in the PDF.")
+        job.finish_stage("embedding")
+        return {"chunks_added": 4}
+
+    return run
+
+
+async def wait_for_status(job, *statuses):
+    for _ in range(500):
+        if job.status in statuses:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job stuck in {job.status}")
+
+
+def test_job_reports_stage_progress_and_result(ingestion):
+    async def scenario():
+        job = ingestion.submit_ingestion_job("manual.pdf", staged_runner())
+        assert job.status == "queued"
+        await wait_for_status(job, "completed")
+        return job.to_dict()
+
+    job = asyncio.run(scenario())
+    assert job["result"] == {"chunks_added": 4}
+    assert job["stages"]["parsing"]["status"] == "done" and job["stages"]["parsing"]["pages"] == 3
+    assert job["stages"]["embedding"]["done"] == job["stages"]["embedding"]["total"] == 4
+    assert job["stages"]["indexing"]["status"] == "pending"
+    assert job["finished_at"] is not None
+
+
+def test_failed_job_marks_the_running_stage_failed(ingestion):
+    async def scenario():
+        job = ingestion.submit_ingestion_job("scan.pdf", staged_runner(fail=True))
+        await wait_for_status(job, "failed")
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.error == "No extractable text found in the PDF."
+    assert job.stages["parsing"]["status"] == "done"
+    assert job.stages["embedding"]["status"] == "failed"
+
+
+def test_full_queue_raises_instead_of_waiting(ingestion):
+    async def scenario():
+        release = threading.Event()
+        try:
+            running = ingestion.submit_ingestion_job("a.pdf", staged_runner(release))
+            await wait_for_status(running, "running")
+            ingestion.submit_ingestion_job("b.pdf", staged_runner(release))  # fills the one queue slot
+            with pytest.raises(ingestion.IngestionQueueFull):
+                ingestion.submit_ingestion_job("c.pdf", staged_runner(release))
+        finally:
+            release.set()
+
+    asyncio.run(scenario())
+
+
+def test_finished_jobs_are_forgotten_oldest_first(ingestion):
+    async def scenario():
+        jobs = []
+        for name in ("a.pdf", "b.pdf", "c.pdf"):
+            job = ingestion.submit_ingestion_job(name, staged_runner())
+            await wait_for_status(job, "completed")
+            jobs.append(job)
+        return jobs
+
+    first, second, third = asyncio.run(scenario())
+    assert ingestion.get_ingestion_job(first.id) is None
+    assert ingestion.get_ingestion_job(second.id) is second
+    assert ingestion.get_ingestion_job(third.id) is third
+
+
+def test_running_jobs_are_never_forgotten(ingestion):
+    async def scenario():
+        release = threading.Event()
+        try:
+            running = ingestion.submit_ingestion_job("a.pdf", staged_runner(release))
+            await wait_for_status(running, "running")
+            queued = ingestion.submit_ingestion_job("b.pdf", staged_runner(release))
+            await asyncio.sleep(0.05)
+            return running, queued
+        finally:
+            release.set()
+
+    running, queued = asyncio.run(scenario())
+    assert ingestion.get_ingestion_job(running.id) is running
+    assert ingestion.get_ingestion_job(queued.id) is queued
+
+
+class Upload:
+    def __init__(self, filename):
+        self.filename = filename
+
+    async def read(self):
+        return b"%PDF-1.4 placeholder"
+
+
+def test_upload_answers_429_and_cleans_up_when_the_queue_is_full(app, ingestion, tmp_path):
+    documents = app("controllers.documentController")
+
+    async def scenario():
+        release = threading.Event()
+        try:
+            running = ingestion.submit_ingestion_job("a.pdf", staged_runner(release))
+            await wait_for_status(running, "running")
+            ingestion.submit_ingestion_job("b.pdf", staged_runner(release))
+            return await documents.upload_pdf([Upload("c.pdf"), Upload("d.pdf")], db=None)
+        finally:
+            release.set()
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 429
+    results = json.loads(response.body)["results"]
+    assert [r["filename"] for r in results] == ["c.pdf", "d.pdf"]
+    assert all("queue is full" in r["error"] for r in results)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".pdf")]
+
+
+def test_upload_returns_job_ids_right_away(app, ingestion):
+    documents = app("controllers.documentController")
+
+    async def scenario():
+        return await documents.upload_pdf([Upload("manual.pdf")], db=None)
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 202
+    (result,) = json.loads(response.body)["results"]
+    assert result["filename"] == "manual.pdf" and result["status"] == "queued" and result["job_id"]
@@ -0,0 +1,43 @@
+from utils.lexicalIndex import LexicalIndex, build_segment, tokenize
+
+
+def catalogue(index):
+    texts = [
+        "Trail running shoe AB-10001, breathable mesh, sizes 38 to 46.",
+        "Trail running shoe AB-10002, waterproof membrane, sizes 38 to 46.",
+        "Order 55120 ships from the Lyon warehouse within two days.",
+    ]
+    ids = ["shoes-0", "shoes-1", "orders-0"]
+    metas = [{"source": "shoes.pdf"}, {"source": "shoes.pdf"}, {"source": "orders.pdf"}]
+    index.add_segment(build_segment("shoes", ids[:2], texts[:2], metas[:2]))
+    index.add_segment(build_segment("orders", ids[2:], texts[2:], metas[2:]))
+
+
+def test_compound_codes_keep_the_whole_code_and_its_parts():
+    assert tokenize("SKU AB-10001") == ["sku", "ab-10001", "ab", "10001"]
+
+
+def test_exact_sku_ranks_its_chunk_first(tmp_path):
+    index = LexicalIndex(str(tmp_path))
+    catalogue(index)
+
+    found = index.search("is AB-10002 waterproof?", k=3)
+
+    assert found[0][0].page_content.startswith("Trail running shoe AB-10002")
+    assert found[0][1] > found[1][1]
+
+
+def test_search_can_be_limited_to_some_sources(tmp_path):
+    index = LexicalIndex(str(tmp_path))
+    catalogue(index)
+    assert index.search("order 55120", k=3, sources=["shoes.pdf"]) == []
+    assert index.search("order 55120", k=3, sources=["orders.pdf"])[0][0].metadata["source"] == "orders.pdf"
+
+
+def test_segments_survive_reopening_and_removal(tmp_path):
+    catalogue(LexicalIndex(str(tmp_path)))
+    reopened = LexicalIndex(str(tmp_path))
+    assert sorted(reopened.document_ids()) == ["orders", "shoes"]
+
+    reopened.remove_document("shoes")
+    assert LexicalIndex(str(tmp_path)).search("AB-10001", k=3) == []
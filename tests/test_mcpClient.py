@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def client(app, monkeypatch):
+    module = app("mcp_client")
+    client = module.MCPClient()
+    client._initialized = True
+    client.sessions = {"shop": object()}
+    client.listings = 0
+
+    async def list_tools(server_name, session):
+        client.listings += 1
+        return [{"name": "get_order", "description": "Look up an order", "inputSchema": {}}]
+
+    monkeypatch.setattr(client, "_list_server_tools", list_tools)
+    client.ttl = module.MCP_TOOLS_TTL
+    return client
+
+
+def test_known_tools_resolve_from_the_cached_catalog(client):
+    async def scenario():
+        return [await client.find_server("get_order") for _ in range(3)]
+
+    assert asyncio.run(scenario()) == ["shop"] * 3
+    assert client.listings == 1
+
+
+def test_unknown_tool_names_refresh_at_most_once_per_ttl(client):
+    async def scenario():
+        await client.get_all_tools()
+        found = [await client.find_server("made_up_tool") for _ in range(5)]
+        assert client.listings == 2  # the initial listing plus one refresh for the miss
+
+        client._miss_refresh_at -= client.ttl + 1  # next TTL window
+        found.append(await client.find_server("made_up_tool"))
+        return found
+
+    assert asyncio.run(scenario()) == [None] * 6
+    assert client.listings == 3
+
+
+def test_concurrent_misses_share_one_refresh(client):
+    async def scenario():
+        await client.get_all_tools()
+        return await asyncio.gather(*(client.find_server("made_up_tool") for _ in range(5)))
+
+    assert asyncio.run(scenario()) == [None] * 5
+    assert client.listings == 2
+
+
+def test_catalog_version_moves_only_when_tool_lists_change(client):
+    async def scenario():
+        await client.refresh_tools()
+        first = client.catalog_version
+        await client.refresh_tools()
+        return first, client.catalog_version
+
+    first, second = asyncio.run(scenario())
+    assert first == second == 1
@@ -0,0 +1,28 @@
+import pytest
+
+from utils.memoryWorker import is_trivial
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["hi", "Thanks!", "ok thank you", "What's up?", "👍", "🙏🙏", "   ", "hello there, how are you"],
+)
+def test_greetings_and_emoji_are_trivial(text):
+    assert is_trivial(text)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "I'm allergic to peanuts",
+        "my name is Priya",
+        "hi, I live in Pune",
+        "thanks thanks thanks thanks thanks thanks thanks",
+        "मेरा नाम राहुल है",
+        "我住在上海",
+        "Меня зовут Анна",
+        "مرحبا، أنا أعيش في دبي",
+    ],
+)
+def test_messages_with_facts_or_other_scripts_are_not_trivial(text):
+    assert not is_trivial(text)
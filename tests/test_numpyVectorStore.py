@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from utils.numpyVectorStore import NumpyVectorStore, quantize_int8
+
+
+def unit_vectors(rows, dims, seed=7):
+    matrix = np.random.default_rng(seed).normal(size=(rows, dims)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def stores(tmp_path):
+    matrix = unit_vectors(200, 32)
+    ids = [f"doc-{i}" for i in range(len(matrix))]
+    texts = [f"chunk {i}" for i in range(len(matrix))]
+    metadatas = [{"doc_id": "even" if i % 2 == 0 else "odd", "chunk_id": ids[i]} for i in range(len(matrix))]
+    NumpyVectorStore(str(tmp_path), model="m").upsert(ids, matrix.tolist(), texts, metadatas)
+    return matrix, NumpyVectorStore(str(tmp_path), model="m")
+
+
+def test_search_returns_cosine_distances_nearest_first(stores):
+    matrix, exact = stores
+    found = exact.similarity_search_by_vector_with_relevance_scores(matrix[42].tolist(), k=3)
+
+    assert found[0][0].page_content == "chunk 42"
+    assert found[0][0].metadata == {"doc_id": "even", "chunk_id": "doc-42"}
+    assert found[0][1] == pytest.approx(0.0, abs=1e-5)
+    distances = [distance for _doc, distance in found]
+    assert distances == sorted(distances)
+    second = int(found[1][0].metadata["chunk_id"].split("-")[1])
+    assert found[1][1] == pytest.approx(1.0 - float(matrix[second] @ matrix[42]), abs=1e-5)
+
+
+def test_metadata_filters_restrict_the_search(stores):
+    matrix, exact = stores
+    found = exact.similarity_search_by_vector_with_relevance_scores(matrix[17].tolist(), k=5, filter={"doc_id": "even"})
+    assert len(found) == 5 and all(doc.metadata["doc_id"] == "even" for doc, _ in found)
+
+    found = exact.similarity_search_by_vector_with_relevance_scores(
+        matrix[17].tolist(), k=5, filter={"chunk_id": {"$in": ["doc-1", "doc-3"]}}
+    )
+    assert sorted(doc.page_content for doc, _ in found) == ["chunk 1", "chunk 3"]
+
+
+def test_upsert_replaces_rows_and_survives_reopening(tmp_path):
+    store = NumpyVectorStore(str(tmp_path), model="m")
+    store.upsert(["a", "b"], [[1, 0], [0, 1]], ["first a", "b"], [{"doc_id": "D"}, {"doc_id": "E"}])
+    store.upsert(["a"], [[0.6, 0.8]], ["second a"], [{"doc_id": "D"}])
+
+    reopened = NumpyVectorStore(str(tmp_path), model="m")
+    rows = reopened.get(where={"doc_id": "D"})
+    assert len(reopened) == 2
+    assert rows["ids"] == ["a"] and rows["documents"] == ["second a"]
+    assert np.allclose(rows["embeddings"][0], [0.6, 0.8])
+
+
+def test_delete_removes_matching_rows(tmp_path):
+    store = NumpyVectorStore(str(tmp_path), model="m")
+    store.upsert(["a", "b", "c"], [[1, 0], [0, 1], [1, 1]], ["a", "b", "c"], [{"doc_id": "D"}, {"doc_id": "E"}, {"doc_id": "D"}])
+    store.delete(where={"doc_id": "D"})
+    assert NumpyVectorStore(str(tmp_path), model="m").get(include_embeddings=False)["ids"] == ["b"]
+
+
+def test_store_refuses_vectors_from_another_model(tmp_path):
+    NumpyVectorStore(str(tmp_path), model="m").upsert(["a"], [[1, 0]], ["a"], [{}])
+    with pytest.raises(ValueError):
+        NumpyVectorStore(str(tmp_path), model="other")
+
+
+def test_store_opened_without_a_model_keeps_its_tag(tmp_path):
+    NumpyVectorStore(str(tmp_path), model="m").upsert(["a", "b"], [[1, 0], [0, 1]], ["a", "b"], [{"doc_id": "D"}, {"doc_id": "E"}])
+    maintenance = NumpyVectorStore(str(tmp_path))
+    maintenance.delete(where={"doc_id": "D"})
+    assert maintenance.model == "m"
+    assert NumpyVectorStore(str(tmp_path), model="m").get(include_embeddings=False)["ids"] == ["b"]
+
+
+def test_int8_round_trip_error_is_within_half_a_step():
+    matrix = unit_vectors(300, 64)
+    codes, scales = quantize_int8(matrix)
+
+    assert codes.dtype == np.int8 and scales.dtype == np.float32
+    restored = codes.astype(np.float32) * scales[:, np.newaxis]
+    assert np.all(np.abs(restored - matrix) <= scales[:, np.newaxis] / 2 + 1e-6)
+    # The largest component of every row uses the full int8 range
+    assert np.all(np.abs(codes).max(axis=1) == 127)
+
+
+def test_int8_keeps_zero_rows_at_zero():
+    codes, scales = quantize_int8(np.zeros((2, 8), dtype=np.float32))
+    assert not codes.any()
+    assert np.all(scales == 1.0)
+
+
+def test_int8_search_with_rescoring_matches_exact_search(stores, tmp_path):
+    matrix, exact = stores
+    int8 = NumpyVectorStore(str(tmp_path), model="m", quantization="int8", rescore_factor=4)
+    query = matrix[17] + 0.05 * unit_vectors(1, 32, seed=1)[0]
+
+    expected = exact.similarity_search_by_vector_with_relevance_scores(query.tolist(), k=5)
+    found = int8.similarity_search_by_vector_with_relevance_scores(query.tolist(), k=5)
+
+    assert [d.page_content for d, _ in found] == [d.page_content for d, _ in expected]
+    assert found[0][0].page_content == "chunk 17"
+    # Rescored against the float32 rows, so distances are exact too
+    assert [s for _, s in found] == pytest.approx([s for _, s in expected], abs=1e-5)
+    assert int8.bytes_per_vector() < exact.bytes_per_vector()
+
+
+def test_int8_search_applies_metadata_filters(stores, tmp_path):
+    matrix, _exact = stores
+    int8 = NumpyVectorStore(str(tmp_path), model="m", quantization="int8")
+    found = int8.similarity_search_by_vector_with_relevance_scores(matrix[17].tolist(), k=3, filter={"doc_id": "even"})
+    assert len(found) == 3 and all(doc.metadata["doc_id"] == "even" for doc, _ in found)
+
+
+def test_unknown_quantization_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        NumpyVectorStore(str(tmp_path), quantization="pq")
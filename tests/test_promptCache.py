@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("google.genai")
+
+from google.genai import types
+
+from utils.promptCache import LocalCaches, PromptCache
+
+MODEL = "gemini-2.5-flash"
+
+
+def tools(*names):
+    return [types.Tool(function_declarations=[types.FunctionDeclaration(name=n, description=n) for n in names])]
+
+
+TOOLS = tools("weather_tool")
+INLINE = {"system_instruction": "system", "tools": TOOLS}
+
+
+class FailingCaches:
+    """caches API that rejects every create (e.g. prefix below the minimum size)."""
+
+    def __init__(self):
+        self.creates = 0
+
+    async def create(self, model, config):
+        self.creates += 1
+        raise ValueError("cached content is too small")
+
+
+def api_client(caches):
+    return type("Client", (), {"aio": type("Aio", (), {"caches": caches})()})()
+
+
+def test_off_mode_always_sends_the_prefix_inline():
+    cache = PromptCache("off", ttl=600)
+    fields = asyncio.run(cache.config_fields(None, MODEL, "system", TOOLS, "tools-v1"))
+    assert fields == INLINE
+    assert cache.stats()["inline"] == 1 and len(cache.local) == 0
+
+
+def test_unknown_mode_falls_back_to_off():
+    assert PromptCache("sometimes", ttl=600).mode == "off"
+
+
+def test_local_mode_creates_once_and_reuses_the_entry():
+    async def scenario():
+        cache = PromptCache("local", ttl=600)
+        first = await cache.config_fields(None, MODEL, "system", TOOLS, "tools-v1")
+        second = await cache.config_fields(None, MODEL, "system", TOOLS, "tools-v1")
+        return cache, first, second
+
+    cache, first, second = asyncio.run(scenario())
+    # The stand-in can't be referenced by the real API, so the prefix stays inline
+    assert first == second == INLINE
+    assert cache.stats()["creates"] == 1 and cache.stats()["hits"] == 1
+    assert len(cache.local) == 1
+
+
+def test_a_new_prefix_replaces_and_deletes_the_old_entry():
+    async def scenario():
+        cache = PromptCache("local", ttl=600)
+        await cache.config_fields(None, MODEL, "system", TOOLS, "tools-v1")
+        await cache.config_fields(None, MODEL, "system", tools("weather_tool", "pdf_tool"), "tools-v2")
+        await asyncio.sleep(0)  # let the background delete run
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert cache.stats()["creates"] == 2 and cache.stats()["entries"] == 1
+    assert len(cache.local) == 1
+
+
+def test_explicit_mode_references_the_cached_content():
+    caches = LocalCaches()
+    cache = PromptCache("explicit", ttl=600)
+    fields = asyncio.run(cache.config_fields(api_client(caches), MODEL, "system", TOOLS, "tools-v1"))
+    assert list(fields) == ["cached_content"]
+    assert fields["cached_content"].startswith("local/cachedContents/")
+    assert len(caches) == 1
+
+
+def test_failed_create_goes_inline_and_is_not_retried_within_the_ttl():
+    async def scenario():
+        caches = FailingCaches()
+        cache = PromptCache("explicit", ttl=600)
+        client = api_client(caches)
+        first = await cache.config_fields(client, MODEL, "system", TOOLS, "tools-v1")
+        second = await cache.config_fields(client, MODEL, "system", TOOLS, "tools-v1")
+        return cache, caches, first, second
+
+    cache, caches, first, second = asyncio.run(scenario())
+    assert first == second == INLINE
+    assert caches.creates == 1
+    assert cache.stats()["failures"] == 1 and cache.stats()["inline"] == 2
+
+
+def test_record_usage_tracks_the_cached_share_of_prompt_tokens():
+    cache = PromptCache("off", ttl=600)
+    usage = type("Usage", (), {"prompt_token_count": 1000, "cached_content_token_count": 750})()
+    cache.record_usage(usage)
+    cache.record_usage(None)
+    assert cache.stats()["cached_ratio"] == 0.75
@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.documents import Document
+
+from utils.semanticCache import SemanticAnswerCache, identifier_terms
+
+
+def test_identifier_terms_pick_codes_and_numbers():
+    assert identifier_terms("Is AB-10002 in size 42 waterproof?") == ("42", "ab-10002")
+    assert identifier_terms("Which shoes are waterproof?") == ()
+
+
+def test_lookup_hits_a_near_identical_question_in_the_same_scope():
+    cache = SemanticAnswerCache(threshold=0.95, max_entries=4)
+    cache.store([1.0, 0.0], "yes", scope="s")
+    assert cache.lookup([0.99, 0.05], scope="s") == "yes"
+    assert cache.lookup([0.99, 0.05], scope="other") is None
+    assert cache.lookup([0.5, 0.5], scope="s") is None
+
+
+def test_oldest_entry_is_evicted_when_full():
+    cache = SemanticAnswerCache(threshold=0.95, max_entries=1)
+    cache.store([1.0, 0.0], "first")
+    cache.store([0.0, 1.0], "second")
+    assert cache.lookup([1.0, 0.0]) is None
+    assert cache.lookup([0.0, 1.0]) == "second"
+
+
+@pytest.fixture
+def toolmanager(app, session_helpers, monkeypatch):
+    module = app("tools.toolmanager")
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        message = SimpleNamespace(content=f"answer {len(calls)}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+    monkeypatch.setattr(module, "get_all_vector_paths", lambda db: ["chroma_vectors/unified"])
+    monkeypatch.setattr(
+        module,
+        "retrieve_pdf_chunks",
+        lambda *args: [(Document(page_content="Both shoes are waterproof.", metadata={"source": "shoes.pdf"}), 0.9)],
+    )
+    monkeypatch.setattr(module.client.chat.completions, "create", create)
+    module.answer_cache.clear()
+    # The offline hashing embeddings put these SKU variants at ~0.92; semantic models score them closer
+    monkeypatch.setattr(module.answer_cache, "threshold", 0.9)
+    return module
+
+
+def test_question_about_another_sku_is_not_answered_from_the_cache(toolmanager):
+    first = toolmanager.pdf_tool("Is the AB-10001 trail shoe waterproof?", db=object())
+    vectors = [toolmanager.embed_query_cached(q) for q in ("Is the AB-10001 trail shoe waterproof?", "Is the AB-10002 trail shoe waterproof?")]
+    # Near-duplicates as far as the embedding goes...
+    assert sum(a * b for a, b in zip(*vectors)) >= toolmanager.answer_cache.threshold
+
+    # ...but a different SKU means a fresh answer, while a rephrase of the same one hits
+    assert toolmanager.pdf_tool("Is the AB-10002 trail shoe waterproof?", db=object()) == "answer 2"
+    assert toolmanager.pdf_tool("is the AB-10001 trail shoe waterproof", db=object()) == first == "answer 1"
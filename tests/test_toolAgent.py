@@ -0,0 +1,196 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from google.genai import types
+
+
+def chunk(text):
+    content = SimpleNamespace(parts=[types.Part(text=text)])
+    return SimpleNamespace(candidates=[SimpleNamespace(content=content)], usage_metadata=None)
+
+
+class Gemini:
+    """Stand-in for genai.Client: `aio.models` serves canned streams and replies."""
+
+    def __init__(self, texts=("Hello", " there"), delay=0.0):
+        self.texts, self.delay = list(texts), delay
+        self.aio = SimpleNamespace(models=self)
+        self.finished = asyncio.Event()
+
+    async def generate_content_stream(self, model, contents, config):
+        async def stream():
+            for text in self.texts:
+                await asyncio.sleep(self.delay)
+                yield chunk(text)
+            self.finished.set()
+
+        return stream()
+
+
+@pytest.fixture
+def agent_module(app, monkeypatch):
+    module = app("utils.toolAgent")
+    module.saved = []
+    monkeypatch.setattr(module, "updated_sessions", lambda session_id, role, content: None)
+    monkeypatch.setattr(module, "store_message_db", lambda session_id, role, content: module.saved.append((role, content)))
+    return module
+
+
+def make_agent(agent_module, gemini):
+    agent = agent_module.ToolAgent("s1", gemini)
+
+    async def prepare(task, conversation_history, mode):
+        return [types.Content(role="user", parts=[types.Part(text=task)])], []
+
+    agent._prepare_task = prepare
+    return agent
+
+
+async def collect(events):
+    return [event async for event in events]
+
+
+def test_stream_yields_deltas_then_done_and_persists_the_answer(agent_module):
+    agent = make_agent(agent_module, Gemini())
+    events = asyncio.run(collect(agent.stream_task("hi")))
+
+    assert [e["type"] for e in events] == ["delta", "delta", "done"]
+    assert events[-1]["result"] == "Hello there"
+    assert agent_module.saved == [("assistant", "Hello there")]
+
+
+def test_failure_while_preparing_ends_the_stream_with_an_error(agent_module):
+    agent = make_agent(agent_module, Gemini())
+
+    async def broken_prepare(task, conversation_history, mode):
+        raise RuntimeError("tool catalog unavailable")
+
+    agent._prepare_task = broken_prepare
+    events = asyncio.run(collect(agent.stream_task("hi")))
+
+    assert events == [{"type": "error", "message": "tool catalog unavailable", "result": "An error occurred: tool catalog unavailable"}]
+    assert agent_module.saved == [("assistant", "An error occurred: tool catalog unavailable")]
+    assert agent_module._gemini_semaphore._value == agent_module.GEMINI_MAX_CONCURRENCY
+
+
+def test_gemini_slot_is_released_before_a_slow_client_finishes_reading(agent_module):
+    gemini = Gemini(texts=["a", "b", "c"])
+    agent = make_agent(agent_module, gemini)
+
+    async def scenario():
+        events = agent.stream_task("hi")
+        first = await events.__anext__()
+        await asyncio.wait_for(gemini.finished.wait(), 1)
+        await asyncio.sleep(0)
+        released = agent_module._gemini_semaphore._value
+        rest = [event async for event in events]
+        return first, released, rest
+
+    first, released, rest = asyncio.run(scenario())
+    assert first == {"type": "delta", "text": "a"}
+    assert released == agent_module.GEMINI_MAX_CONCURRENCY
+    assert rest[-1] == {"type": "done", "result": "abc"}
+
+
+def test_client_disconnect_stops_reading_and_keeps_what_was_streamed(agent_module):
+    gemini = Gemini(texts=["a", "b", "c"], delay=0.05)
+    agent = make_agent(agent_module, gemini)
+
+    async def scenario():
+        events = agent.stream_task("hi")
+        await events.__anext__()
+        await events.aclose()
+        await asyncio.sleep(0.2)
+
+    asyncio.run(scenario())
+    assert not gemini.finished.is_set()
+    assert agent_module.saved == [("assistant", "a")]
+    assert agent_module._gemini_semaphore._value == agent_module.GEMINI_MAX_CONCURRENCY
+
+
+def reply(text="ok"):
+    content = types.Content(role="model", parts=[types.Part(text=text)])
+    return SimpleNamespace(candidates=[SimpleNamespace(finish_reason="STOP", content=content)], usage_metadata=None)
+
+
+class SlowGemini:
+    """generate_content that takes `delay` seconds and records how many calls overlap."""
+
+    def __init__(self, delay):
+        self.delay, self.running, self.peak = delay, 0, 0
+        self.aio = SimpleNamespace(models=self)
+
+    async def generate_content(self, model, contents, config):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            return reply()
+        finally:
+            self.running -= 1
+
+
+def test_gemini_calls_are_capped_without_blocking_the_loop(agent_module, monkeypatch):
+    gemini = SlowGemini(delay=0.05)
+    monkeypatch.setattr(agent_module, "_gemini_semaphore", asyncio.Semaphore(2))
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        clock = asyncio.create_task(ticker())
+        agents = [agent_module.ToolAgent(f"s{i}", gemini) for i in range(5)]
+        results = await asyncio.gather(*(agent.make_api_requests([], []) for agent in agents))
+        clock.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(scenario())
+    assert results == [(True, "ok")] * 5
+    assert gemini.peak == 2
+    assert ticks >= 10  # the loop kept running other work while Gemini calls were in flight
+
+
+def test_slow_gemini_call_times_out(agent_module, monkeypatch):
+    monkeypatch.setattr(agent_module, "GEMINI_TIMEOUT", 0.05)
+    agent = agent_module.ToolAgent("s1", SlowGemini(delay=5))
+
+    ended, result = asyncio.run(agent.make_api_requests([], []))
+
+    assert ended and result == "The assistant took too long to respond. Please try again."
+    assert agent_module._gemini_semaphore._value == agent_module.GEMINI_MAX_CONCURRENCY
+
+
+def function_call(name, **args):
+    return types.FunctionCall(name=name, args=args)
+
+
+def test_function_calls_run_concurrently_and_answer_in_call_order(agent_module, monkeypatch):
+    delays = {"slow_tool": 0.2, "fast_tool": 0.01, "medium_tool": 0.15}
+    finished = []
+
+    async def handle_tool_call(tool_call, db=None):
+        name = tool_call["function"]["name"]
+        await asyncio.sleep(delays[name])
+        finished.append(name)
+        return {"status": "success", "tool": name, "message": f"{name} done"}
+
+    monkeypatch.setattr(agent_module, "handle_tool_call", handle_tool_call)
+    agent = agent_module.ToolAgent("s1", SlowGemini(delay=0))
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        parts = await agent._run_function_calls([function_call(name) for name in delays])
+        return parts, loop.time() - start
+
+    parts, elapsed = asyncio.run(scenario())
+    assert [p.function_response.name for p in parts] == ["slow_tool", "fast_tool", "medium_tool"]
+    assert [p.function_response.response["result"] for p in parts] == ["slow_tool done", "fast_tool done", "medium_tool done"]
+    assert finished == ["fast_tool", "medium_tool", "slow_tool"]
+    assert elapsed < 0.3  # back to back they would take 0.36s
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+LOCAL_TOOLS = [
+    {"type": "function", "function": {"name": "pdf_tool", "description": "Ask the PDFs", "parameters": {"type": "object", "properties": {"query": {"type": "string"}}}}}
+]
+
+
+@pytest.fixture
+def catalog(app, monkeypatch):
+    module = app("utils.toolCatalog")
+    mcp = app("mcp_client").mcp_client
+    mcp._initialized = True
+    mcp._catalog_at = 1.0  # served from cache: no servers are contacted
+    mcp._catalog = {"shop": [{"name": "get_order", "description": "Look up an order", "inputSchema": {}}]}
+
+    hashes = []
+    real_key = module.catalog_key
+
+    def counting_key(tools_schema, mcp_tool_data):
+        hashes.append(mcp_tool_data)
+        return real_key(tools_schema, mcp_tool_data)
+
+    monkeypatch.setattr(module, "catalog_key", counting_key)
+    monkeypatch.setattr(mcp, "_catalog_stale", lambda: False)
+    return module.ToolCatalog(), mcp, hashes
+
+
+def test_schemas_are_hashed_once_per_catalog_version(catalog):
+    tool_catalog, mcp, hashes = catalog
+
+    async def scenario():
+        return [await tool_catalog.get(LOCAL_TOOLS) for _ in range(5)]
+
+    compiled = asyncio.run(scenario())
+    assert all(tools is compiled[0] for tools in compiled)
+    assert len(hashes) == 1
+    assert tool_catalog.compiles == 1 and tool_catalog.hits == 4
+
+
+def test_a_new_catalog_version_is_rehashed_and_recompiled(catalog):
+    tool_catalog, mcp, hashes = catalog
+
+    async def scenario():
+        first = await tool_catalog.get(LOCAL_TOOLS)
+        mcp._catalog = {"shop": mcp._catalog["shop"] + [{"name": "track_parcel", "inputSchema": {}}]}
+        mcp.catalog_version += 1
+        return first, await tool_catalog.get(LOCAL_TOOLS)
+
+    first, second = asyncio.run(scenario())
+    assert len(hashes) == 2
+    assert [f.name for f in second[0].function_declarations] == ["pdf_tool", "get_order", "track_parcel"]
+    assert len(first[0].function_declarations) == 2
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from utils.deadline import current_deadline, deadline_scope
+from utils.toolResultCache import ToolCachePolicy, ToolResultCache
+
+
+def make_cache(**policies):
+    return ToolResultCache(policies or {"weather_tool": ToolCachePolicy(ttl=60)}, max_entries=8)
+
+
+def counting_tool(result=None, delay=0.01):
+    calls = []
+
+    async def execute():
+        calls.append(current_deadline())
+        await asyncio.sleep(delay)
+        return dict(result or {"status": "success", "result": {"temp": 21}})
+
+    return execute, calls
+
+
+def test_identical_concurrent_calls_share_one_execution():
+    async def scenario():
+        cache = make_cache()
+        execute, calls = counting_tool()
+        results = await asyncio.gather(*(cache.run("weather_tool", {"city": "Pune"}, execute) for _ in range(5)))
+        return cache, calls, results
+
+    cache, calls, results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(r == {"status": "success", "result": {"temp": 21}} for r in results)
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_finished_result_is_served_from_cache_as_a_copy():
+    async def scenario():
+        cache = make_cache()
+        execute, calls = counting_tool()
+        first = await cache.run("weather_tool", {"city": "Pune"}, execute)
+        first["status"] = "mutated"
+        second = await cache.run("weather_tool", {"city": "Pune"}, execute)
+        return cache, calls, second
+
+    cache, calls, second = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert second["status"] == "success"
+    assert cache.stats()["hits"] == 1
+
+
+def test_error_payloads_are_not_cached():
+    async def scenario():
+        cache = make_cache()
+        execute, calls = counting_tool({"status": "success", "result": {"error": "city not found"}})
+        await cache.run("weather_tool", {"city": "Nowhere"}, execute)
+        await cache.run("weather_tool", {"city": "Nowhere"}, execute)
+        return calls
+
+    assert len(asyncio.run(scenario())) == 2
+
+
+def test_uncacheable_tools_always_run():
+    async def scenario():
+        cache = make_cache(send_email_tool=ToolCachePolicy(ttl=60, cacheable=False))
+        execute, calls = counting_tool()
+        await asyncio.gather(*(cache.run("send_email_tool", {"to": "a@b.c"}, execute) for _ in range(3)))
+        return cache, calls
+
+    cache, calls = asyncio.run(scenario())
+    assert len(calls) == 3
+    assert cache.stats()["bypassed"] == 3
+
+
+def test_invalidate_during_a_call_discards_its_result():
+    async def scenario():
+        cache = make_cache()
+        execute, calls = counting_tool(delay=0.05)
+        running = asyncio.create_task(cache.run("weather_tool", {"city": "Pune"}, execute))
+        await asyncio.sleep(0.01)
+        cache.invalidate("weather_tool")
+        # Started after the invalidate: must not join the stale call
+        await asyncio.gather(running, cache.run("weather_tool", {"city": "Pune"}, execute))
+        await cache.run("weather_tool", {"city": "Pune"}, execute)
+        return calls
+
+    assert len(asyncio.run(scenario())) == 2
+
+
+def test_caller_timeout_does_not_cancel_the_shared_call():
+    async def scenario():
+        cache = make_cache()
+        execute, calls = counting_tool(delay=0.1)
+        impatient = cache.run("weather_tool", {"city": "Pune"}, execute, timeout=0.01)
+        patient = cache.run("weather_tool", {"city": "Pune"}, execute, timeout=1)
+        results = await asyncio.gather(impatient, patient, return_exceptions=True)
+        return calls, results
+
+    calls, (impatient, patient) = asyncio.run(scenario())
+    assert isinstance(impatient, asyncio.TimeoutError)
+    assert patient["status"] == "success"
+    assert len(calls) == 1
+
+
+def test_shared_call_runs_without_the_first_callers_deadline():
+    async def scenario():
+        cache = make_cache()
+        execute, calls = counting_tool()
+        with deadline_scope(5):
+            await cache.run("weather_tool", {"city": "Pune"}, execute)
+        return calls
+
+    assert asyncio.run(scenario()) == [None]
+
+
+@pytest.mark.parametrize("tool_name", [None, "weather_tool"])
+def test_invalidate_drops_cached_results(tool_name):
+    async def scenario():
+        cache = make_cache()
+        execute, calls = counting_tool()
+        await cache.run("weather_tool", {"city": "Pune"}, execute)
+        cache.invalidate(tool_name)
+        await cache.run("weather_tool", {"city": "Pune"}, execute)
+        return calls
+
+    assert len(asyncio.run(scenario())) == 2
+
+
+def test_no_time_left_starts_nothing_but_still_serves_a_cached_result():
+    async def scenario():
+        cache = make_cache()
+        execute, calls = counting_tool()
+        with pytest.raises(asyncio.TimeoutError):
+            await cache.run("weather_tool", {"city": "Pune"}, execute, timeout=0)
+        assert calls == [] and cache.stats()["in_flight"] == 0
+
+        await cache.run("weather_tool", {"city": "Pune"}, execute)
+        return await cache.run("weather_tool", {"city": "Pune"}, execute, timeout=0), calls
+
+    cached, calls = asyncio.run(scenario())
+    assert cached["status"] == "success"
+    assert len(calls) == 1
@@ -0,0 +1,79 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+
+@pytest.fixture
+def toolmanager(app, session_helpers, monkeypatch):
+    module = app("tools.toolmanager")
+    module.calls = []
+
+    def weather_tool(city: str):
+        module.calls.append(city)
+        return {"status": "success", "result": {"city": city, "temp": 21}, "message": f"21°C in {city}"}
+
+    monkeypatch.setitem(module.LOCAL_TOOLS, "weather_tool", weather_tool)
+    return module
+
+
+def call(name, **args):
+    return {"function": {"name": name, "arguments": args}}
+
+
+def test_tool_runs_and_its_result_is_cached(toolmanager):
+    async def scenario():
+        return [await toolmanager.handle_tool_call(call("weather_tool", city="Pune")) for _ in range(2)]
+
+    first, second = asyncio.run(scenario())
+    assert first["status"] == second["status"] == "success"
+    assert toolmanager.calls == ["Pune"]
+
+
+@pytest.mark.parametrize("tool_name", ["weather_tool", "send_email_tool"])  # shared/cached and uncached
+def test_nothing_starts_once_the_request_deadline_has_passed(app, toolmanager, monkeypatch, tool_name):
+    deadline_scope = app("utils.deadline").deadline_scope
+    monkeypatch.setitem(toolmanager.LOCAL_TOOLS, "send_email_tool", lambda **kwargs: toolmanager.calls.append(kwargs))
+
+    async def scenario():
+        with deadline_scope(0):
+            return await toolmanager.handle_tool_call(call(tool_name, city="Pune"))
+
+    result = asyncio.run(scenario())
+    assert result["status"] == "error" and "timed out" in result["message"]
+    assert toolmanager.calls == []
+    assert toolmanager.tool_result_cache.stats()["in_flight"] == 0
+
+
+@pytest.mark.parametrize(
+    "a, b",
+    [
+        ("What's your return policy?", "tell me the return policy"),
+        ("Do you ship to Pune", "do u ship to pune??"),
+        ("price of blue shirts", "Price of the blue shirt"),
+    ],
+)
+def test_cosmetic_rewordings_share_a_query_key(toolmanager, a, b):
+    assert toolmanager._normalize_query(a) == toolmanager._normalize_query(b)
+
+
+@pytest.mark.parametrize(
+    "a, b",
+    [
+        ("price of the blue shirt", "price of the blue shorts"),
+        ("is AB-10001 in stock", "is AB-10002 in stock"),
+        ("ship from pune to delhi", "ship from delhi to pune"),
+    ],
+)
+def test_different_questions_keep_different_query_keys(toolmanager, a, b):
+    assert toolmanager._normalize_query(a) != toolmanager._normalize_query(b)
+
+
+def test_reworded_query_reuses_the_embedding(toolmanager, monkeypatch):
+    embedded = []
+    provider = SimpleNamespace(embed_query=lambda query: embedded.append(query) or [1.0])
+    monkeypatch.setattr(toolmanager, "get_embeddings", lambda: provider)
+    toolmanager.embed_query_cached("What's your return policy?")
+    toolmanager.embed_query_cached("tell me the return policy")
+    toolmanager.embed_query_cached("what is the exchange policy")
+    assert embedded == ["What's your return policy?", "what is the exchange policy"]
@@ -0,0 +1,104 @@
+import math
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("langchain_chroma")
+
+from langchain_core.documents import Document
+
+from utils.vectorIndex import cosine_from_distance, reciprocal_rank_fusion, search_stores
+
+
+def chunk(chunk_id, text=None):
+    return Document(page_content=text or f"passage {chunk_id} about topic {chunk_id}", metadata={"chunk_id": chunk_id})
+
+
+def ids(fused):
+    return [doc.metadata["chunk_id"] for doc, _score in fused]
+
+
+class Store:
+    """Returns fixed (chunk, distance) pairs the way a Chroma store does."""
+
+    def __init__(self, *hits):
+        self.hits = list(hits)
+
+    def similarity_search_by_vector_with_relevance_scores(self, query_vector, k, filter=None):
+        return self.hits[:k]
+
+
+def test_chunks_ranked_by_both_retrievers_come_first():
+    vector = [(chunk("a"), 0.9), (chunk("b"), 0.8), (chunk("c"), 0.7)]
+    lexical = [(chunk("c"), 12.0), (chunk("d"), 9.0)]
+
+    fused = reciprocal_rank_fusion([vector, lexical], final_k=4)
+
+    assert ids(fused) == ["c", "a", "b", "d"]
+    assert fused[0][1] == pytest.approx(1 / 63 + 1 / 61)
+
+
+def test_fusion_ignores_input_scores_and_respects_final_k():
+    vector = [(chunk("a"), 0.1), (chunk("b"), 0.99)]
+    assert ids(reciprocal_rank_fusion([vector], final_k=1)) == ["a"]
+
+
+def test_near_duplicate_chunks_keep_only_the_best_copy():
+    text = "Returns are accepted within 30 days of delivery with the original receipt"
+    vector = [(chunk("unified-1", text), 0.9), (chunk("x"), 0.5)]
+    lexical = [(chunk("legacy-7", text + "."), 3.0), (chunk("y"), 2.0)]
+
+    fused = reciprocal_rank_fusion([vector, lexical], final_k=3)
+
+    assert ids(fused) == ["unified-1", "x", "y"]
+
+
+@pytest.mark.parametrize(
+    "space, distance",
+    [
+        ("l2", 2 - 2 * math.cos(1.4)),  # squared euclidean between unit vectors
+        ("cosine", 1 - math.cos(1.4)),
+        ("ip", 1 - math.cos(1.4)),
+    ],
+)
+def test_distances_map_to_cosine_similarity(space, distance):
+    assert cosine_from_distance(distance, space) == pytest.approx(math.cos(1.4))
+
+
+def test_low_but_positive_cosine_stays_positive_on_l2_collections():
+    # cos 0.2 between unit vectors -> squared L2 distance 1.6
+    assert cosine_from_distance(1.6, "l2") == pytest.approx(0.2)
+
+
+def test_unknown_distance_space_is_rejected():
+    with pytest.raises(ValueError):
+        cosine_from_distance(0.5, "manhattan")
+
+
+def test_search_merges_spaces_by_cosine_and_drops_hits_below_the_threshold():
+    cosine_store = Store((chunk("a"), 0.1), (chunk("b"), 0.9))  # cos 0.9, 0.1
+    l2_store = Store((chunk("c"), 0.4), (chunk("d"), 1.9))  # cos 0.8, 0.05
+
+    found = search_stores([(cosine_store, "cosine"), (l2_store, "l2")], [1.0], k=2, final_k=4, score_threshold=0.2)
+
+    assert ids(found) == ["a", "c"]
+    assert [score for _doc, score in found] == pytest.approx([0.9, 0.8])
+
+
+@pytest.mark.parametrize("backend", ["chroma", "numpy"])
+def test_deleting_a_document_clears_every_models_collection(app, monkeypatch, backend):
+    monkeypatch.setenv("VECTOR_BACKEND", backend)
+    index = app("utils.vectorIndex")
+    for model in ("openai:text-embedding-ada-002", "hashing:2"):
+        index.add_document_chunks(
+            ["D-0", "E-0"], [[1.0, 0.0], [0.0, 1.0]], ["d", "e"], [{"doc_id": "D"}, {"doc_id": "E"}], model=model
+        )
+
+    index.delete_document_chunks("D")
+
+    for model in ("openai:text-embedding-ada-002", "hashing:2"):
+        if backend == "numpy":
+            rows = index._numpy_store(model).get(include_embeddings=False)
+        else:
+            rows = index._collection(index.UNIFIED_INDEX_DIR, model).get()
+        assert rows["ids"] == ["E-0"]
@@ -0,0 +1,72 @@
+import threading
+
+from utils.vectorStoreCache import VectorStoreCache
+
+
+def cache_with(loader, tmp_path, max_entries=2):
+    return VectorStoreCache(loader, max_entries=max_entries, usage_path=str(tmp_path / "usage.json"), save_interval=3600)
+
+
+def test_stores_are_loaded_once_and_evicted_least_recently_used(tmp_path):
+    loads = []
+    cache = cache_with(lambda path: loads.append(path) or f"store {path}", tmp_path)
+
+    assert cache.get("a") == "store a" and cache.get("a") == "store a"
+    cache.get("b")
+    cache.get("a")
+    cache.get("c")  # evicts b
+
+    assert loads == ["a", "b", "c"]
+    cache.get("b")
+    assert loads == ["a", "b", "c", "b"]
+    assert cache.stats()["evictions"] == 2
+
+
+def test_concurrent_misses_share_one_load(tmp_path):
+    release, loads = threading.Event(), []
+
+    def slow_loader(path):
+        loads.append(path)
+        release.wait(5)
+        return f"store {path}"
+
+    cache = cache_with(slow_loader, tmp_path)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("a"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert loads == ["a"] and results == ["store a"] * 4
+
+
+def test_store_invalidated_during_its_load_is_not_cached(tmp_path):
+    loading, release, versions = threading.Event(), threading.Event(), iter(["stale", "fresh"])
+
+    def loader(path):
+        version = next(versions)
+        if version == "stale":
+            loading.set()
+            release.wait(5)
+        return version
+
+    cache = cache_with(loader, tmp_path)
+    first = []
+    thread = threading.Thread(target=lambda: first.append(cache.get("a")))
+    thread.start()
+    loading.wait(5)
+    cache.invalidate(["a"])  # e.g. a re-upload finished while the old store was being opened
+    release.set()
+    thread.join()
+
+    assert first == ["stale"]
+    assert cache.get("a") == "fresh"
+
+
+def test_usage_counts_survive_a_restart(tmp_path):
+    cache = cache_with(lambda path: path, tmp_path)
+    for path in ("a", "b", "b"):
+        cache.get(path)
+    cache.save_usage()
+    assert cache_with(lambda path: path, tmp_path).most_used(1) == ["b"]